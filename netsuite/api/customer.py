@@ -13,4 +13,4 @@ def get_customer(client, internal_id):
     Returns:
         Customer instance if found or None otherwise
     """
-    return get_record_by_type(RecordType.Customer, internal_id)
+    return client.get_record_by_type(RecordType.Customer, internal_id)
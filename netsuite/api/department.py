@@ -1,32 +1,40 @@
 """Department operations."""
 
-from .utils import search_all
+from .utils import get_record, search_all
 from .types import RecordType
 
 
-def get_departments(client, search_preferences=None, search_params=None):
+def get_departments(client, search_preferences=None, search_params=None, output=None, export_options=None,
+                    prefer_local=False, offline=False):
     """Perform a basic search on existing departments.
 
     Args:
             client: Netsuite API client
             search_preferences: Preferences for returned search results (optional)
             search_params: Parameters used to filter the search (optional)
+            output: Path of a file or binary stream to export the results to (optional)
+            export_options: Options of the export (see netsuite.export.export_search) (optional)
+            prefer_local: Whether to return the departments from the local mirror when available (optional)
+            offline: Whether to only return the departments from the local mirror (optional)
 
     Returns:
             List of departments matching the criteria
     """
 
-    return search_all(client, 'DepartmentSearchBasic', search_preferences, search_params)
+    return search_all(client, 'DepartmentSearchBasic', search_preferences, search_params, output, export_options,
+                      prefer_local, offline)
 
 
-def get_department(client, internal_id):
+def get_department(client, internal_id, prefer_local=False, offline=False):
     """Get a department record using its unique internal identifier.
 
     Args:
             client: Netsuite API client
             internal_id: Department unique internal identifier
+            prefer_local: Whether to return the department from the local mirror when available (optional)
+            offline: Whether to only return the department from the local mirror (optional)
 
     Returns:
             Department instance if found or None otherwise
     """
-    return client.get_record_by_type(RecordType.Department, internal_id)
+    return get_record(client, RecordType.Department, internal_id, prefer_local, offline)
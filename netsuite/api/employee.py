@@ -1,35 +1,43 @@
 """Employee operations."""
 
-from .utils import search_all, update
+from .utils import get_record, search_all, update
 from .types import RecordType
 
 
-def get_employees(client, search_preferences=None, search_params=None):
+def get_employees(client, search_preferences=None, search_params=None, output=None, export_options=None,
+                  prefer_local=False, offline=False):
     """Perform a basic search on existing employees.
 
     Args:
             client: Netsuite API client
             search_preferences: Preferences for returned search results  (optional)
             search_params: Parameters used to filter the search for employees  (optional)
+            output: Path of a file or binary stream to export the results to (optional)
+            export_options: Options of the export (see netsuite.export.export_search) (optional)
+            prefer_local: Whether to return the employees from the local mirror when available (optional)
+            offline: Whether to only return the employees from the local mirror (optional)
 
     Returns:
             List of employees matching the criteria
     """
 
-    return search_all(client, 'EmployeeSearchBasic', search_preferences, search_params)
+    return search_all(client, 'EmployeeSearchBasic', search_preferences, search_params, output, export_options,
+                      prefer_local, offline)
 
 
-def get_employee(client, internal_id):
+def get_employee(client, internal_id, prefer_local=False, offline=False):
     """Get an employee record using its unique internal identifier.
 
     Args:
             client: Netsuite API client
             internal_id: Employee unique internal identifier
+            prefer_local: Whether to return the employee from the local mirror when available (optional)
+            offline: Whether to only return the employee from the local mirror (optional)
 
     Returns:
             Employee instance if found or None otherwise
     """
-    return client.get_record_by_type(RecordType.Employee, internal_id)
+    return get_record(client, RecordType.Employee, internal_id, prefer_local, offline)
 
 
 def update_employee(client, internal_id, employee_data, preferences=None):
@@ -15,10 +15,14 @@ from pytz import timezone
 
 import re
 
-from itertools import ifilter
+import time
 
 import logging
 
+from bisect import bisect_right
+
+from threading import Lock
+
 # Get the logger instance for the module
 LOGGER = logging.getLogger(__name__)
 
@@ -31,11 +35,13 @@ class GovernanceModel(object):
     RECORD_LIMITS_KEY = "record_limits"
     REQUEST_LIMITS_KEY = "request_limits"
 
+    CONCURRENCY_LIMITS_KEY = "concurrency_limits"
+
     MANDATORY_ROOT_KEYS = [
-		SCHEDULES_KEY,
+        SCHEDULES_KEY,
         RECORD_LIMITS_KEY,
-		REQUEST_LIMITS_KEY
-	]
+        REQUEST_LIMITS_KEY
+    ]
 
     DEFAULT_TIMEZONE = "UTC"
 
@@ -43,6 +49,8 @@ class GovernanceModel(object):
 
     ASYNC_OPERATION_RE = re.compile(r'(^async|Async)')
 
+    ASYNC_OPERATION_PREFIX_RE = re.compile(r'^async_?')
+
     OPERATION_NAME_TO_CATEGORY_RULES = [
         {"category": "add", "regex": re.compile("(^add)(List)?")},
         {"category": "update", "regex": re.compile("(^update)(List)?")},
@@ -52,6 +60,10 @@ class GovernanceModel(object):
 
     BATCHABLE_OPERATION_CATEGORIES = ["add", "update", "delete"]
 
+    SECONDS_PER_DAY = 24 * 60 * 60
+
+    SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
     def __init__(self, config):
         """Constructor.
 
@@ -61,6 +73,55 @@ class GovernanceModel(object):
 
         self.validate_config(config)
         self.config = config
+        self._compile()
+
+    def _compile(self):
+        """Compile the configuration into the lookup tables used to answer constraint queries."""
+        self.timezone = self._get_timezone()
+
+        # Schedule in effect from each boundary (seconds since midnight) until the next one
+        self.schedule_boundaries = []
+        self.schedule_ids = []
+        self._compile_schedules()
+
+        self._operation_categories = {}
+        self._async_operations = {}
+        self._constraints = {}
+
+        # Schedule in effect until the next boundary, refreshed once the boundary passes
+        self._current_schedule_id = None
+        self._current_schedule_expires_at = 0
+        self._lock = Lock()
+
+    def _compile_schedules(self):
+        """Build the table of schedule boundaries of a day.
+
+        Schedules span from their start time (inclusive) to their end time (exclusive) and
+        wrap around midnight when they end before they start.
+        """
+        if not self.SCHEDULES_KEY in self.config:
+            return
+
+        intervals = []
+        for schedule_id, schedule in self.config[self.SCHEDULES_KEY].items():
+            start_time = datetime_parser.parse(schedule["start_time"]).time()
+            end_time = datetime_parser.parse(schedule["end_time"]).time()
+            intervals.append((self._get_seconds(start_time), self._get_seconds(end_time), schedule_id))
+
+        boundaries = sorted(set([0] + [start for start, _, _ in intervals] + [end for _, end, _ in intervals]))
+        for boundary in boundaries:
+            for start, end, schedule_id in intervals:
+                if start == end or \
+                        (start < end and start <= boundary < end) or \
+                        (start > end and (boundary >= start or boundary < end)):
+                    self.schedule_boundaries.append(boundary)
+                    self.schedule_ids.append(schedule_id)
+                    break
+
+    @staticmethod
+    def _get_seconds(time_of_day):
+        return time_of_day.hour * 3600 + time_of_day.minute * 60 + time_of_day.second + \
+            time_of_day.microsecond / 1e6
 
     def _get_timezone(self):
         """Get the timezone used for date/time constraints.
@@ -75,6 +136,28 @@ class GovernanceModel(object):
 
         return timezone(timezone_str)
 
+    def _lookup_schedule(self, date):
+        """Find the schedule in effect at a date and the seconds until it ends.
+
+        Return:
+                Tuple with the schedule identifier and the seconds until the next boundary
+        """
+        if not self.schedule_boundaries:
+            raise Exception("Shedule not found for date {0}".format(date))
+
+        seconds = self._get_seconds(date.time())
+        index = bisect_right(self.schedule_boundaries, seconds) - 1
+        if index < 0 or self.schedule_boundaries[index] > seconds:
+            raise Exception("Shedule not found for date {0}".format(date))
+
+        next_index = index + 1
+        if next_index < len(self.schedule_boundaries):
+            next_boundary = self.schedule_boundaries[next_index]
+        else:
+            next_boundary = self.SECONDS_PER_DAY + self.schedule_boundaries[0]
+
+        return self.schedule_ids[index], next_boundary - seconds
+
     def find_schedule(self, date=None):
         """Find the schedule that maps to the given date.
 
@@ -83,23 +166,31 @@ class GovernanceModel(object):
         Return:
                 Schedule identifier or None if no match is found
         """
-        if not "schedules" in self.config:
+        if not self.SCHEDULES_KEY in self.config:
             raise Exception("No schedules defined")
 
-        if not date:
-            date = datetime.now(self._get_timezone())
-        else:
-            # Make sure that date's timezone is correct
-            raise Exception("Convert date to correct timezone")
+        if date is None:
+            return self._get_current_schedule()
 
-        for schedule_id, schedule in self.config["schedules"].items():
-            start_time = datetime_parser.parse(schedule["start_time"]).time()
-            end_time = datetime_parser.parse(schedule["end_time"]).time()
-            if (date.time() >= start_time and date.time() <= end_time) or
-				(start_time > end_time and date.time() <= end_time):
-                return schedule_id
+        if date.tzinfo is not None:
+            # Schedules are expressed in the timezone of the configuration
+            date = date.astimezone(self.timezone)
+
+        return self._lookup_schedule(date)[0]
 
-        raise Exception("Shedule not found for date {0}".format(date))
+    def _get_current_schedule(self):
+        """Get the schedule in effect now, looking it up again only once its boundary passes."""
+        now = time.time()
+        if now < self._current_schedule_expires_at:
+            return self._current_schedule_id
+
+        with self._lock:
+            if now >= self._current_schedule_expires_at:
+                schedule_id, seconds_left = self._lookup_schedule(datetime.now(self.timezone))
+                self._current_schedule_id = schedule_id
+                self._current_schedule_expires_at = now + seconds_left
+                LOGGER.debug("Schedule %s is in effect for the next %d seconds", schedule_id, seconds_left)
+            return self._current_schedule_id
 
     def get_operation_category(self, operation_name):
         """Get the name of the category for a given WSDL operation name.
@@ -110,12 +201,24 @@ class GovernanceModel(object):
         Returns:
                 The name of the category or None if not found
         """
+        try:
+            return self._operation_categories[operation_name]
+        except KeyError:
+            pass
+
+        # Asynchronous operations (e.g. asyncAddList, async_add_list) share the category of their
+        # synchronous counterpart
+        synchronous_operation_name = self.ASYNC_OPERATION_PREFIX_RE.sub("", operation_name)
+        if synchronous_operation_name != operation_name:
+            synchronous_operation_name = synchronous_operation_name[:1].lower() + synchronous_operation_name[1:]
 
         iter = filter(
-			lambda rule: rule["regex"].match(operation_name),
+            lambda rule: rule["regex"].match(synchronous_operation_name),
             self.OPERATION_NAME_TO_CATEGORY_RULES)
         rule = next(iter, None) if iter else None
-        return rule["category"] if rule else None
+        operation_category = rule["category"] if rule else None
+        self._operation_categories[operation_name] = operation_category
+        return operation_category
 
     def is_operation_batchable(self, operation_name):
         """Check if a given operation name is batchable.
@@ -128,7 +231,7 @@ class GovernanceModel(object):
         """
 
         operation_category = self.get_operation_category(operation_name)
-        if not operation_category:
+        if not operation_category or self.is_async_operation(operation_name):
             return None
 
         return operation_category in self.get_batchable_operation_categories()
@@ -142,7 +245,12 @@ class GovernanceModel(object):
         Returns:
                 True if the operation is asynchronous or False otherwise
         """
-        return not self.ASYNC_OPERATION_RE.match(operation_name) is None
+        try:
+            return self._async_operations[operation_name]
+        except KeyError:
+            is_async = not self.ASYNC_OPERATION_RE.match(operation_name) is None
+            self._async_operations[operation_name] = is_async
+            return is_async
 
     def has_constraints(self, operation_name):
         """Check if a given operation has constraints given its name.
@@ -153,16 +261,17 @@ class GovernanceModel(object):
         Returns:
                 True if the operation is constrained or False otherwise
         """
-        return not get_record_constraints(operation_name) is None
+        return not self.get_operation_constraints(operation_name) is None
 
-    def get_operation_constraints(self, operation_name):
+    def get_operation_constraints(self, operation_name, at=None):
         """Get the constraints for a given operation name.
 
         Args:
                 operation_name: Name of the WDSL operation
+                at: Date at which the operation is executed (optional). Defaults to now
 
         Returns:
-                Dictionary of applicable constraints
+                Dictionary of applicable constraints shared between calls, so it must not be modified
         """
         operation_category = self.get_operation_category(operation_name)
         if not operation_category:
@@ -171,13 +280,17 @@ class GovernanceModel(object):
             return None
 
         is_synchronous = not self.is_async_operation(operation_name)
-        schedule_id = self.find_schedule()
-
-        operation_constraints = {}
-        operation_constraints.update(self.get_operation_category_constraints(
-            operation_category, is_synchronous, schedule_id))
-        operation_constraints.update(
-            self.get_request_constraints(operation_name))
+        schedule_id = self.find_schedule(at)
+
+        key = (operation_category, is_synchronous, schedule_id)
+        operation_constraints = self._constraints.get(key)
+        if operation_constraints is None:
+            operation_constraints = {}
+            operation_constraints.update(self.get_operation_category_constraints(
+                operation_category, is_synchronous, schedule_id))
+            operation_constraints.update(
+                self.get_request_constraints(operation_name))
+            self._constraints[key] = operation_constraints
 
         return operation_constraints
 
@@ -211,14 +324,68 @@ class GovernanceModel(object):
         # Found constraints for the given operation category
         return operations[operation_category]
 
+    def get_record_count_limit(self, operation_category, is_synchronous=True, at=None):
+        """Get the maximum number of records per request of an operation category.
+
+        Unlike get_operation_constraints, categories missing from the configuration are not an
+        error, e.g. for the "get" category of getList which no operation name maps to.
+
+        Args:
+                operation_category: Category of the operation
+                is_synchronous: Boolean flag stating whether the operation is meant to executed synchronously
+                at: Date at which the operation is executed (optional). Defaults to now
+
+        Returns:
+                Maximum number of records or None if there is no limit
+        """
+        synchronous_key = "synchronous" if is_synchronous else "asynchronous"
+        schedule_id = self.find_schedule(at)
+        operations = self.config[self.RECORD_LIMITS_KEY].get(synchronous_key, {}).get(
+            schedule_id, {}).get("operations", {})
+        record_count = operations.get(operation_category, {}).get("record_count")
+        return record_count["value"] if record_count else None
+
     def get_request_constraints(self, operation_name):
         """Get all request constraints related with the operation.
 
-		Args:
-			operation_name: Name of the operation
+        Args:
+                operation_name: Name of the operation
         """
         return self.config["request_limits"]
 
+    def get_max_request_size(self):
+        """Get the maximum size of a request.
+
+        Returns:
+                Maximum number of bytes of a request or None if there is no limit
+        """
+        max_request_size = self.config[self.REQUEST_LIMITS_KEY].get("max_request_size")
+        if not max_request_size:
+            return None
+
+        units = max_request_size.get("units", "B").upper()
+        if not units in self.SIZE_UNITS:
+            raise Exception("Unsupported units {0} for max_request_size. Expected one of {1}".format(
+                units, ", ".join(self.SIZE_UNITS)))
+
+        return int(float(max_request_size["value"]) * self.SIZE_UNITS[units])
+
+    def get_concurrency_limits(self, account=None):
+        """Get the limits on concurrent requests and request rate.
+
+        Args:
+                account: Account whose specific limits override the default ones (optional)
+
+        Returns:
+                Dictionary with the max_concurrent_requests, requests_per_second and burst limits
+                (empty if there are none)
+        """
+        concurrency_limits = dict(self.config.get(self.CONCURRENCY_LIMITS_KEY, {}))
+        account_limits = concurrency_limits.pop("accounts", {})
+        if account and account in account_limits:
+            concurrency_limits.update(account_limits[account])
+        return concurrency_limits
+
     @classmethod
     def get_batchable_operation_categories(cls):
         return cls.BATCHABLE_OPERATION_CATEGORIES
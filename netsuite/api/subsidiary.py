@@ -1,32 +1,40 @@
 """Subsidiary operations."""
 
-from .utils import search_all
+from .utils import get_record, search_all
 from .types import RecordType
 
 
-def get_subsidiaries(client, search_preferences=None, search_params=None):
+def get_subsidiaries(client, search_preferences=None, search_params=None, output=None, export_options=None,
+                     prefer_local=False, offline=False):
     """Perform a basic search on existing subsidiaries.
 
     Args:
             client: Netsuite API client
             search_preferences: Preferences for returned search results  (optional)
             search_params: Parameters used to filter the search (optional)
+            output: Path of a file or binary stream to export the results to (optional)
+            export_options: Options of the export (see netsuite.export.export_search) (optional)
+            prefer_local: Whether to return the subsidiaries from the local mirror when available (optional)
+            offline: Whether to only return the subsidiaries from the local mirror (optional)
 
     Returns:
             List of subsidiaries matching the criteria
     """
 
-    return search_all(client, 'SubsidiarySearchBasic', search_preferences, search_params)
+    return search_all(client, 'SubsidiarySearchBasic', search_preferences, search_params, output, export_options,
+                      prefer_local, offline)
 
 
-def get_subsidiary(client, internal_id):
+def get_subsidiary(client, internal_id, prefer_local=False, offline=False):
     """Get a subsidiary record using its unique internal identifier.
 
     Args:
             client: Netsuite API client
             internal_id: Subsidiary unique internal identifier
+            prefer_local: Whether to return the subsidiary from the local mirror when available (optional)
+            offline: Whether to only return the subsidiary from the local mirror (optional)
 
     Returns:
             Subsidiary instance if found or None otherwise
     """
-    return client.get_record_by_type(RecordType.subsidiary, internal_id)
+    return get_record(client, RecordType.Subsidiary, internal_id, prefer_local, offline)
@@ -223,10 +223,26 @@ class SearchDoubleFieldOperator(SearchNumberFieldOperator):
     pass
 
 class SearchDateFieldOperator(object):
-    pass
+    """Search date field operator."""
+    AFTER = "after"
+    BEFORE = "before"
+    EMPTY = "empty"
+    NOT_AFTER = "notAfter"
+    NOT_BEFORE = "notBefore"
+    NOT_EMPTY = "notEmpty"
+    NOT_ON = "notOn"
+    NOT_ON_OR_AFTER = "notOnOrAfter"
+    NOT_ON_OR_BEFORE = "notOnOrBefore"
+    NOT_WITHIN = "notWithin"
+    ON = "on"
+    ON_OR_AFTER = "onOrAfter"
+    ON_OR_BEFORE = "onOrBefore"
+    WITHIN = "within"
 
 class SearchEnumMultiSelectFieldOperator(object):
-    pass
+    """Search enum multi select field operator."""
+    ANY_OF = "anyOf"
+    NONE_OF = "noneOf"
 
 class SearchMultiSelectFieldOperator(object):
     pass
@@ -1,21 +1,112 @@
+from ..export import export_search
 
-def search_all(client, search_type_name, search_preferences=None, search_params=None):
+
+def get_local_mirror(client, record_type, prefer_local=False, offline=False):
+    """Get the local mirror to serve records of a given type from.
+
+    Args:
+            client: Netsuite API client
+            record_type: Type of record
+            prefer_local: Whether to use the local mirror when it has the record type (optional)
+            offline: Whether to only use the local mirror (optional)
+
+    Returns:
+            RecordMirror to use or None to query Netsuite
+    """
+    if not (prefer_local or offline):
+        return None
+
+    mirror = client.mirror
+    if mirror is not None and record_type is not None and mirror.is_available(record_type):
+        return mirror
+
+    if offline:
+        raise Exception("Records of type {} are not available offline".format(record_type))
+    return None
+
+
+def search_all(client, search_type_name, search_preferences=None, search_params=None,
+               output=None, export_options=None, prefer_local=False, offline=False):
     """Perform a search to return all matching entities.
 
     Args:
             client: Netsuite API client
             search_preferences: Preferences for returned search results
             search_params: Parameters used to filter the search for departments (optional)
+            output: Path of a file or binary stream to export the entities to instead (optional)
+            export_options: Dictionary with the output_format, compress and progress_callback
+                arguments of netsuite.export.export_search (optional)
+            prefer_local: Whether to return the entities from the local mirror when available.
+                Searches with parameters always query Netsuite (optional)
+            offline: Whether to only return the entities from the local mirror (optional)
 
     Returns:
-            List of departments matching the criteria
+            List of departments matching the criteria or the ExportProgress totals of the
+            export when an output is given
     """
+    if offline and (search_params or output is not None):
+        raise Exception("Searches with parameters and exports are not available offline")
+
+    if (prefer_local or offline) and not search_params and output is None:
+        record_type = client.mirror.get_record_type_for_search(search_type_name) \
+            if client.mirror is not None else None
+        mirror = get_local_mirror(client, record_type, prefer_local, offline)
+        if mirror is not None:
+            return mirror.store.find(record_type)
+
     SearchType = client.models[search_type_name]
     search_record = SearchType() if not search_params else SearchType(**search_params)
 
+    if output is not None:
+        return export_search(
+            client, search_record, output,
+            search_preferences=search_preferences,
+            **(export_options or {}))
+
     return client.search_all(search_record, search_preferences)
 
 
+def iter_search_all(client, search_type_name, search_preferences=None, search_params=None):
+    """Perform a search yielding matching entities as each page of results arrives.
+
+    Args:
+            client: Netsuite API client
+            search_type_name: Name of the search type to use
+            search_preferences: Preferences for returned search results
+            search_params: Parameters used to filter the search (optional)
+
+    Yields:
+            Entities matching the criteria
+    """
+    SearchType = client.models[search_type_name]
+    search_record = SearchType() if not search_params else SearchType(**search_params)
+
+    return client.iter_search_all(search_record, search_preferences)
+
+
+def get_record(client, record_type, internal_id, prefer_local=False, offline=False):
+    """Get a record by its type and internal identifier.
+
+    Args:
+            client: Netsuite API client
+            record_type: Type of record
+            internal_id: Unique internal identifier for the record type
+            prefer_local: Whether to return the record from the local mirror when available,
+                falling back to Netsuite when the mirror does not have it (optional)
+            offline: Whether to only return the record from the local mirror (optional)
+
+    Returns:
+            Record if found or None otherwise
+    """
+    mirror = get_local_mirror(client, record_type, prefer_local, offline)
+    if mirror is not None:
+        record = mirror.store.get(record_type, internal_id)
+        if record is not None or offline:
+            return record
+
+    return client.get_record_by_type(record_type, internal_id)
+
+
 def update(client, record_type_name, internal_id, data, preferences=None):
     """Update the record with the given type name and internal identifier with the provided data.
 
@@ -0,0 +1,760 @@
+"""Asynchronous API Client.
+
+Requires Python 3.6+ and the zeep asyncio extras (aiohttp).
+"""
+
+import asyncio
+
+import logging
+
+from zeep.asyncio import AsyncTransport
+
+from .client import NetsuiteApiClient
+from .governor import GovernedService
+from .transport import (build_async_session,
+                        build_transport,
+                        get_shared_async_session,
+                        get_transport_config)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncGovernedService(GovernedService):
+    """Proxy of a zeep asynchronous service that sends each operation through a governor.
+
+    Permits are polled for with asyncio.sleep between attempts so that waiting neither blocks
+    the event loop nor holds a thread, and a cancelled wait never leaks a slot.
+    """
+
+    def __init__(self, service, governor, loop):
+        super(AsyncGovernedService, self).__init__(service, governor)
+        self._loop = loop
+
+    async def _acquire(self):
+        """Wait until a request may be sent.
+
+        Returns:
+            Permit to release once the request is done
+        """
+        governor = self._governor
+        poll_interval = governor.poll_interval
+        slot = None
+        try:
+            while True:
+                slot, wait = governor.try_acquire(slot)
+                if wait == 0:
+                    return slot
+                if wait is None:
+                    wait = poll_interval
+                    poll_interval = min(poll_interval * 2, governor.max_poll_interval)
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Cancelled while holding a slot and waiting for a token
+            governor.release(slot)
+            raise
+
+    def _govern(self, operation):
+        governor = self._governor
+
+        async def governed_operation(*args, **kwargs):
+            permit = await self._acquire()
+            try:
+                return await operation(*args, **kwargs)
+            finally:
+                governor.release(permit)
+
+        return governed_operation
+
+
+class AsyncNetsuiteApiClient(NetsuiteApiClient):
+    """Abstract requests made to Oracle Netsuite Web Services using asyncio.
+
+    Exposes the same operations as NetsuiteApiClient as coroutines so that a single event
+    loop can keep many SOAP calls in flight.
+
+    The WSDL is loaded with a synchronous transport, since the zeep asynchronous transport
+    cannot load documents from within a running event loop, and the asynchronous transport is
+    only used to send the operations. The client may therefore be created, and a lazy client
+    initialized, inside a coroutine, although loading the WSDL then blocks the event loop.
+    """
+
+    def __init__(self, api_config, loop=None, **kwargs):
+        """Constructor.
+
+        Args:
+            api_config: Dictionary with information on how to connect to the Netsuite API
+            loop: Event loop used by the transport (optional)
+            kwargs: Remaining arguments accepted by NetsuiteApiClient. The SOAP client
+                configuration may inject an aiohttp session to share using "asyncSession"
+        """
+        self.loop = loop or asyncio.get_event_loop()
+        super(AsyncNetsuiteApiClient, self).__init__(api_config, **kwargs)
+
+    def _build_transport(self, cache=None):
+        """Build the synchronous transport loading the WSDL.
+
+        The services of the WSDL are bound with the asynchronous SOAP bindings so that their
+        operations are coroutines once the asynchronous transport is plugged in.
+
+        Args:
+            cache: Cache for WSDL and XSD documents (optional)
+
+        Returns:
+            Instance of a zeep transport
+        """
+        transport = build_transport(
+            cache,
+            self.soap_client_config.get('transport'),
+            self.soap_client_config.get('session'))
+        transport.binding_classes = AsyncTransport.binding_classes
+        return transport
+
+    def _build_soap_client(self, transport):
+        """Build the SOAP client with the WSDL loaded by the given transport.
+
+        Args:
+            transport: Synchronous transport loading the WSDL
+
+        Returns:
+            zeep SOAP client sending its operations through an asynchronous transport
+        """
+        client = super(AsyncNetsuiteApiClient, self)._build_soap_client(transport)
+        client.transport = self._build_async_transport(transport.cache)
+        return client
+
+    def _build_async_transport(self, cache=None):
+        """Build the asynchronous transport sending the operations.
+
+        Args:
+            cache: Cache for WSDL and XSD documents (optional)
+
+        Returns:
+            Instance of a zeep asynchronous transport
+        """
+        config = self.soap_client_config.get('transport')
+        transport_config = get_transport_config(config)
+        session = self.soap_client_config.get('asyncSession')
+        # Injected and shared sessions are not closed along with the client
+        self._owns_session = session is None and not transport_config['shared']
+        if session is None:
+            if transport_config['shared']:
+                session = get_shared_async_session(self.loop, config)
+            else:
+                session = build_async_session(self.loop, config)
+
+        return AsyncTransport(
+            loop=self.loop,
+            cache=cache,
+            timeout=transport_config['readTimeout'],
+            operation_timeout=transport_config['readTimeout'],
+            session=session)
+
+    def _govern_service(self, service):
+        """Wrap the WSDL service so that every operation goes through the governor.
+
+        Args:
+            service: zeep asynchronous service proxy
+
+        Returns:
+            AsyncGovernedService instance
+        """
+        return AsyncGovernedService(service, self.governor, self.loop)
+
+    def _open_connection(self):
+        """Connections of the asynchronous transport are opened on the 1st request."""
+        LOGGER.debug('Skipping connection warm up for the asynchronous transport')
+
+    async def close(self):
+        """Close the underlying HTTP session unless it is shared with other clients."""
+        if not self.initialized or not self._owns_session:
+            return
+
+        result = self.client.transport.session.close()
+        if asyncio.iscoroutine(result):
+            await result
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _build_soap_headers(self, preferences=None, search_preferences=None):
+        """Build the SOAP headers for a request.
+
+        Args:
+            preferences: General preferences (optional)
+            search_preferences: Search preferences (optional)
+
+        Returns:
+            Dictionary of SOAP headers
+        """
+        soap_headers = {}
+        if search_preferences is not None:
+            soap_headers['searchPreferences'] = search_preferences
+        if preferences is not None:
+            soap_headers['preferences'] = preferences
+        soap_headers.update(self._build_soap_passport_header())
+        return soap_headers
+
+    async def login(self):
+        """Perform a user login."""
+        passport = self._make_passport(self.api_config.passport)
+        login_response = await self.service.login(
+            passport=passport,
+            _soapheaders={
+                'applicationInfo': self.application_info
+            })
+
+        self.logged_in = login_response.body.sessionResponse.status.isSuccess
+        if not self.logged_in:
+            raise Exception("Unsuccessful login")
+
+    async def logout(self):
+        """Logout the user.
+
+        Returns:
+            True if successful or False otherwise
+        """
+        if not self.logged_in:
+            raise Exception("Cannot logout because user is not logged in")
+
+        logout_response = await self.service.logout()
+        self.logged_in = logout_response.body.sessionResponse.status.isSuccess
+        if self.logged_in:
+            raise Exception("Could not logout the user")
+
+        return True
+
+    async def get_record_by_type(self, record_type, internal_id):
+        """Get a single record of a given type based on its internal identifier.
+
+        Args:
+            record_type: Type of record
+            internal_id: Internal identificer that matches the instance
+
+        Returns:
+            Instance of the given type that has the given internal identifier
+        """
+        if self.record_cache is not None:
+            cached_record = self.record_cache.get(record_type, internal_id)
+            if cached_record is not None:
+                return cached_record
+
+        record = self.models.Core.RecordRef(internalId=internal_id, type=record_type)
+        response = await self.service.get(
+            record,
+            _soapheaders=self._build_soap_headers())
+        read_response = response.body.readResponse
+        if not read_response.status.isSuccess:
+            raise Exception(
+                "Could not retrieve Record of type={} with internalId={}".format(
+                    record_type, internal_id))
+
+        record = self._serialize(read_response.record)
+        if self.record_cache is not None:
+            self.record_cache.set(record_type, internal_id, record)
+
+        return record
+
+    async def search(self, search_type, search_preferences=None):
+        """Perform a custom search for record on the 1st page using the provided search type instance.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Instance of a SearchResult
+        """
+        search_preferences = search_preferences or self.search_preferences
+        response = await self.service.search(
+            searchRecord=search_type,
+            _soapheaders=self._build_soap_headers(search_preferences=search_preferences))
+
+        search_result = response.body.searchResult
+
+        if not search_result.status.isSuccess:
+            raise Exception("Search result was not successful")
+
+        return search_result
+
+    async def search_more_with_id(self, search_id, page_index, search_preferences=None):
+        """Fetch a single page of a previously executed search.
+
+        Args:
+            search_id: Identifier of the search returned with its 1st page
+            page_index: Index of the page to fetch (1-based)
+            search_preferences: Search preferences to use for this search (optional)
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Instance of a SearchResult
+        """
+        search_preferences = search_preferences or self.search_preferences
+        response = await self.service.searchMoreWithId(
+            searchId=search_id,
+            pageIndex=page_index,
+            _soapheaders=self._build_soap_headers(search_preferences=search_preferences))
+
+        search_result = response.body.searchResult
+
+        if not search_result.status.isSuccess:
+            raise Exception("Search result was not successful for page {} {}".format(
+                page_index,
+                search_result.status))
+
+        return search_result
+
+    async def async_search(self, search_type, search_preferences=None):
+        """Perform an asynchronous search for record using the provided search type instance.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Instance of an AsyncResult
+        """
+        search_preferences = search_preferences or self.search_preferences
+        response = await self.service.asyncSearch(
+            searchRecord=search_type,
+            _soapheaders=self._build_soap_headers(search_preferences=search_preferences))
+
+        return self._check_async_status_result(response)
+
+    async def search_all(self, search_type, search_preferences=None, max_workers=None):
+        """Perform a custom search for all record using the provided search type instance.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            max_workers: Maximum number of pages to fetch concurrently (optional)
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            List of search result record found
+        """
+        search_preferences = search_preferences or self.search_preferences
+        max_workers = max_workers or self.search_max_workers
+
+        search_result = await self.search(search_type, search_preferences)
+
+        if search_result.recordList is None:
+            return []
+
+        record = list(search_result.recordList.record)
+        search_id = search_result.searchId
+        remaining_pages = range(search_result.pageIndex + 1, search_result.totalPages + 1)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch_page(page_index):
+            """Fetch the records on a given page of the search."""
+            async with semaphore:
+                page_result = await self.search_more_with_id(
+                    search_id, page_index, search_preferences)
+            return page_result.recordList.record if page_result.recordList else []
+
+        # gather() returns the results in the order of the given coroutines
+        pages = await asyncio.gather(*[fetch_page(page_index) for page_index in remaining_pages])
+        for new_records in pages:
+            record += new_records
+
+        LOGGER.info(
+            'Retrieved a total of %d records from the search', len(record))
+
+        return self._serialize_records(record)
+
+    async def iter_search(self, search_type, search_preferences=None, serialize=True):
+        """Perform a custom search for all record yielding one page of record at a time.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            serialize: Whether to serialize record using serialize_object_class (optional)
+
+        Yields:
+            List of search result record found on each page
+        """
+        search_preferences = search_preferences or self.search_preferences
+        search_result = await self.search(search_type, search_preferences)
+
+        if search_result.recordList is None:
+            return
+
+        search_id = search_result.searchId
+        total_pages = search_result.totalPages
+        page_index = search_result.pageIndex
+
+        while True:
+            record = search_result.recordList.record if search_result.recordList else []
+            page = self._serialize_records(record) if serialize else record
+            search_result = record = None
+            yield page
+            page = None
+
+            page_index += 1
+            if page_index > total_pages:
+                break
+
+            search_result = await self.search_more_with_id(search_id, page_index, search_preferences)
+
+    async def iter_search_all(self, search_type, search_preferences=None, serialize=True):
+        """Perform a custom search for all record yielding one record at a time.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            serialize: Whether to serialize record using serialize_object_class (optional)
+
+        Yields:
+            Search result record found
+        """
+        async for page in self.iter_search(search_type, search_preferences, serialize):
+            for record in page:
+                yield record
+
+    async def update(self, record, preferences=None):
+        """Update a single record of a given type.
+
+        Args:
+            record: The instance of a given record type to update
+            preferences: Preferences to be used upon the record update (optional)
+
+        Returns:
+            Instance of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.update(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(record)
+
+        return self._check_write_response(response)
+
+    async def update_list(self, record, preferences=None):
+        """Update a list of records.
+
+        Args:
+            record: List of records to update
+            preferences: General preferences (optional)
+
+        Returns:
+            List of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.updateList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(record)
+
+        return self._check_write_response_list(response)
+
+    async def add(self, record, preferences=None):
+        """Add a new entity record.
+
+        Args:
+            record: New entity record to add
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.add(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return self._check_write_response(response)
+
+    async def add_list(self, record, preferences=None):
+        """Add a list of new entities record.
+
+        Args:
+            record: List of new record entities to add
+            preferences: General preferences (optional)
+
+        Returns:
+            List of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.addList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return self._check_write_response_list(response)
+
+    async def delete(self, base_ref, deletion_reason=None, preferences=None):
+        """Delete a record from Oracle's Netsuite.
+
+        Args:
+            base_ref: Reference to a record to delete
+            deletion_reason: Reason for deleting the record (optional)
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.delete(
+            baseRef=base_ref,
+            deletionReason=deletion_reason,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(base_ref)
+
+        return self._check_write_response(response)
+
+    async def delete_list(self, base_ref, deletion_reason=None, preferences=None):
+        """Delete a list of references to record from Oracle's Netsuite.
+
+        Args:
+            base_ref: List of references to record to be deleted
+            deletion_reason: Reason for deleting the record (optional)
+            preferences: General preferences (optional)
+
+        Returns:
+            List of WriteResponse
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.deleteList(
+            baseRef=base_ref,
+            deletionReason=deletion_reason,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(base_ref)
+
+        return self._check_write_response_list(response)
+
+    async def get_list(self, record_refs, preferences=None):
+        """Get a list of records by their identifiers.
+
+        Args:
+            record_refs: List of record references to get
+            preferences: General preferences (optional)
+
+        Returns:
+            Response body with the readResponseList
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.getList(
+            baseRef=record_refs,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        if not response.body.readResponseList.status.isSuccess:
+            raise Exception(response.body.readResponseList.status)
+
+        return response.body
+
+    async def get_values_for_field(self, record_type, field, preferences=None):
+        """Get all eligible values for a particular field description."""
+        preferences = preferences or self.preferences
+        await self.service.getSelectValue(
+            fieldDescription=self.models.Core.GetSelectValueFieldDescription(
+                recordType=record_type,
+                field=field),
+            pageIndex=1,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        raise NotImplementedError("Not implemented")
+
+    async def get_deleted(self, get_deleted_filter, page_index=1, preferences=None):
+        """Get a page of the records deleted that match a filter.
+
+        Args:
+            get_deleted_filter: Instance of GetDeletedFilter (e.g. by type and deleted date)
+            page_index: Index of the page to fetch (optional)
+            preferences: General preferences (optional)
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Instance of a GetDeletedResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.getDeleted(
+            getDeletedFilter=get_deleted_filter,
+            pageIndex=page_index,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        get_deleted_result = response.body.getDeletedResult
+        if not get_deleted_result.status.isSuccess:
+            raise Exception(get_deleted_result.status)
+
+        return get_deleted_result
+
+    async def get_server_time(self):
+        """Get the current date and time of the Netsuite server.
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Datetime of the server
+        """
+        response = await self.service.getServerTime(_soapheaders=self._build_soap_headers())
+
+        get_server_time_result = response.body.getServerTimeResult
+        if not get_server_time_result.status.isSuccess:
+            raise Exception(get_server_time_result.status)
+
+        return get_server_time_result.serverTime
+
+    async def async_add_list(self, record, preferences=None):
+        """Add a list of new entities record asynchronously.
+
+        Args:
+            record: List of new record entities to add
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.asyncAddList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return self._check_async_status_result(response)
+
+    async def async_update_list(self, record, preferences=None):
+        """Update a list of record asynchronously.
+
+        Args:
+            record: List of record to update
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.asyncUpdateList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(record)
+
+        return self._check_async_status_result(response)
+
+    async def async_upsert_list(self, record, preferences=None):
+        """Upsert a list of record asynchronously.
+
+        Args:
+            record: List of record to upsert
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.asyncUpsertList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(record)
+
+        return self._check_async_status_result(response)
+
+    async def async_initialize_list(self, record, preferences=None):
+        """Initialize a list of record asynchronously.
+
+        Args:
+            record: List of record to initialize
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.asyncInitializeList(
+            record=record,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return self._check_async_status_result(response)
+
+    async def async_delete_list(self, names, reason=None, preferences=None):
+        """Delete a list of entity record asynchronously.
+
+        Args:
+            names: List of references to record to delete
+            reason: Justification for deleting the record (optional)
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.asyncDeleteList(
+            baseRef=names,
+            deletionReason=reason,
+            _soapheaders=self._build_soap_headers(preferences))
+        self._invalidate_cached_records(names)
+
+        return self._check_async_status_result(response)
+
+    async def check_async_status(self, job_id, preferences=None):
+        """Check the execution status of an asynchronous job.
+
+        Args:
+            job_id: Asynchronous job identifier
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncStatusResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.checkAsyncStatus(
+            jobId=job_id,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return response.body.asyncStatusResult
+
+    async def get_async_result(self, job_id, page_index=1, preferences=None):
+        """Get a page of the result of an asynchronous job.
+
+        Args:
+            job_id: Asynchronous job identifier
+            page_index: Index of the result page to fetch (optional)
+            preferences: General preferences (optional)
+
+        Returns:
+            Instance of an AsyncResult
+        """
+        preferences = preferences or self.preferences
+        response = await self.service.getAsyncResult(
+            jobId=job_id,
+            pageIndex=page_index,
+            _soapheaders=self._build_soap_headers(preferences))
+
+        return response.body.asyncResult
+
+    @staticmethod
+    def _check_write_response(response):
+        """Check a single write response.
+
+        Throws:
+            Exception if not successful
+        """
+        if not response.body.writeResponse.status.isSuccess:
+            raise Exception(response.body.writeResponse.status)
+
+        return response.body.writeResponse
+
+    @staticmethod
+    def _check_write_response_list(response):
+        """Check a list write response.
+
+        Throws:
+            Exception if not successful
+        """
+        if not response.body.writeResponseList.status.isSuccess:
+            raise Exception(response.body.writeResponseList.status)
+
+        return response.body.writeResponseList.writeResponse
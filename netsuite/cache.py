@@ -0,0 +1,406 @@
+"""Caches.
+
+RecordCache is a read-through cache of records for the client.
+
+The remaining caches hold WSDL and XSD documents for the SOAP transport. Besides zeep's SQLite
+cache, documents may be kept in an in-process LRU cache, optionally backed by a read-only
+memory-mapped file. The memory-mapped file is built once (e.g. when building a container
+image) and is shared by every worker process on the host through the page cache, without any
+locking::
+
+    python -m netsuite.cache WSDL_URL PATH
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+from zeep import Client
+from zeep.cache import Base, SqliteCache
+from zeep.transports import Transport
+
+LOGGER = logging.getLogger(__name__)
+
+# Header of memory-mapped cache files: magic, format version and size of the index
+MMAP_CACHE_MAGIC = b'NSWC'
+MMAP_CACHE_FORMAT_VERSION = 1
+MMAP_CACHE_HEADER = struct.Struct('>4sIQ')
+
+DEFAULT_MEMORY_CACHE_MAXSIZE = 256
+
+_SHARED_CACHES = {}
+_SHARED_CACHES_LOCK = threading.Lock()
+
+
+class InMemoryCache(Base):
+    """Thread safe in-process LRU cache."""
+
+    def __init__(self, maxsize=DEFAULT_MEMORY_CACHE_MAXSIZE, timeout=None):
+        """Constructor.
+
+        Args:
+            maxsize: Maximum number of documents to keep or None for no limit (optional)
+            timeout: Seconds after which a document expires or None to never expire (optional)
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, url, content):
+        with self._lock:
+            self._documents.pop(url, None)
+            self._documents[url] = (time.time(), content)
+            if self.maxsize is not None:
+                while len(self._documents) > self.maxsize:
+                    self._documents.popitem(last=False)
+
+    def get(self, url):
+        with self._lock:
+            item = self._documents.pop(url, None)
+            if item is None:
+                return None
+            created_at, content = item
+            if self.timeout is not None and time.time() - created_at > self.timeout:
+                return None
+            # Move the document to the most recently used position
+            self._documents[url] = item
+            return content
+
+    def items(self):
+        """Get a snapshot of the cached documents.
+
+        Returns:
+            List of (url, content) tuples
+        """
+        with self._lock:
+            return [(url, content) for url, (_, content) in self._documents.items()]
+
+
+class MmapCache(Base):
+    """Read-only cache backed by a memory-mapped file."""
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path: Path of a file written by write_mmap_cache
+        """
+        self.path = path
+        self._index = {}
+        self._mmap = None
+        if not os.path.exists(path):
+            LOGGER.warning('Memory-mapped cache %s does not exist', path)
+            return
+
+        with open(path, 'rb') as cache_file:
+            self._mmap = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, index_size = MMAP_CACHE_HEADER.unpack_from(self._mmap, 0)
+        if magic != MMAP_CACHE_MAGIC or format_version != MMAP_CACHE_FORMAT_VERSION:
+            raise Exception("Invalid memory-mapped cache file {}".format(path))
+
+        index_start = MMAP_CACHE_HEADER.size
+        self._index = json.loads(self._mmap[index_start:index_start + index_size].decode('utf-8'))
+
+    def add(self, url, content):
+        # Read-only, documents are only written by write_mmap_cache
+        pass
+
+    def get(self, url):
+        location = self._index.get(url)
+        if location is None:
+            return None
+        offset, size = location
+        return self._mmap[offset:offset + size]
+
+    def close(self):
+        """Unmap the file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._index = {}
+
+
+class TieredCache(Base):
+    """Cache that looks documents up in a sequence of caches.
+
+    Documents found in a later cache are promoted to the earlier ones, while new documents
+    are added to every cache (read-only caches ignore them).
+    """
+
+    def __init__(self, caches):
+        """Constructor.
+
+        Args:
+            caches: List of caches ordered from the fastest to the slowest
+        """
+        self.caches = caches
+
+    def add(self, url, content):
+        for cache in self.caches:
+            cache.add(url, content)
+
+    def get(self, url):
+        for index, cache in enumerate(self.caches):
+            content = cache.get(url)
+            if content is not None:
+                for faster_cache in self.caches[:index]:
+                    faster_cache.add(url, content)
+                return content
+        return None
+
+
+class RecordCache(object):
+    """Thread safe LRU cache of records keyed by record type and internal identifier.
+
+    Entries expire after a time to live that may be set per record type. Cached records are
+    shared by every caller, so they must be treated as read-only.
+    """
+
+    DEFAULT_MAXSIZE = 4096
+
+    # Seconds after which a cached record expires
+    DEFAULT_TTL = 300
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, default_ttl=DEFAULT_TTL, ttls=None):
+        """Constructor.
+
+        Args:
+            maxsize: Maximum number of records to keep or None for no limit (optional)
+            default_ttl: Default time to live in seconds, None to never expire (optional)
+            ttls: Dictionary of time to live per record type; 0 disables caching (optional)
+        """
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(record_type, internal_id):
+        return record_type, str(internal_id)
+
+    def get_ttl(self, record_type):
+        """Get the time to live of a record type.
+
+        Args:
+            record_type: Type of record
+
+        Returns:
+            Time to live in seconds or None to never expire
+        """
+        return self.ttls.get(record_type, self.default_ttl)
+
+    def get(self, record_type, internal_id):
+        """Get a cached record.
+
+        Args:
+            record_type: Type of record
+            internal_id: Record internal identifier
+
+        Returns:
+            The cached record or None if it is not cached or expired
+        """
+        key = self._get_key(record_type, internal_id)
+        with self._lock:
+            item = self._records.pop(key, None)
+            if item is None:
+                return None
+            expires_at, record = item
+            if expires_at is not None and time.time() >= expires_at:
+                return None
+            # Move the record to the most recently used position
+            self._records[key] = item
+            return record
+
+    def set(self, record_type, internal_id, record):
+        """Cache a record.
+
+        Args:
+            record_type: Type of record
+            internal_id: Record internal identifier
+            record: Record to cache
+        """
+        ttl = self.get_ttl(record_type)
+        if ttl == 0:
+            return
+
+        expires_at = time.time() + ttl if ttl is not None else None
+        key = self._get_key(record_type, internal_id)
+        with self._lock:
+            self._records.pop(key, None)
+            self._records[key] = (expires_at, record)
+            if self.maxsize is not None:
+                while len(self._records) > self.maxsize:
+                    self._records.popitem(last=False)
+
+    def invalidate(self, record_type=None, internal_id=None):
+        """Drop cached records.
+
+        Args:
+            record_type: Type of the records to drop or None for all types (optional)
+            internal_id: Internal identifier of the records to drop or None for all (optional)
+        """
+        with self._lock:
+            if record_type is not None and internal_id is not None:
+                self._records.pop(self._get_key(record_type, internal_id), None)
+                return
+
+            internal_id = str(internal_id) if internal_id is not None else None
+            for key in list(self._records):
+                if (record_type is None or key[0] == record_type) and \
+                        (internal_id is None or key[1] == internal_id):
+                    del self._records[key]
+
+    def invalidate_record(self, record):
+        """Drop the cached copy of a record or of the record a RecordRef points to.
+
+        Args:
+            record: zeep record or RecordRef instance
+        """
+        internal_id = getattr(record, 'internalId', None)
+        if internal_id is None:
+            return
+        self.invalidate(get_record_type(record), internal_id)
+
+    def clear(self):
+        """Drop all cached records."""
+        with self._lock:
+            self._records.clear()
+
+
+def get_record_type(record):
+    """Get the record type (e.g. "employee") of a zeep record or RecordRef instance.
+
+    Args:
+        record: zeep record or RecordRef instance
+
+    Returns:
+        Record type or None if it cannot be determined
+    """
+    xsd_type = getattr(record, '_xsd_type', None)
+    type_name = getattr(xsd_type, 'name', None)
+    if type_name in (None, 'RecordRef', 'ListOrRecordRef'):
+        return getattr(record, 'type', None)
+    return type_name[0].lower() + type_name[1:]
+
+
+def write_mmap_cache(path, documents):
+    """Write documents to a file that can be loaded by MmapCache.
+
+    The file is written to a temporary file which is then renamed, so that processes which
+    already mapped the previous file keep reading consistent data.
+
+    Args:
+        path: Path of the cache file
+        documents: Iterable of (url, content) tuples
+    """
+    documents = [(url, content) for url, content in documents]
+    index = {}
+    offset = 0
+    for url, content in documents:
+        index[url] = [offset, len(content)]
+        offset += len(content)
+
+    # Offsets are made absolute once the size of the index is known
+    index_size = len(json.dumps(index).encode('utf-8'))
+    while True:
+        data_start = MMAP_CACHE_HEADER.size + index_size
+        absolute_index = dict(
+            (url, [data_start + offset, size]) for url, (offset, size) in index.items())
+        encoded_index = json.dumps(absolute_index).encode('utf-8')
+        if len(encoded_index) == index_size:
+            break
+        index_size = len(encoded_index)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            cache_file.write(MMAP_CACHE_HEADER.pack(
+                MMAP_CACHE_MAGIC, MMAP_CACHE_FORMAT_VERSION, index_size))
+            cache_file.write(encoded_index)
+            for _, content in documents:
+                cache_file.write(content)
+        os.rename(temporary_path, path)
+    except Exception:
+        os.remove(temporary_path)
+        raise
+
+    LOGGER.info('Wrote %d documents to memory-mapped cache %s', len(documents), path)
+
+
+def build_mmap_cache(wsdl_url, path, session=None):
+    """Load a WSDL with all its XSDs and write them to a memory-mapped cache file.
+
+    Args:
+        wsdl_url: URL of the WSDL
+        path: Path of the cache file
+        session: HTTP session used to load the documents (optional)
+    """
+    memory_cache = InMemoryCache(maxsize=None)
+    Client(wsdl_url, transport=Transport(cache=memory_cache, session=session))
+    write_mmap_cache(path, memory_cache.items())
+
+
+def build_cache(config):
+    """Build a WSDL and XSD document cache from its configuration.
+
+    The "backend" key selects the cache:
+        - "sqlite" (default): zeep SqliteCache with "path" and "timeout"
+        - "memory": InMemoryCache with "maxsize" and "timeout"
+        - "mmap": InMemoryCache with "maxsize" in front of a MmapCache with "path"
+
+    In-process caches are shared by every client with the same configuration.
+
+    Args:
+        config: Dictionary with the cache configuration
+
+    Returns:
+        Cache instance
+    """
+    config = dict(config)
+    backend = config.pop('backend', 'sqlite')
+    if backend == 'sqlite':
+        return SqliteCache(**config)
+
+    key = (backend, tuple(sorted(config.items())))
+    with _SHARED_CACHES_LOCK:
+        cache = _SHARED_CACHES.get(key)
+        if cache is not None:
+            return cache
+
+        maxsize = config.get('maxsize', DEFAULT_MEMORY_CACHE_MAXSIZE)
+        if backend == 'memory':
+            cache = InMemoryCache(maxsize=maxsize, timeout=config.get('timeout'))
+        elif backend == 'mmap':
+            cache = TieredCache([InMemoryCache(maxsize=maxsize), MmapCache(config['path'])])
+        else:
+            raise Exception("Unsupported cache backend {}".format(backend))
+
+        _SHARED_CACHES[key] = cache
+        return cache
+
+
+def main(argv=None):
+    """Build a memory-mapped cache file from the command line."""
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        sys.stderr.write('Usage: python -m netsuite.cache WSDL_URL PATH\n')
+        return 1
+
+    build_mmap_cache(*argv)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,20 +3,29 @@
 import time
 import hashlib
 import hmac
-import uuid
 import base64
+import binascii
 import os
+import threading
+import weakref
 
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import logging
 
 from zeep import Client
-from zeep.cache import SqliteCache
-from zeep.transports import Transport
 import zeep.helpers
 
 from .api.types import AsyncStatusType, SignatureAlgorithm
+from .cache import build_cache
+from .coalesce import get_record_key, merge_records
+from .governor import GovernedService
+from .poller import AsyncJobPoller, get_write_responses
+from .results import REQUEST_NOT_SENT_CODE, RETRYABLE_ERROR_CODES, map_request_failure, map_write_responses
+from .serializers import CompiledSerializer, estimate_soap_size
+from .transport import build_transport
+from . import snapshot
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,6 +33,9 @@ DEFAULT_HASH_ALGORITHM = 'sha256'
 
 ALLOWED_HASH_ALGORITHMS = ['sha1', 'sha256']
 
+# Number of random bytes in a nonce (hex encoded to twice as many characters)
+NONCE_SIZE = 20
+
 HASH_ALGORITHM_NAMES_MAP = {
     'sha1': SignatureAlgorithm.HMAC_SHA1,
     'sha256': SignatureAlgorithm.HMAC_SHA256
@@ -165,7 +177,20 @@ def parse_api_config(config={}):
 
 def generate_nonce():
     """Generate a nonce to be used with OAuth."""
-    return ''.join([uuid.uuid1().hex, uuid.uuid4().hex])
+    return binascii.hexlify(os.urandom(NONCE_SIZE)).decode()
+
+def parse_wsdl_version(wsdl_url):
+    """Extract the web services version from a WSDL URL.
+
+    Args:
+        wsdl_url: URL of the WSDL (e.g. https://webservices.netsuite.com/wsdl/v2016_2_0/netsuite.wsdl)
+    Returns:
+        Tuple with the version parts (e.g. ('2016', '2'))
+    """
+    return tuple(
+        value
+        for value in wsdl_url.split('/')[-2][1:].split('_')
+        if value != '0')
 
 def generate_namespace_prefixes(version):
     """Generate namespace alias.
@@ -180,11 +205,100 @@ def generate_namespace_prefixes(version):
         for alias, template in NAMESPACE_ALIAS_TEMPLATES.items()
     }
 
+class TokenPassportSigner(object):
+    """Build signed token passports for a given TokenPassport config.
+
+    Everything that does not change between requests (hash implementation, signing key,
+    base string prefix and SOAP types) is computed once so that signing a request only
+    costs a nonce, a timestamp and an HMAC.
+    """
+
+    def __init__(self, passport, models):
+        """Constructor.
+
+        Args:
+            passport: TokenPassport config
+            models: Model wrapper used to resolve the SOAP types
+        """
+        hash_algorithm_name = passport.hash_algorithm or DEFAULT_HASH_ALGORITHM
+        if hash_algorithm_name not in HASH_ALGORITHM_NAMES_MAP:
+            raise Exception('Hash algorithm {} not supported'.format(
+                hash_algorithm_name))
+        if hash_algorithm_name not in hashlib.algorithms_available:
+            raise Exception('Hash algorithm {} not available'.format(
+                hash_algorithm_name))
+
+        self.passport = passport
+        self.algorithm = HASH_ALGORITHM_NAMES_MAP[hash_algorithm_name]
+        key = '&'.join([passport.consumer_secret, passport.token_secret])
+        # Keyed HMAC which is copied for every signature instead of being re-keyed
+        self.hmac = hmac.new(key.encode(), digestmod=getattr(hashlib, hash_algorithm_name))
+        self.base_string_prefix = '&'.join(
+            [passport.account, passport.consumer_key, passport.token_id, ''])
+        self.token_passport_signature_type = models.Core.TokenPassportSignature
+        self.token_passport_type = models.Core.TokenPassport
+
+    def sign(self, nonce=None, timestamp=None):
+        """Create a signed token passport.
+
+        Args:
+            nonce: Nonce to use (optional)
+            timestamp: Timestamp in seconds to use (optional)
+
+        Returns:
+            Instance of TokenPassport
+        """
+        nonce = nonce or generate_nonce()
+        timestamp = timestamp or int(round(time.time()))
+        base_string = ''.join([self.base_string_prefix, nonce, '&', str(timestamp)])
+        signature_hash = self.hmac.copy()
+        signature_hash.update(base_string.encode())
+        signature = base64.b64encode(signature_hash.digest()).decode()
+        token_passport_signature = self.token_passport_signature_type(
+            signature,
+            algorithm=self.algorithm
+        )
+        return self.token_passport_type(
+            account=self.passport.account,
+            consumerKey=self.passport.consumer_key,
+            token=self.passport.token_id,
+            nonce=nonce,
+            timestamp=timestamp,
+            signature=token_passport_signature)
+
+
 class NetsuiteApiClient(object):
     """ Abstract requests made to Oracle Netsuite Web Services."""
 
+    class TypeFactory(object):
+        """Type factory for a namespace which caches the types it resolves."""
+
+        def __init__(self, factory):
+            """Constructor.
+
+            Args:
+                factory: zeep type factory for the namespace
+            """
+            self._factory = factory
+
+        def __getattr__(self, name):
+            if name.startswith('_'):
+                raise AttributeError(name)
+
+            type_class = getattr(self._factory, name)
+            # Store the type on the instance so that __getattr__ is skipped next time
+            setattr(self, name, type_class)
+            return type_class
+
+        def __getitem__(self, name):
+            return self.__getattr__(name)
+
     class ModelWrapper(object):
-        """Model wrapper."""
+        """Model wrapper.
+
+        Resolved types and namespace factories are cached per client, so that accessing
+        client.models.X only walks the schema the 1st time.
+        """
 
         def __init__(self, netsuite_api_client, types_aliases=None):
             """Constructor.
@@ -195,6 +309,8 @@ class NetsuiteApiClient(object):
             """
             self.netsuite_api_client = netsuite_api_client
             self.types_aliases = types_aliases
+            self.types_cache = {}
+            self.factories_cache = {}
 
         def get_type(self, type_name):
             """Get the class object to create new instances of a given type name.
@@ -205,14 +321,60 @@ class NetsuiteApiClient(object):
             Returns:
                 Class object to create instances of the given type name
             """
+            type_class = self.types_cache.get(type_name)
+            if type_class is not None:
+                return type_class
+
+            resolved_type_name = type_name
             if self.types_aliases and type_name in self.types_aliases:
-                type_name = self.types_aliases[type_name]
+                resolved_type_name = self.types_aliases[type_name]
 
-            return self.netsuite_api_client.client.get_type(type_name)
+            type_class = self.netsuite_api_client.client.get_type(resolved_type_name)
+            self.types_cache[type_name] = type_class
+            return type_class
+
+        def get_factory(self, namespace):
+            """Get a factory to generate types of a given namespace.
+
+            Args:
+                namespace: Namespace prefix or URI
+
+            Returns:
+                Type factory instance for the given namespace
+            """
+            factory = self.factories_cache.get(namespace)
+            if factory is None:
+                factory = self.factories_cache[namespace] = NetsuiteApiClient.TypeFactory(
+                    self.netsuite_api_client.client.type_factory(namespace))
+            return factory
+
+        def preload(self, type_names):
+            """Resolve a set of types ahead of their first use.
+
+            Args:
+                type_names: Names of the types to resolve
+            """
+            for type_name in type_names:
+                self.get_type(type_name)
+
+        def invalidate(self, type_name=None):
+            """Drop cached types, e.g. after the SOAP client schema changed.
+
+            Args:
+                type_name: Name of the type to drop or None to drop all types and factories
+            """
+            if type_name is None:
+                self.types_cache.clear()
+                self.factories_cache.clear()
+            else:
+                self.types_cache.pop(type_name, None)
 
         def __getattr__(self, name):
+            if name.startswith('_'):
+                raise AttributeError(name)
+
             if name in self.netsuite_api_client.namespace_prefixes:
-                return self.netsuite_api_client.client.type_factory(name)
+                return self.get_factory(name)
 
             return self.get_type(name)
 
@@ -235,12 +397,28 @@ class NetsuiteApiClient(object):
         "runServerSuiteScriptAndTriggerWorkflows": True
     }
 
+    # Attributes that are only set once the client is initialized
+    LAZY_ATTRIBUTES = frozenset([
+        'client',
+        'service',
+        'application_info',
+        'search_preferences',
+        'preferences'
+    ])
+
+    # Default number of search pages to fetch concurrently (1 means sequentially)
+    DEFAULT_SEARCH_MAX_WORKERS = 1
+
     DEFAULT_SOAP_CLIENT_CONFIG = {
+        # WSDL and XSD cache (see netsuite.cache.build_cache for the other backends)
         'cache': {
+            'backend': 'sqlite',
             'path': '/tmp/sqlite.db',
             # cache WSDL and XSD for a year (60*60*24*365)
             'timeout': 31536000,
-        }
+        },
+        # Pooled keep-alive HTTP transport (see netsuite.transport.DEFAULT_TRANSPORT_CONFIG)
+        'transport': {}
     }
 
     def __init__(
@@ -249,56 +427,120 @@ class NetsuiteApiClient(object):
             soap_client_config=None,
             serialize_object_class=dict,
             search_preferences=None,
-            preferences=None):
+            preferences=None,
+            search_max_workers=None,
+            lazy=False,
+            record_cache=None,
+            governor=None):
         """Constructor.
 
         Args:
             api_config: Dictionary with information on how to connect to the Netsuite API
-            soap_client_config: SOAP client configuration (optional)
-            serialize_object_class: Class to use for serializing returned objects (optional)
+            soap_client_config: SOAP client configuration (optional).
+                Besides "cache" and "typesAliases", accepts "transport" with the HTTP
+                connection pool settings, "session" with an HTTP session to share,
+                "preloadTypes" with the names of the types to resolve upfront and
+                "snapshot" with the "path" or "directory" of a precompiled WSDL snapshot
+            serialize_object_class: Class to use for serializing returned objects or a
+                CompiledSerializer instance (optional)
             search_preferences: Default search preferences to use (optional)
             preferences: Default general preferences to use (optional)
+            search_max_workers: Maximum number of search pages to fetch concurrently (optional)
+            lazy: Whether to defer loading the WSDL until the 1st operation (optional)
+            record_cache: RecordCache used by get_record_by_type (optional)
+            governor: ConcurrencyGovernor limiting the requests sent to the account (optional)
         """
-        # cache WSDL and XSD for a year
         self.api_config = api_config
         self.soap_client_config = soap_client_config or self.DEFAULT_SOAP_CLIENT_CONFIG
-        cache = None
-        if 'cache' in self.soap_client_config:
-            cache = SqliteCache(**self.soap_client_config.get('cache'))
-
-        transport = Transport(cache=cache)
-        self.client = Client(self.api_config.wsdl_url, transport=transport)
 
         # Extract WS version
-        version = tuple(
-            value
-            for value in self.api_config.wsdl_url.split('/')[-2][1:].split('_')
-            if value != '0')
-
-        # Register namespace alias
+        version = parse_wsdl_version(self.api_config.wsdl_url)
         self.namespace_prefixes = generate_namespace_prefixes(version)
-        for prefix, namespace in self.namespace_prefixes.items():
-            self.client.set_ns_prefix(prefix, namespace)
-
-        # Alias for the relevant WSDL service to use
-        self.service = self.client.service
 
         types_aliases = self.soap_client_config.get("typesAliases", None)
         self.model_wrapper = self.ModelWrapper(
             self,
             types_aliases)
 
-        self.application_info = self.models.Messages.ApplicationInfo(applicationId=api_config.application_id)
-
-        self.search_preferences = self.models.Messages.SearchPreferences(
-            **(search_preferences if search_preferences else self.DEFAULT_SEARCH_PREFERENCES_PARAMS))
-        self.preferences = self.models.Messages.Preferences(
-            **preferences) if preferences else self.models.Messages.Preferences(**self.DEFAULT_PREFERENCES_PARAMS)
+        self.search_preferences_params = search_preferences or self.DEFAULT_SEARCH_PREFERENCES_PARAMS
+        self.preferences_params = preferences or self.DEFAULT_PREFERENCES_PARAMS
 
         # Specify the class to be used when serializing objects
         self.serialize_object_class = serialize_object_class
+        self.search_max_workers = search_max_workers or self.DEFAULT_SEARCH_MAX_WORKERS
+        self.record_cache = record_cache
+        self.governor = governor
+        self.record_loader = None
+        # RecordMirror serving reference records locally (see netsuite.mirror)
+        self.mirror = None
+        # Built on the 1st token passport request
+        self.token_passport_signer = None
         self.logged_in = False
 
+        self.initialized = False
+        self.initialize_lock = threading.Lock()
+        if not lazy:
+            self.initialize()
+
+    def initialize(self):
+        """Load the WSDL and build the default objects used on requests.
+
+        Called by the constructor unless the client is lazy, in which case it is called on
+        the 1st access to any of the LAZY_ATTRIBUTES. Calling it more than once has no effect.
+        """
+        with self.initialize_lock:
+            if self.initialized:
+                return
+
+            cache = None
+            if 'cache' in self.soap_client_config:
+                # Cache WSDL and XSD documents
+                cache = build_cache(self.soap_client_config.get('cache'))
+
+            transport = self._build_transport(cache)
+            client = self._build_soap_client(transport)
+            self.client = client
+
+            # Alias for the relevant WSDL service to use
+            self.service = client.service
+            if self.governor is not None:
+                self.service = self._govern_service(client.service)
+
+            self.model_wrapper.preload(self.soap_client_config.get("preloadTypes", []))
+
+            self.application_info = self.models.Messages.ApplicationInfo(
+                applicationId=self.api_config.application_id)
+
+            # Keep the preferences which were set before the client was initialized
+            if 'search_preferences' not in self.__dict__:
+                self.search_preferences = self.models.Messages.SearchPreferences(
+                    **self.search_preferences_params)
+            if 'preferences' not in self.__dict__:
+                self.preferences = self.models.Messages.Preferences(**self.preferences_params)
+
+            self.initialized = True
+
+    def warm_up(self, type_names=None, connect=True):
+        """Prepare the client ahead of traffic.
+
+        Args:
+            type_names: Names of the types to resolve upfront (optional)
+            connect: Whether to open a connection to the service endpoint (optional)
+        """
+        self.initialize()
+        self.model_wrapper.preload(type_names or [])
+        if connect:
+            self._open_connection()
+
+    def _open_connection(self):
+        """Open a keep-alive connection to the service endpoint so that it is pooled."""
+        address = self.service._binding_options['address']
+        transport = self.client.transport
+        try:
+            transport.session.head(address, timeout=transport.operation_timeout)
+        except Exception:
+            LOGGER.warning('Could not open a connection to %s', address, exc_info=True)
+
     def __getattr__(self, property_name):
         """Get a computed property by it's name.
 
@@ -311,8 +553,79 @@ class NetsuiteApiClient(object):
         if property_name == 'models':
             return self.model_wrapper
 
+        # Attributes of a lazy client are only available once it is initialized
+        if property_name in self.LAZY_ATTRIBUTES and not self.__dict__.get('initialized', True):
+            self.initialize()
+            return getattr(self, property_name)
+
         raise Exception("Property name {} does not exist".format(property_name))
 
+    def _build_transport(self, cache=None):
+        """Build the transport used by the SOAP client.
+
+        Args:
+            cache: Cache for WSDL and XSD documents (optional)
+
+        The "transport" key of the SOAP client configuration sizes the connection pool and
+        sets the timeouts, while the "session" key injects an existing HTTP session so that
+        it can be shared by many clients.
+
+        Returns:
+            Instance of a zeep transport
+        """
+        return build_transport(
+            cache,
+            self.soap_client_config.get('transport'),
+            self.soap_client_config.get('session'))
+
+    def _govern_service(self, service):
+        """Wrap the WSDL service so that every operation goes through the governor.
+
+        Args:
+            service: zeep service proxy
+
+        Returns:
+            GovernedService instance
+        """
+        return GovernedService(service, self.governor)
+
+    def _build_soap_client(self, transport):
+        """Build the SOAP client and register the namespace alias.
+
+        When the "snapshot" key of the SOAP client configuration is set, the client is
+        loaded from a precompiled snapshot of the WSDL if a valid one exists. Otherwise the
+        WSDL is parsed and, if "autoBuild" is enabled, a snapshot is saved for next time.
+
+        Args:
+            transport: Transport to be used by the SOAP client
+
+        Returns:
+            zeep SOAP client
+        """
+        wsdl_url = self.api_config.wsdl_url
+        snapshot_config = self.soap_client_config.get('snapshot')
+        snapshot_path = None
+        if snapshot_config:
+            snapshot_path = snapshot_config.get('path') or snapshot.get_snapshot_path(
+                snapshot_config['directory'], wsdl_url)
+            client = snapshot.load_snapshot(snapshot_path, wsdl_url, transport)
+            if client is not None:
+                return client
+
+        client = Client(wsdl_url, transport=transport)
+
+        # Register namespace alias
+        for prefix, namespace in self.namespace_prefixes.items():
+            client.set_ns_prefix(prefix, namespace)
+
+        if snapshot_path and snapshot_config.get('autoBuild', False):
+            try:
+                snapshot.save_snapshot(client, snapshot_path, wsdl_url)
+            except Exception:
+                LOGGER.warning('Could not save WSDL snapshot %s', snapshot_path, exc_info=True)
+
+        return client
+
     def _make_token_passport(self, passport):
         """Create a token passport.
 
@@ -322,34 +635,11 @@ class NetsuiteApiClient(object):
         Returns:
             Instance of TokenPassport
         """
-        nonce = generate_nonce()
+        signer = self.token_passport_signer
+        if signer is None or signer.passport is not passport:
+            signer = self.token_passport_signer = TokenPassportSigner(passport, self.models)
 
-        timestamp = int(round(time.time()))
-        hash_algorithm_name = self.api_config.passport.hash_algorithm or DEFAULT_HASH_ALGORITHM
-        if hash_algorithm_name not in HASH_ALGORITHM_NAMES_MAP:
-            raise Exception('Hash algorithm {} not supported'.format(
-                hash_algorithm_name))
-        if hash_algorithm_name not in hashlib.algorithms_available:
-            raise Exception('Hash algorithm {} not available'.format(
-                hash_algorithm_name))
-        hash_algorithm_impl = getattr(hashlib, hash_algorithm_name)
-        base_string = '&'.join(
-            [passport.account, passport.consumer_key, passport.token_id, nonce, str(timestamp)])
-        key = '&'.join([passport.consumer_secret, passport.token_secret])
-        signature_hash = hmac.new(key.encode(), base_string.encode(), hash_algorithm_impl)
-        signature = base64.b64encode(signature_hash.digest()).decode()
-        token_passport_signature = self.models.Core.TokenPassportSignature(
-            signature,
-            algorithm=HASH_ALGORITHM_NAMES_MAP[hash_algorithm_name]
-        )
-        token_passport = self.models.Core.TokenPassport(
-            account=passport.account,
-            consumerKey=passport.consumer_key,
-            token=passport.token_id,
-            nonce=nonce,
-            timestamp=timestamp,
-            signature=token_passport_signature)
-        return token_passport
+        return signer.sign()
 
     def _make_passport(self, passport):
         """Create a passport instance to be used on requests.
@@ -402,7 +692,7 @@ class NetsuiteApiClient(object):
             Type factory instance for the given namespace
         """
 
-        return self.client.type_factory(namespace)
+        return self.model_wrapper.get_factory(namespace)
 
     def login(self):
         """Perform a user login."""
@@ -458,6 +748,22 @@ class NetsuiteApiClient(object):
         """
         self.preferences = preferences
 
+    def set_record_loader(self, record_loader):
+        """Change the loader that coalesces single record gets into getList calls.
+
+        Args:
+            record_loader: RecordLoader instance or None to get records one at a time
+        """
+        self.record_loader = record_loader
+
+    def set_mirror(self, mirror):
+        """Change the local mirror used by the helpers called with prefer_local or offline.
+
+        Args:
+            mirror: RecordMirror instance or None to always query Netsuite
+        """
+        self.mirror = mirror
+
     def get_record_by_type(self, record_type, internal_id):
         """Get a single record of a given type based on its internal identifier.
 
@@ -465,24 +771,38 @@ class NetsuiteApiClient(object):
             record_type: Type of record
             internal_id: Internal identificer that matches the instance
 
+        When the client has a record cache, cached records are returned without a request
+        and fetched records are added to the cache. When the client has a record loader,
+        records are fetched by the loader along with the ones requested concurrently.
+
         Returns:
             Instance of the given type that has the given internal identifier or None otherwise
         """
-        record = self.models.Core.RecordRef(internalId=internal_id, type=record_type)
-        soap_headers = self._build_soap_passport_header()
-        response = self.service.get(
-            record,
-            _soapheaders=soap_headers)
-        read_response = response.body.readResponse
-        if not read_response.status.isSuccess:
-            raise Exception(
-                "Could not retrieve Record of type={} with internalId={}".format(
-                    record_type, internal_id))
-
-        if self.serialize_object_class:
-            return zeep.helpers.serialize_object(read_response.record, self.serialize_object_class)
+        if self.record_cache is not None:
+            cached_record = self.record_cache.get(record_type, internal_id)
+            if cached_record is not None:
+                return cached_record
+
+        if self.record_loader is not None:
+            record = self.record_loader.get(record_type, internal_id)
+        else:
+            record = self.models.Core.RecordRef(internalId=internal_id, type=record_type)
+            soap_headers = self._build_soap_passport_header()
+            response = self.service.get(
+                record,
+                _soapheaders=soap_headers)
+            read_response = response.body.readResponse
+            if not read_response.status.isSuccess:
+                raise Exception(
+                    "Could not retrieve Record of type={} with internalId={}".format(
+                        record_type, internal_id))
+
+            record = self._serialize(read_response.record)
+
+        if self.record_cache is not None:
+            self.record_cache.set(record_type, internal_id, record)
 
-        return read_response.record
+        return record
 
     def search(self, search_type, search_preferences=None):
         """Perform a custom search for record on the 1st page using the provided search type instance.
@@ -538,93 +858,188 @@ class NetsuiteApiClient(object):
             _soapheaders=soap_headers
         )
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
+        return self._check_async_status_result(response)
 
-        return response.body.asyncResult
-
-    def search_all(self, search_type, search_preferences=None):
-        """Perform a custom search for all record using the provided search type instance.
+    def search_more_with_id(self, search_id, page_index, search_preferences=None):
+        """Fetch a single page of a previously executed search.
 
         Args:
-            search_type: Instance of a search type describing the filters to be applied
+            search_id: Identifier of the search returned with its 1st page
+            page_index: Index of the page to fetch (1-based)
             search_preferences: Search preferences to use for this search (optional)
 
         Throws:
             Exception if not successful
 
         Returns:
-            List of search result record found
+            Instance of a SearchResult
         """
-
         search_preferences = search_preferences or self.search_preferences
-
-        record = []
-
-        next_page = 1
-
-        LOGGER.debug('Fetching page %d', next_page)
         soap_headers = {
             'searchPreferences': search_preferences,
         }
         soap_headers.update(self._build_soap_passport_header())
-        response = self.service.search(
-            searchRecord=search_type,
+        response = self.service.searchMoreWithId(
+            searchId=search_id,
+            pageIndex=page_index,
             _soapheaders=soap_headers
         )
 
         search_result = response.body.searchResult
 
         if not search_result.status.isSuccess:
-            raise Exception("Search result was not successful")
+            raise Exception("Search result was not successful for page {} {}".format(
+                page_index,
+                search_result.status))
+
+        return search_result
+
+    def search_all(self, search_type, search_preferences=None, max_workers=None):
+        """Perform a custom search for all record using the provided search type instance.
+
+        Once the 1st page is known, the remaining pages are independent from each other so
+        they may be fetched concurrently by a bounded pool of workers. Records are always
+        returned in page order.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            max_workers: Maximum number of pages to fetch concurrently (optional).
+                Defaults to the client search_max_workers; 1 fetches pages sequentially
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            List of search result record found
+        """
+
+        search_preferences = search_preferences or self.search_preferences
+        max_workers = max_workers or self.search_max_workers
+
+        record = []
+
+        LOGGER.debug('Fetching page %d', 1)
+        search_result = self.search(search_type, search_preferences)
 
         if search_result.recordList is None:
             return record
 
-        record = search_result.recordList.record
+        record = list(search_result.recordList.record)
         LOGGER.debug('Found %d of %d record in page %d/%d',
                      len(record),
                      search_result.totalRecords,
-                     next_page,
+                     search_result.pageIndex,
                      search_result.totalPages)
 
-        next_page = search_result.pageIndex + 1
-        while next_page <= search_result.totalPages:
-            LOGGER.debug('Fetching page %d', next_page)
-            # nextSearchType = SearchMoreWithIdRequest(searchId = searchResult.searchId, pageIndex= nextPage)
-            soap_headers.update(self._build_soap_passport_header())
-            response = self.service.searchMoreWithId(
-                searchId=search_result.searchId,
-                pageIndex=next_page,
-                _soapheaders=soap_headers
-            )
-
-            search_result = response.body.searchResult
-
-            if not search_result.status.isSuccess:
-                raise Exception("Search result was not successful for page {} {}".format(
-                    next_page,
-                    search_result.status))
-
-            new_records = search_result.recordList.record
+        search_id = search_result.searchId
+        total_pages = search_result.totalPages
+        remaining_pages = range(search_result.pageIndex + 1, total_pages + 1)
+
+        def fetch_page(page_index):
+            """Fetch the records on a given page of the search."""
+            LOGGER.debug('Fetching page %d', page_index)
+            page_result = self.search_more_with_id(search_id, page_index, search_preferences)
+            new_records = page_result.recordList.record if page_result.recordList else []
+            LOGGER.debug('Found %d of %d records in page %d/%d',
+                         len(new_records),
+                         page_result.totalRecords,
+                         page_index,
+                         total_pages)
+            return new_records
+
+        if max_workers > 1 and len(remaining_pages) > 1:
+            num_workers = min(max_workers, len(remaining_pages))
+            LOGGER.debug('Fetching %d remaining pages with %d workers',
+                         len(remaining_pages),
+                         num_workers)
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                # map() yields the results in the order of the submitted pages
+                for new_records in executor.map(fetch_page, remaining_pages):
+                    record += new_records
+        else:
+            for page_index in remaining_pages:
+                record += fetch_page(page_index)
+
+        LOGGER.info(
+            'Retrieved a total of %d records from the search', len(record))
+
+        return self._serialize_records(record)
+
+    def iter_search(self, search_type, search_preferences=None, serialize=True):
+        """Perform a custom search for all record yielding one page of record at a time.
+
+        Each page is serialized as soon as its response arrives and is not referenced by the
+        client afterwards, so memory usage is bound by the page size instead of the total
+        number of record found.
+
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            serialize: Whether to serialize record using serialize_object_class (optional)
+
+        Throws:
+            Exception if not successful
+
+        Yields:
+            List of search result record found on each page
+        """
+        search_preferences = search_preferences or self.search_preferences
+
+        LOGGER.debug('Fetching page %d', 1)
+        search_result = self.search(search_type, search_preferences)
+
+        if search_result.recordList is None:
+            return
+
+        search_id = search_result.searchId
+        total_pages = search_result.totalPages
+        page_index = search_result.pageIndex
+        total_records = 0
+
+        while True:
+            record = search_result.recordList.record if search_result.recordList else []
+            total_records += len(record)
             LOGGER.debug('Found %d of %d records in page %d/%d',
                          len(record),
                          search_result.totalRecords,
-                         next_page,
-                         search_result.totalPages)
+                         page_index,
+                         total_pages)
+
+            page = self._serialize_records(record) if serialize else record
+
+            # Drop the references to the response so that only the page handed out is kept
+            search_result = record = None
+            yield page
+            page = None
 
-            # Append search result record
-            record += new_records
+            page_index += 1
+            if page_index > total_pages:
+                break
 
-            next_page += 1
+            LOGGER.debug('Fetching page %d', page_index)
+            search_result = self.search_more_with_id(search_id, page_index, search_preferences)
 
         LOGGER.info(
-            'Retrieved a total of %d records from the search', len(record))
+            'Retrieved a total of %d records from the search', total_records)
 
-        if self.serialize_object_class:
-            return [zeep.helpers.serialize_object(zeep_object, self.serialize_object_class) for zeep_object in record]
+    def iter_search_all(self, search_type, search_preferences=None, serialize=True):
+        """Perform a custom search for all record yielding one record at a time.
 
-        return record
+        Args:
+            search_type: Instance of a search type describing the filters to be applied
+            search_preferences: Search preferences to use for this search (optional)
+            serialize: Whether to serialize record using serialize_object_class (optional)
+
+        Throws:
+            Exception if not successful
+
+        Yields:
+            Search result record found
+        """
+        for page in self.iter_search(search_type, search_preferences, serialize):
+            for record in page:
+                yield record
 
     def get_values_for_field(self, record_type, field, preferences=None):
         """Get all eligible values for a particular field description."""
@@ -675,6 +1090,7 @@ class NetsuiteApiClient(object):
             record=record,
             _soapheaders=soap_headers
         )
+        self._invalidate_cached_records(record)
 
         if not response.body.writeResponse.status.isSuccess:
             raise Exception(response.body.writeResponse.status)
@@ -700,6 +1116,7 @@ class NetsuiteApiClient(object):
             record=record,
             _soapheaders=soap_headers
         )
+        self._invalidate_cached_records(record)
 
         if not response.body.writeResponseList.status.isSuccess:
             raise Exception(response.body.writeResponseList.status)
@@ -747,7 +1164,7 @@ class NetsuiteApiClient(object):
         if not response.body.writeResponseList.status.isSuccess:
             raise Exception(response.body.writeResponseList.status)
 
-        return response.writeResponseList.writeResponse
+        return response.body.writeResponseList.writeResponse
 
     def async_add_list(self, record, preferences=None):
         """Add a list of new entities record asynchronously.
@@ -766,12 +1183,9 @@ class NetsuiteApiClient(object):
             record=record,
             _soapheaders=soap_headers)
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
-
-        return response.body.asyncResult
+        return self._check_async_status_result(response)
 
-    def async_delete_list(self, names, reason, preferences=None):
+    def async_delete_list(self, names, reason=None, preferences=None):
         """Delete a list of entitiy record asynchronously.
 
         Args:
@@ -786,14 +1200,12 @@ class NetsuiteApiClient(object):
         soap_headers.update(self._build_soap_passport_header())
 
         response = self.service.asyncDeleteList(
-            base_ref=names,
-            deletion_reason=reason,
+            baseRef=names,
+            deletionReason=reason,
             _soapheaders=soap_headers)
+        self._invalidate_cached_records(names)
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
-
-        return response.body.asyncResult
+        return self._check_async_status_result(response)
 
     def async_initialize_list(self, record, preferences=None):
         """Initialiaze a list of with a list of record.
@@ -812,10 +1224,7 @@ class NetsuiteApiClient(object):
             record=record,
             _soapheaders=soap_headers)
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
-
-        return response.body.asyncResult
+        return self._check_async_status_result(response)
 
     def async_update_list(self, record, preferences=None):
         """Update a list of with a set of record.
@@ -833,11 +1242,9 @@ class NetsuiteApiClient(object):
         response = self.service.asyncUpdateList(
             record=record,
             _soapheaders=soap_headers)
+        self._invalidate_cached_records(record)
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
-
-        return response.body.asyncResult
+        return self._check_async_status_result(response)
 
     def async_upsert_list(self, record, preferences=None):
         """Upsert a list of with a list of record.
@@ -855,11 +1262,9 @@ class NetsuiteApiClient(object):
         response = self.service.asyncUpsertList(
             record=record,
             _soapheaders=soap_headers)
+        self._invalidate_cached_records(record)
 
-        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
-            raise Exception(response.body.asyncStatusResult)
-
-        return response.body.asyncResult
+        return self._check_async_status_result(response)
 
     def check_async_status(self, job_id, preferences=None):
         """Check the execution status of an asynchronous job.
@@ -875,17 +1280,21 @@ class NetsuiteApiClient(object):
         soap_headers.update(self._build_soap_passport_header())
 
         response = self.service.checkAsyncStatus(
-            job_id=job_id,
+            jobId=job_id,
             _soapheaders=soap_headers)
 
-        return response.body.asyncResult
+        return response.body.asyncStatusResult
 
     def get_async_result(self, job_id, page_index=1, preferences=None):
-        """Get the result for an asynchronous job.
+        """Get a page of the result of an asynchronous job.
 
         Args:
             job_id: Asynchronous job identifier
+            page_index: Index of the result page to fetch (optional)
             preferences: General preferences
+
+        Returns:
+            Instance of an AsyncResult
         """
         preferences = preferences or self.preferences
         soap_headers = {
@@ -893,12 +1302,28 @@ class NetsuiteApiClient(object):
         }
         soap_headers.update(self._build_soap_passport_header())
 
-        response = self.service.checkAsyncStatus(
-            job_id=job_id,
+        response = self.service.getAsyncResult(
+            jobId=job_id,
+            pageIndex=page_index,
             _soapheaders=soap_headers)
 
         return response.body.asyncResult
 
+    @staticmethod
+    def _check_async_status_result(response):
+        """Check the status of an asynchronous job submission.
+
+        Throws:
+            Exception if the job failed
+
+        Returns:
+            Instance of an AsyncStatusResult with the job identifier
+        """
+        if response.body.asyncStatusResult.status == AsyncStatusType.FAILED:
+            raise Exception(response.body.asyncStatusResult)
+
+        return response.body.asyncStatusResult
+
     def delete(self, base_ref, deletion_reason=None, preferences=None):
         """Delete a record from Oracle's Netsuite.
 
@@ -914,9 +1339,10 @@ class NetsuiteApiClient(object):
         soap_headers.update(self._build_soap_passport_header())
 
         response = self.service.delete(
-            base_ref=base_ref,
-            deletion_reason=deletion_reason,
+            baseRef=base_ref,
+            deletionReason=deletion_reason,
             _soapheaders=soap_headers)
+        self._invalidate_cached_records(base_ref)
 
         if not response.body.writeResponse.status.isSuccess:
             raise Exception(response.body.writeResponse.status)
@@ -938,14 +1364,63 @@ class NetsuiteApiClient(object):
         soap_headers.update(self._build_soap_passport_header())
 
         response = self.service.deleteList(
-            base_ref=base_ref,
-            deletion_reason=deletion_reason,
+            baseRef=base_ref,
+            deletionReason=deletion_reason,
             _soapheaders=soap_headers)
+        self._invalidate_cached_records(base_ref)
 
         if not response.body.writeResponseList.status.isSuccess:
             raise Exception(response.body.writeResponseList.status)
 
-        return response.writeResponseList.writeResponse
+        return response.body.writeResponseList.writeResponse
+
+    def get_deleted(self, get_deleted_filter, page_index=1, preferences=None):
+        """Get a page of the records deleted that match a filter.
+
+        Args:
+            get_deleted_filter: Instance of GetDeletedFilter (e.g. by type and deleted date)
+            page_index: Index of the page to fetch (optional)
+            preferences: General preferences
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Instance of a GetDeletedResult
+        """
+        preferences = preferences or self.preferences
+        soap_headers = {
+            'preferences': preferences,
+        }
+        soap_headers.update(self._build_soap_passport_header())
+
+        response = self.service.getDeleted(
+            getDeletedFilter=get_deleted_filter,
+            pageIndex=page_index,
+            _soapheaders=soap_headers)
+
+        get_deleted_result = response.body.getDeletedResult
+        if not get_deleted_result.status.isSuccess:
+            raise Exception(get_deleted_result.status)
+
+        return get_deleted_result
+
+    def get_server_time(self):
+        """Get the current date and time of the Netsuite server.
+
+        Throws:
+            Exception if not successful
+
+        Returns:
+            Datetime of the server
+        """
+        response = self.service.getServerTime(_soapheaders=self._build_soap_passport_header())
+
+        get_server_time_result = response.body.getServerTimeResult
+        if not get_server_time_result.status.isSuccess:
+            raise Exception(get_server_time_result.status)
+
+        return get_server_time_result.serverTime
 
     def get_list(self, record_refs, preferences=None):
         """Get a list of records by their identifiers.
@@ -961,14 +1436,60 @@ class NetsuiteApiClient(object):
         soap_headers.update(self._build_soap_passport_header())
 
         response = self.service.getList(
-            base_ref=record_refs,
+            baseRef=record_refs,
             _soapheaders=soap_headers)
 
         if not response.body.readResponseList.status.isSuccess:
-            raise Exception(response.body.writeResponse.status)
+            raise Exception(response.body.readResponseList.status)
 
         return response.body
 
+    def _invalidate_cached_records(self, record):
+        """Drop the cached copies of records that are being written.
+
+        Args:
+            record: Record, RecordRef or list of them
+        """
+        if self.record_cache is None:
+            return
+
+        for item in record if isinstance(record, list) else [record]:
+            self.record_cache.invalidate_record(item)
+
+    def _serialize(self, zeep_object):
+        """Serialize a zeep object using the configured serialize object class.
+
+        The serialize object class is either the class of the serialized objects, used
+        with zeep.helpers.serialize_object, or a CompiledSerializer instance.
+
+        Args:
+            zeep_object: Object returned by the SOAP client
+
+        Returns:
+            Serialized object or the object itself if no serialization class is set
+        """
+        if isinstance(self.serialize_object_class, CompiledSerializer):
+            return self.serialize_object_class.serialize(zeep_object)
+
+        if self.serialize_object_class:
+            return zeep.helpers.serialize_object(zeep_object, self.serialize_object_class)
+
+        return zeep_object
+
+    def _serialize_records(self, record):
+        """Serialize a list of zeep objects using the configured serialize object class.
+
+        Args:
+            record: List of objects returned by the SOAP client
+
+        Returns:
+            List of serialized objects
+        """
+        if self.serialize_object_class:
+            return [self._serialize(zeep_object) for zeep_object in record]
+
+        return record
+
     def _build_soap_passport_header(self):
         """Build passport dict."""
         if self.api_config.passport_type == 'tba':
@@ -984,9 +1505,43 @@ class NetsuiteApiClient(object):
             'Unsupported authentication type {}'.format(self.api_config.passport_type))
 
 
+class _QueuedRecord(object):
+    """Record queued by the batch client with its bookkeeping."""
+
+    __slots__ = ('record', 'size', 'attempts', 'key')
+
+    def __init__(self, record, size, attempts=0):
+        self.record = record
+        # Estimated size in bytes
+        self.size = size
+        # Number of times the record failed with a retryable error
+        self.attempts = attempts
+        # Key of the record if writes are coalesced, see get_record_key
+        self.key = None
+
+
 class NetsuiteApiBatchClient(object):
     """Oracle's Netsuite API Batch Client."""
 
+    # Client method executing the batch of each operation category
+    BATCH_METHOD_NAMES = {
+        'add': 'add_list',
+        'update': 'update_list',
+        'delete': 'delete_list'
+    }
+
+    # Client method executing the batch of each operation category as an asynchronous job
+    ASYNC_BATCH_METHOD_NAMES = {
+        'add': 'async_add_list',
+        'update': 'async_update_list',
+        'delete': 'async_delete_list'
+    }
+
+    # Bytes of a request reserved for the SOAP envelope and headers
+    REQUEST_OVERHEAD_SIZE = 16 * 1024
+
+    DEFAULT_ASYNC_POLL_INTERVAL = 5
+
     class BatchableOperation(object):
         """Batchable operation."""
 
@@ -1004,15 +1559,6 @@ class NetsuiteApiBatchClient(object):
         def __call__(self, *args, **kwargs):
             """Call base method."""
 
-            num_queued_operations = len(
-                self.batch_client.queued_operations[self.operation_category])
-
-            should_execute_batch = "record_count" in self.operation_constraints and \
-                num_queued_operations == self.operation_constraints["record_count"]["value"]
-
-            if should_execute_batch:
-                self.batch_client._execute(self.operation_category)
-
             # TODO Currently, not handling disparate preferences
             # preferences = kwargs.pop("preferences", None)
 
@@ -1028,35 +1574,63 @@ class NetsuiteApiBatchClient(object):
                 raise Exception("Property \"{}\" not found and args={} kwargs={}".format(
                     self.property_name, args, kwargs))
 
-            max_record_count = self.operation_constraints["record_count"]["value"]
-            should_execute_batch = "record_count" in self.operation_constraints and \
-                (num_queued_operations + len(record)) >= max_record_count
-
-            if should_execute_batch:
-                num_remaining_batch_records = max_record_count - num_queued_operations
-                if num_remaining_batch_records > 0:
-                    LOGGER.info("Queueing remaining %d records for a total of %d",
-                                num_remaining_batch_records,
-                                max_record_count)
-                    self.batch_client.queued_operations[self.operation_category] += record[:num_remaining_batch_records]
-                    del record[:num_remaining_batch_records]
-
-                self.batch_client._execute(self.operation_category)
-
-            if record:
-                self.batch_client.queued_operations[self.operation_category] += record
-                LOGGER.info("Queued %d record(s) category=%s (%d of %d)",
-                            len(record),
-                            self.operation_category,
-                            num_queued_operations + 1,
-                            max_record_count)
-
-    def __init__(self, governance_model, record_type_predicate=None, last_resort=False, dry_run=False, *args, **kwargs):
+            max_record_count = None
+            if self.operation_constraints and "record_count" in self.operation_constraints:
+                max_record_count = self.operation_constraints["record_count"]["value"]
+            entries = [
+                _QueuedRecord(item, item_size)
+                for item, item_size in zip(record, self.batch_client._estimate_sizes(record))
+            ]
+
+            # Batches are taken from the queue while holding the lock and sent after releasing it
+            with self.batch_client.lock:
+                batches = self.batch_client._take_ready_batches()
+                batches += [
+                    (self.operation_category, batch)
+                    for batch in self.batch_client._enqueue(self.operation_category, entries, max_record_count)
+                ]
+
+            return self.batch_client._send_batches(batches)
+
+    def __init__(self, governance_model, record_type_predicate=None, last_resort=False, dry_run=False,
+                 linger=None, max_queue_age=None, max_workers=None, max_in_flight_per_category=None,
+                 on_batch_complete=None, async_threshold=None, async_poll_interval=None, max_record_retries=3,
+                 retryable_codes=None, dead_letter_sink=None, coalesce=True, *args, **kwargs):
         """Constructor.
 
         Args:
             governance_model: The governance model from which decisions should be based on
             record_type_predicate: Predicate that checks whether a given record type should be batched (optional)
+            last_resort: Whether to execute the pending batches when the client is garbage collected (optional)
+            dry_run: Whether to log batches instead of sending them (optional)
+            linger: Seconds between checks of a background thread flushing partially filled
+                batches. No background flushing takes place if not given (optional)
+            max_queue_age: Maximum seconds a record waits in the queue before its batch is
+                flushed by the background thread. Defaults to linger (optional)
+            max_workers: Maximum number of batches sent concurrently. Batches are sent in the
+                calling thread if not greater than 1 (optional)
+            max_in_flight_per_category: Maximum number of batches of the same operation
+                category sent concurrently. Defaults to max_workers (optional)
+            on_batch_complete: Callable called with the operation category, the records and the
+                future of each batch sent, whose result is the list of RecordResult (optional)
+            async_threshold: Number of records from which batches are sent as asynchronous jobs
+                filled up to the asynchronous record limits. When it is past the synchronous
+                record limit, records are queued until the asynchronous limit is reached and
+                the batches executed below the threshold are split up. Batches are always sent
+                synchronously if not given (optional)
+            async_poll_interval: Seconds before the 1st check of the status of an asynchronous
+                job. Later checks back off exponentially (optional)
+            max_record_retries: Maximum number of times a record failing with a retryable error
+                is queued again (optional)
+            retryable_codes: Error codes of the records queued again, defaults to
+                RETRYABLE_ERROR_CODES. Records of requests which failed before being sent are
+                retried too, while those of requests which may have been applied are
+                dead-lettered rather than written twice (optional)
+            dead_letter_sink: DeadLetterSink receiving the results of the records which could not
+                be written. Failures are only logged if not given (optional)
+            coalesce: Whether to coalesce the writes queued for the same record: successive
+                updates are merged field by field and a delete drops the add or update queued
+                before it (optional)
         """
         self.client = NetsuiteApiClient(*args, **kwargs)
 
@@ -1071,10 +1645,69 @@ class NetsuiteApiBatchClient(object):
         # Try to execute batch operations before the object is delete
         self.last_resort = last_resort
 
-        # Dictionary to keep track of the different operation types
+        # Maximum number of bytes of records per batch, leaving room for the SOAP envelope
+        max_request_size = self.governance_model.get_max_request_size()
+        self.max_batch_size = max_request_size - self.REQUEST_OVERHEAD_SIZE if max_request_size else None
+
+        # Dictionary to keep track of the different operation types, holding _QueuedRecord
         self.queued_operations = {}
+        # Estimated number of bytes of the records queued per operation category
+        self.queued_sizes = {}
+        # Time at which the oldest record queued per operation category was queued
+        self.queued_since = {}
+        # Position in the queue of the records queued per operation category by record key
+        self.queued_keys = {}
+        # Number of batches in flight writing each record key
+        self.in_flight_keys = {}
         for operation_category in self.governance_model.get_batchable_operation_categories():
             self.queued_operations[operation_category] = []
+            self.queued_sizes[operation_category] = 0
+            self.queued_since[operation_category] = None
+            self.queued_keys[operation_category] = {}
+
+        self.coalesce = coalesce
+
+        # Guards the queues which are filled by callers and flushed by the background thread
+        self.lock = threading.RLock()
+
+        # Batches filled by records queued again, sent with the next batches
+        self.ready_batches = []
+
+        self.on_batch_complete = on_batch_complete
+        # Futures of the batches being sent, kept until their failed records are queued again
+        self.pending_futures = set()
+        self.pending_futures_changed = threading.Condition(self.lock)
+
+        self.max_record_retries = max_record_retries
+        self.retryable_codes = frozenset(retryable_codes) if retryable_codes is not None else RETRYABLE_ERROR_CODES
+        self.dead_letter_sink = dead_letter_sink
+
+        self.async_threshold = async_threshold
+        self.async_job_poller = None
+        if async_threshold:
+            self.async_job_poller = AsyncJobPoller(
+                self.client, initial_interval=async_poll_interval or self.DEFAULT_ASYNC_POLL_INTERVAL)
+        self.executor = None
+        if max_workers and max_workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            # Senders block once the limits of batches in flight are reached
+            self.in_flight = threading.BoundedSemaphore(max_workers)
+            self.in_flight_per_category = dict(
+                (operation_category, threading.BoundedSemaphore(max_in_flight_per_category or max_workers))
+                for operation_category in self.queued_operations)
+
+        self.linger = linger
+        self.max_queue_age = max_queue_age if max_queue_age is not None else linger
+        self.closed = threading.Event()
+        self.flusher = None
+        if linger:
+            # The thread only holds a weak reference so that the client can still be collected
+            self.flusher = threading.Thread(
+                target=self._flush_periodically,
+                args=(weakref.ref(self), linger, self.closed),
+                name='NetsuiteBatchFlusher')
+            self.flusher.daemon = True
+            self.flusher.start()
 
     def __getattr__(self, name):
         if not hasattr(self.client, name):
@@ -1086,33 +1719,630 @@ class NetsuiteApiBatchClient(object):
 
         return getattr(self.client, name)
 
-    def execute(self):
-        """Execute all pending batch operations."""
-        for operation_category, record in self.queued_operations.items():
-            if not record:
-                continue
-            self._execute(operation_category)
+    def execute(self, wait=False):
+        """Execute all pending batch operations.
+
+        Records of batches which fail are queued again or dead-lettered rather than raised, see
+        _handle_results, and the error is set on the futures of their batches.
+
+        Args:
+            wait: Whether to wait for every batch in flight to complete (optional)
+
+        Returns:
+            List of futures of the batches sent
+        """
+        with self.lock:
+            batches = self._take_ready_batches()
+            for operation_category in self.queued_operations:
+                batches += self._take_batches(operation_category)
+        futures = self._send_batches(batches)
+        if wait:
+            self.wait()
+            # Records failing with retryable errors were queued again as their batches completed
+            if self._has_queued_records():
+                futures += self.execute(wait=True)
+        return futures
+
+    def wait(self, timeout=None):
+        """Wait for the batches in flight, including asynchronous jobs, to complete.
+
+        A batch is only complete once its failed records were queued again or dead-lettered.
+
+        Args:
+            timeout: Maximum number of seconds to wait (optional)
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self.lock:
+            while self.pending_futures:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return
+                self.pending_futures_changed.wait(remaining)
+
+    def should_promote(self, num_records):
+        """Check if a batch of a given number of records is sent as an asynchronous job.
+
+        Args:
+            num_records: Number of records of the batch
+
+        Returns:
+            True if the batch is sent asynchronously or False otherwise
+        """
+        return bool(self.async_threshold) and num_records >= self.async_threshold
 
     def _execute(self, operation_category):
         """Execute a batch operation for all record belonging to an operation category.
 
         Args:
             operation_category: Category of the operation to batch execute
+
+        Returns:
+            Future of the batch sent or None if no records were queued
+        """
+        with self.lock:
+            entries = self._take_batch(operation_category)
+        if entries:
+            return self._send_batch(operation_category, entries)
+        return None
+
+    def _send_batches(self, batches):
+        """Send batches taken from the queue.
+
+        Should a batch fail to be sent at all, e.g. because the worker pool was shut down, it
+        is put back with the batches after it before the error is raised so no record is lost.
+
+        Args:
+            batches: List of (operation category, list of _QueuedRecord) tuples
+
+        Returns:
+            List of futures of the batches sent
+        """
+        futures = []
+        for index, (operation_category, entries) in enumerate(batches):
+            try:
+                futures.append(self._send_batch(operation_category, entries))
+            except Exception:
+                with self.lock:
+                    self.ready_batches[:0] = batches[index:]
+                raise
+        return futures
+
+    def _has_queued_records(self):
+        with self.lock:
+            return bool(self.ready_batches) or any(self.queued_operations.values())
+
+    def _estimate_sizes(self, records):
+        """Estimate the size of each record if batches are limited in bytes."""
+        return [estimate_soap_size(record) if self.max_batch_size else 0 for record in records]
+
+    def _enqueue(self, operation_category, entries, max_record_count, coalesce=True):
+        """Queue records of an operation category. Must hold the lock.
+
+        Args:
+            operation_category: Category of the operation
+            entries: List of _QueuedRecord to queue
+            max_record_count: Maximum number of records of a synchronous batch
+            coalesce: Whether the records may be coalesced with the records queued, which
+                must then have been queued before them. Records queued again are merged under
+                the newer writes of the same records instead (optional)
+
+        Returns:
+            List of the batches filled, taken from the queue
+        """
+        batches = []
+        queued_records = self.queued_operations[operation_category]
+        if self.should_promote(len(queued_records) + len(entries)) or (
+                self.async_threshold and max_record_count and self.async_threshold > max_record_count):
+            # Fill batches up to the limits of asynchronous operations instead. A threshold past the
+            # synchronous limit could never be reached if the queue was flushed at that limit
+            max_record_count = self._get_max_record_count(operation_category, self.async_threshold)
+        max_batch_size = self.max_batch_size
+
+        queued_keys = self.queued_keys[operation_category]
+        for entry in entries:
+            item_size = entry.size
+            key = get_record_key(entry.record) if self.coalesce else None
+            if key is not None:
+                if coalesce and self._coalesce(operation_category, key, entry):
+                    continue
+                if not coalesce and self._merge_retried(operation_category, key, entry):
+                    continue
+
+            queued_size = self.queued_sizes[operation_category]
+
+            # Flush before the record would exceed either the record count or the byte budget
+            if queued_records and (
+                    (max_record_count and len(queued_records) >= max_record_count) or
+                    (max_batch_size and queued_size + item_size > max_batch_size)):
+                batch = self._take_batch(operation_category, max_record_count)
+                if batch:
+                    batches.append(batch)
+
+            if max_batch_size and item_size > max_batch_size:
+                LOGGER.warning("Record of %d bytes exceeds the batch size of %d bytes on its own",
+                               item_size, max_batch_size)
+
+            if not queued_records:
+                self.queued_since[operation_category] = time.time()
+            queued_records.append(entry)
+            self.queued_sizes[operation_category] += item_size
+            entry.key = key
+            if key is not None:
+                queued_keys[key] = len(queued_records) - 1
+
+        LOGGER.info("Queued %d record(s) category=%s (%d of %s, %d bytes)",
+                    len(entries),
+                    operation_category,
+                    len(queued_records),
+                    max_record_count,
+                    self.queued_sizes[operation_category])
+
+        if max_record_count and len(queued_records) >= max_record_count:
+            batch = self._take_batch(operation_category, max_record_count)
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def _take_ready_batches(self):
+        """Take the batches filled by records queued again. Must hold the lock.
+
+        Returns:
+            List of (operation category, list of _QueuedRecord) tuples
         """
+        batches = self.ready_batches
+        self.ready_batches = []
+        return batches
 
-        batch_method_name = operation_category + 'List'
-        operation_category_records = self.queued_operations[operation_category]
+    def _requeue(self, operation_category, entries):
+        """Queue records again to send them with the next batch of their operation category.
+
+        Batches filled in the process are only sent with the next batches since this is called
+        from the completion of a batch, possibly in a worker thread.
+
+        Args:
+            operation_category: Category of the operation
+            entries: List of _QueuedRecord which failed
+        """
+        max_record_count = None
+        operation_constraints = self.governance_model.get_operation_constraints(
+            self.BATCH_METHOD_NAMES[operation_category])
+        if operation_constraints and "record_count" in operation_constraints:
+            max_record_count = operation_constraints["record_count"]["value"]
+
+        with self.lock:
+            # Records queued since were written later so these are merged under them instead
+            self.ready_batches += [
+                (operation_category, batch)
+                for batch in self._enqueue(operation_category, entries, max_record_count, coalesce=False)
+            ]
+
+    def _coalesce(self, operation_category, key, entry):
+        """Coalesce a record with the writes queued for the same record key. Must hold the lock.
+
+        Args:
+            operation_category: Category of the operation
+            key: Key of the record
+            entry: _QueuedRecord to queue
+
+        Returns:
+            True if the record was coalesced and must not be queued or False otherwise
+        """
+        if operation_category == 'update':
+            # Merge into the pending update, or the pending add which creates the record
+            for target_category in ('update', 'add'):
+                index = self.queued_keys.get(target_category, {}).get(key)
+                if index is not None:
+                    target_entry = self.queued_operations[target_category][index]
+                    self._replace_record(
+                        target_category, target_entry, merge_records(target_entry.record, entry.record))
+                    LOGGER.debug("Merged update of %s into queued %s", key, target_category)
+                    return True
+        elif operation_category == 'delete':
+            # The delete itself is still sent since the record may exist regardless of the add
+            for target_category in ('update', 'add'):
+                if key in self.queued_keys.get(target_category, {}):
+                    LOGGER.debug("Dropped queued %s of %s deleted afterwards", target_category, key)
+                    self._dequeue(target_category, key)
+            if key in self.queued_keys[operation_category]:
+                LOGGER.debug("Dropped duplicate delete of %s", key)
+                return True
+        return False
+
+    def _merge_retried(self, operation_category, key, entry):
+        """Merge a record queued again under the write queued since for the same record key.
+
+        The write queued since is newer, so its fields win over those of the record retried.
+        Must hold the lock.
+
+        Args:
+            operation_category: Category of the operation
+            key: Key of the record
+            entry: _QueuedRecord queued again
+
+        Returns:
+            True if the record was merged and must not be queued or False otherwise
+        """
+        index = self.queued_keys[operation_category].get(key)
+        if index is None:
+            return False
+
+        target_entry = self.queued_operations[operation_category][index]
+        if operation_category != 'delete':
+            self._replace_record(
+                operation_category, target_entry, merge_records(entry.record, target_entry.record))
+        target_entry.attempts = max(target_entry.attempts, entry.attempts)
+        LOGGER.debug("Merged retried %s of %s under the one queued since", operation_category, key)
+        return True
+
+    def _replace_record(self, operation_category, entry, record):
+        """Replace the record of a queued entry, keeping the queued size exact. Must hold the lock."""
+        size = self._estimate_sizes([record])[0]
+        self.queued_sizes[operation_category] += size - entry.size
+        entry.record = record
+        entry.size = size
+
+    def _dequeue(self, operation_category, key):
+        """Remove a queued record by record key. Must hold the lock."""
+        queued_records = self.queued_operations[operation_category]
+        queued_keys = self.queued_keys[operation_category]
+        removed_index = queued_keys.pop(key)
+        self.queued_sizes[operation_category] -= queued_records.pop(removed_index).size
+        # Records queued after the one removed move up by one
+        for other_key, index in queued_keys.items():
+            if index > removed_index:
+                queued_keys[other_key] = index - 1
+        if not queued_records:
+            self.queued_sizes[operation_category] = 0
+            self.queued_since[operation_category] = None
+
+    def _take_batch(self, operation_category, max_record_count=None):
+        """Take a batch of the records queued for an operation category. Must hold the lock.
+
+        Records with an earlier write still in flight stay queued until it completes, so that
+        the writes of a record are applied in order and a retry is merged under later writes.
+        Since those may have filled the queue past its limits, the records taken are limited
+        again and the rest is taken by the next batch.
+
+        Args:
+            operation_category: Category of the operation
+            max_record_count: Maximum number of records of the batch, defaults to the limit of
+                the operation the records queued are sent with (optional)
+
+        Returns:
+            List of _QueuedRecord taken from the queue
+        """
+        queued_records = self.queued_operations[operation_category]
+        if max_record_count is None:
+            max_record_count = self._get_max_record_count(operation_category, len(queued_records))
+        max_batch_size = self.max_batch_size
+        in_flight_keys = self.in_flight_keys
+        entries = []
+        batch_size = 0
+        remaining_entries = []
+        for entry in queued_records:
+            if ((entry.key is not None and entry.key in in_flight_keys) or
+                    (max_record_count and len(entries) >= max_record_count) or
+                    (max_batch_size and entries and batch_size + entry.size > max_batch_size)):
+                remaining_entries.append(entry)
+            else:
+                entries.append(entry)
+                batch_size += entry.size
+
+        if entries:
+            LOGGER.debug("Taking batch for category %s with %d record(s) (%d bytes) queued for %.3f seconds",
+                         operation_category,
+                         len(entries),
+                         batch_size,
+                         time.time() - self.queued_since[operation_category])
+        for entry in entries:
+            if entry.key is not None:
+                in_flight_keys[entry.key] = in_flight_keys.get(entry.key, 0) + 1
+
+        queued_records[:] = remaining_entries
+        queued_keys = self.queued_keys[operation_category]
+        queued_keys.clear()
+        for index, entry in enumerate(remaining_entries):
+            if entry.key is not None:
+                queued_keys[entry.key] = index
+        self.queued_sizes[operation_category] -= batch_size
+        if not remaining_entries:
+            self.queued_sizes[operation_category] = 0
+            self.queued_since[operation_category] = None
+        return entries
+
+    def _take_batches(self, operation_category):
+        """Take all the records of an operation category which can be sent. Must hold the lock.
+
+        Returns:
+            List of (operation category, list of _QueuedRecord) tuples
+        """
+        batches = []
+        entries = self._take_batch(operation_category)
+        while entries:
+            batches.append((operation_category, entries))
+            entries = self._take_batch(operation_category)
+        return batches
+
+    def _get_max_record_count(self, operation_category, num_records):
+        """Get the maximum number of records of a batch of an operation category.
+
+        Args:
+            operation_category: Category of the operation
+            num_records: Number of records to send, which may promote the batch to an asynchronous job
+
+        Returns:
+            Maximum number of records or None if unlimited
+        """
+        operation_constraints = None
+        if self.should_promote(num_records):
+            operation_constraints = self.governance_model.get_operation_constraints(
+                self.ASYNC_BATCH_METHOD_NAMES[operation_category])
+        if not operation_constraints or "record_count" not in operation_constraints:
+            operation_constraints = self.governance_model.get_operation_constraints(
+                self.BATCH_METHOD_NAMES[operation_category])
+        if operation_constraints and "record_count" in operation_constraints:
+            return operation_constraints["record_count"]["value"]
+        return None
+
+    def _release_keys(self, entries):
+        """Let the writes held for the keys of a completed batch be sent."""
+        with self.lock:
+            for entry in entries:
+                if entry.key is None:
+                    continue
+                count = self.in_flight_keys.get(entry.key, 0) - 1
+                if count > 0:
+                    self.in_flight_keys[entry.key] = count
+                else:
+                    self.in_flight_keys.pop(entry.key, None)
+
+    def _send_batch(self, operation_category, entries):
+        """Send a batch of records of an operation category.
+
+        Batches are submitted to the worker pool when there is one, waiting while the limits of
+        batches in flight are reached, or sent in the calling thread otherwise.
+
+        Args:
+            operation_category: Category of the operation
+            entries: List of _QueuedRecord to send
+
+        Returns:
+            Future whose result is the list of RecordResult of the batch or None on a dry run
+        """
+        if self.should_promote(len(entries)):
+            return self._submit_async_batch(operation_category, entries)
+
+        operation_category_records = [entry.record for entry in entries]
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(self._call_batch_method(operation_category, operation_category_records))
+            except Exception as e:
+                future.set_exception(e)
+            # Failed records are queued again or dead-lettered, the error is only set on the future
+            self._complete_batch(operation_category, entries, future)
+            return future
+
+        category_in_flight = self.in_flight_per_category[operation_category]
+        category_in_flight.acquire()
+        self.in_flight.acquire()
+        try:
+            future = self.executor.submit(
+                self._call_batch_method, operation_category, operation_category_records)
+        except Exception:
+            self.in_flight.release()
+            category_in_flight.release()
+            raise
+
+        with self.lock:
+            self.pending_futures.add(future)
+
+        def on_done(done_future):
+            self.in_flight.release()
+            category_in_flight.release()
+            try:
+                self._complete_batch(operation_category, entries, done_future)
+            finally:
+                self._discard_pending_future(done_future)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def _submit_async_batch(self, operation_category, entries):
+        """Submit a batch of records of an operation category as an asynchronous job.
+
+        Args:
+            operation_category: Category of the operation
+            entries: List of _QueuedRecord to send
+
+        Returns:
+            Future whose result is the list of RecordResult once the job completes
+        """
+        batch_method_name = self.ASYNC_BATCH_METHOD_NAMES[operation_category]
+        operation_category_records = [entry.record for entry in entries]
+        LOGGER.info("Submitting asynchronous batch operation %s for category %s with %d record(s)",
+                    batch_method_name,
+                    operation_category,
+                    len(operation_category_records))
+
+        future = Future()
+        if self.dry_run:
+            future.set_result(None)
+            self._complete_batch(operation_category, entries, future)
+            return future
+
+        try:
+            async_status_result = getattr(self.client, batch_method_name)(operation_category_records)
+        except Exception as e:
+            future.set_exception(e)
+            self._complete_batch(operation_category, entries, future)
+            return future
+
+        job_id = async_status_result.jobId
+        future = self.async_job_poller.track(
+            job_id,
+            result_handler=lambda pages: map_write_responses(operation_category_records, get_write_responses(pages)))
+        with self.lock:
+            self.pending_futures.add(future)
+        LOGGER.info("Submitted asynchronous job %s for category %s", job_id, operation_category)
+
+        def on_done(done_future):
+            try:
+                self._complete_batch(operation_category, entries, done_future)
+            finally:
+                self._discard_pending_future(done_future)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def _discard_pending_future(self, future):
+        """Stop tracking the future of a batch whose records were all handled."""
+        with self.lock:
+            self.pending_futures.discard(future)
+            self.pending_futures_changed.notify_all()
+
+    def _call_batch_method(self, operation_category, operation_category_records):
+        """Call the list operation of a batch.
+
+        Returns:
+            List of RecordResult or None on a dry run
+        """
+        batch_method_name = self.BATCH_METHOD_NAMES[operation_category]
+        property_name = 'base_ref' if operation_category == 'delete' else 'record'
         LOGGER.info("Executing batch operation %s for category %s with %d record(s)",
                     batch_method_name,
                     operation_category,
                     len(operation_category_records))
-        if not self.dry_run:
-            getattr(self.client, batch_method_name)(record=operation_category_records)
-        del self.queued_operations[operation_category][:]
+        if self.dry_run:
+            return None
+        write_responses = getattr(self.client, batch_method_name)(**{property_name: operation_category_records})
+        return map_write_responses(operation_category_records, write_responses)
+
+    def _complete_batch(self, operation_category, entries, future):
+        """Handle the failed records of a batch that completed and report it to the on_batch_complete callback."""
+        operation_category_records = [entry.record for entry in entries]
+        try:
+            if future.cancelled():
+                LOGGER.warning("Batch operation for category %s with %d record(s) was cancelled",
+                               operation_category,
+                               len(entries))
+            elif future.exception() is not None:
+                LOGGER.error("Batch operation for category %s with %d record(s) failed: %s",
+                             operation_category,
+                             len(entries),
+                             future.exception())
+                self._handle_results(
+                    operation_category, entries, map_request_failure(operation_category_records, future.exception()))
+            elif future.result() is not None:
+                self._handle_results(operation_category, entries, future.result())
+        finally:
+            # Retries were merged under the writes held meanwhile, which may now be sent
+            self._release_keys(entries)
+
+        if self.on_batch_complete is None:
+            return
+        try:
+            self.on_batch_complete(operation_category, operation_category_records, future)
+        except Exception:
+            LOGGER.exception("Batch completion callback failed")
+
+    def _handle_results(self, operation_category, entries, results):
+        """Queue again the records which failed with a retryable error and dead-letter the others.
+
+        Args:
+            operation_category: Category of the operation
+            entries: List of _QueuedRecord of a batch
+            results: List of RecordResult of the batch in the same order
+        """
+        retried_entries = []
+        failed_results = []
+        for entry, result in zip(entries, results):
+            if result.is_success:
+                continue
+
+            is_retryable = result.code == REQUEST_NOT_SENT_CODE or result.code in self.retryable_codes
+            if is_retryable and entry.attempts < self.max_record_retries:
+                entry.attempts += 1
+                retried_entries.append(entry)
+            else:
+                failed_results.append(result)
+
+        if retried_entries:
+            LOGGER.warning("Queuing again %d record(s) of category %s which failed with retryable errors",
+                           len(retried_entries),
+                           operation_category)
+            self._requeue(operation_category, retried_entries)
+
+        if failed_results:
+            LOGGER.error("%d record(s) of category %s could not be written: %s",
+                         len(failed_results),
+                         operation_category,
+                         ", ".join(sorted(set(str(result.code) for result in failed_results))))
+            if self.dead_letter_sink is not None:
+                try:
+                    self.dead_letter_sink.write(failed_results)
+                except Exception:
+                    LOGGER.exception("Failed to write %d record(s) to the dead-letter sink", len(failed_results))
+
+    def flush_expired(self):
+        """Execute the batches whose oldest record has been queued for longer than max_queue_age.
+
+        Returns:
+            List of futures of the batches sent
+        """
+        now = time.time()
+        with self.lock:
+            batches = self._take_ready_batches()
+            for operation_category, queued_since in self.queued_since.items():
+                if queued_since is not None and now - queued_since >= self.max_queue_age:
+                    batches += self._take_batches(operation_category)
+
+        return self._send_batches(batches)
+
+    @staticmethod
+    def _flush_periodically(batch_client_ref, linger, closed):
+        """Flush partially filled batches every linger seconds until the client is closed."""
+        while not closed.wait(linger):
+            batch_client = batch_client_ref()
+            if batch_client is None:
+                return
+            try:
+                batch_client.flush_expired()
+            except Exception:
+                LOGGER.exception("Failed to flush batches in the background")
+            finally:
+                del batch_client
+
+    def close(self):
+        """Stop the background flusher, execute all pending batch operations and wait for them."""
+        if self.closed.is_set():
+            return
+
+        self.closed.set()
+        if self.flusher is not None and self.flusher is not threading.current_thread():
+            self.flusher.join()
+        try:
+            # Batches completing while the others are sent may queue records again
+            while True:
+                self.execute(wait=True)
+                with self.lock:
+                    if not self.pending_futures and not self._has_queued_records():
+                        break
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            if self.async_job_poller is not None:
+                self.async_job_poller.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def __del__(self):
         """Destructor."""
 
-        if self.last_resort:
+        if self.last_resort and 'closed' in self.__dict__ and not self.closed.is_set():
             LOGGER.info("Executing last resort batch operations")
-            self.execute()
+            self.close()
@@ -0,0 +1,97 @@
+"""Write coalescing.
+
+Writes queued for the same record before their batch is sent can be reduced to fewer writes:
+successive updates are merged field by field, later values winning, and a delete supersedes the
+add or update of the same record queued before it. Records are identified by their type and
+internal identifier, or external identifier when they have no internal one.
+"""
+
+from collections import OrderedDict
+
+NULL_FIELD_LIST = 'nullFieldList'
+
+# Types of references whose record type is given by their type field
+REFERENCE_TYPE_NAMES = frozenset(['RecordRef', 'BaseRef', 'CustomRecordRef'])
+
+
+def get_record_type_name(record):
+    """Get the lowercase name of the type of a record or of the record a reference points to.
+
+    Args:
+        record: Record or reference
+
+    Returns:
+        Type name or None if unknown
+    """
+    xsd_type = getattr(record, '_xsd_type', None)
+    type_name = getattr(xsd_type, 'name', None) or type(record).__name__
+    if type_name in REFERENCE_TYPE_NAMES:
+        type_name = getattr(record, 'type', None) or getattr(record, 'typeId', None)
+    return str(type_name).lower() if type_name else None
+
+
+def get_record_key(record):
+    """Get the key identifying the record written.
+
+    Args:
+        record: Record or reference
+
+    Returns:
+        Tuple of the record type name, the identifier name and value or None if the record
+        cannot be identified
+    """
+    if getattr(record, '__values__', None) is None:
+        return None
+
+    record_type_name = get_record_type_name(record)
+    if record_type_name is None:
+        return None
+
+    for id_name in ('internalId', 'externalId'):
+        id_value = getattr(record, id_name, None)
+        if id_value:
+            return (record_type_name, id_name, str(id_value))
+    return None
+
+
+def _get_null_field_names(record):
+    null_field_list = record.__values__.get(NULL_FIELD_LIST)
+    return list(getattr(null_field_list, 'name', None) or []) if null_field_list is not None else []
+
+
+def merge_records(record, update):
+    """Merge a later update of a record into it, field by field.
+
+    Fields set by the update replace those of the record while fields the update leaves out
+    are kept. Fields listed in the nullFieldList of the update are cleared.
+
+    Args:
+        record: Record queued first
+        update: Record of the same type queued later
+
+    Returns:
+        New record holding the merged fields
+    """
+    values = OrderedDict(record.__values__)
+    null_field_names = _get_null_field_names(record)
+
+    for name, value in update.__values__.items():
+        if value is None or name == NULL_FIELD_LIST:
+            continue
+        values[name] = value
+        if name in null_field_names:
+            null_field_names.remove(name)
+
+    for name in _get_null_field_names(update):
+        if name in values:
+            values[name] = None
+        if name not in null_field_names:
+            null_field_names.append(name)
+
+    null_field_list = update.__values__.get(NULL_FIELD_LIST)
+    if null_field_list is None:
+        null_field_list = record.__values__.get(NULL_FIELD_LIST)
+    if null_field_list is not None:
+        values[NULL_FIELD_LIST] = type(null_field_list)(name=null_field_names) if null_field_names else None
+
+    return type(record)(**values)
@@ -0,0 +1,248 @@
+"""Columnar search results.
+
+Converts the records of a search into Apache Arrow record batches page by page, without
+building the intermediate list of serialized records. Columns are inferred from the XSD type of
+the records found:
+
+    - Simple fields map to a column of the same name
+    - RecordRef fields map to "<field>.internalId" and "<field>.name" columns
+    - Custom fields map to a "custom.<scriptId>" column each
+    - Other nested fields (e.g. sublists) are left out
+
+Requires pyarrow, and pandas to build DataFrames.
+"""
+
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+REFERENCE_TYPE_NAMES = frozenset(['RecordRef', 'ListOrRecordRef'])
+
+CUSTOM_FIELD_LIST_TYPE_NAME = 'CustomFieldList'
+
+CUSTOM_FIELD_COLUMN_PREFIX = 'custom.'
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is required for columnar search results: pip install netsuite[columnar]")
+    return pyarrow
+
+
+def _get_reference_id(value):
+    """Get the internal identifier of a reference or of a list of references."""
+    if isinstance(value, list):
+        return ','.join(str(_get_reference_id(item)) for item in value)
+    return getattr(value, 'internalId', value)
+
+
+class RecordColumnExtractor(object):
+    """Extract the column values of records of a given XSD type."""
+
+    def __init__(self, xsd_type):
+        """Constructor.
+
+        Args:
+            xsd_type: XSD type of the records
+        """
+        self.simple_fields = []
+        self.reference_fields = []
+        self.custom_field_lists = []
+        for name, element in xsd_type.elements:
+            element_type = element.type
+            type_name = getattr(element_type, 'name', None)
+            if getattr(element, 'accepts_multiple', False):
+                continue
+            if type_name in REFERENCE_TYPE_NAMES:
+                self.reference_fields.append(name)
+            elif type_name == CUSTOM_FIELD_LIST_TYPE_NAME:
+                self.custom_field_lists.append(name)
+            elif not hasattr(element_type, 'elements'):
+                self.simple_fields.append(name)
+
+    def extract(self, record):
+        """Extract the column values of a record.
+
+        Args:
+            record: zeep record
+
+        Returns:
+            Dictionary of column values by column name
+        """
+        values = record.__values__
+        row = {}
+        for name in self.simple_fields:
+            row[name] = values.get(name)
+        for name in self.reference_fields:
+            reference = values.get(name)
+            if reference is not None:
+                row[name + '.internalId'] = reference.internalId
+                row[name + '.name'] = reference.name
+        for name in self.custom_field_lists:
+            custom_field_list = values.get(name)
+            if custom_field_list is None:
+                continue
+            for custom_field in custom_field_list.customField or []:
+                value = custom_field.value
+                if hasattr(value, 'internalId') or isinstance(value, list):
+                    value = _get_reference_id(value)
+                row[CUSTOM_FIELD_COLUMN_PREFIX + custom_field.scriptId] = value
+        return row
+
+
+class ColumnarBuilder(object):
+    """Build Arrow record batches from pages of zeep records."""
+
+    def __init__(self):
+        self._extractors = {}
+        # Columns in the order they were found and the Arrow type of each one
+        self.column_types = {}
+        self.column_names = []
+
+    def _get_extractor(self, record):
+        record_type = type(record)
+        extractor = self._extractors.get(record_type)
+        if extractor is None:
+            extractor = self._extractors[record_type] = RecordColumnExtractor(record._xsd_type)
+        return extractor
+
+    def build_record_batch(self, record):
+        """Convert a page of records into a record batch.
+
+        Args:
+            record: List of zeep records
+
+        Returns:
+            pyarrow.RecordBatch with the columns found so far
+        """
+        pyarrow = _import_pyarrow()
+
+        columns = {}
+        for row_index, item in enumerate(record):
+            row = self._get_extractor(item).extract(item)
+            for name, value in row.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * row_index
+                column.append(value)
+            for name, column in columns.items():
+                if len(column) <= row_index:
+                    column.append(None)
+
+        for name in columns:
+            if name not in self.column_types:
+                self.column_names.append(name)
+                self.column_types[name] = None
+
+        arrays = []
+        for name in self.column_names:
+            values = columns.get(name)
+            if values is None:
+                arrays.append(pyarrow.nulls(len(record), self.column_types[name] or pyarrow.null()))
+                continue
+            array = pyarrow.array(values, type=self.column_types[name])
+            if self.column_types[name] is None and array.type != pyarrow.null():
+                self.column_types[name] = array.type
+            arrays.append(array)
+
+        return pyarrow.RecordBatch.from_arrays(arrays, list(self.column_names))
+
+    def build_table(self, record_batches):
+        """Combine record batches with possibly different columns into a single table.
+
+        Args:
+            record_batches: List of record batches built by this builder
+
+        Returns:
+            pyarrow.Table
+        """
+        pyarrow = _import_pyarrow()
+
+        schema = pyarrow.schema([
+            (name, self.column_types[name] or pyarrow.null()) for name in self.column_names
+        ])
+        aligned_batches = []
+        for record_batch in record_batches:
+            arrays = []
+            for field in schema:
+                index = record_batch.schema.get_field_index(field.name)
+                if index < 0:
+                    arrays.append(pyarrow.nulls(record_batch.num_rows, field.type))
+                    continue
+                array = record_batch.column(index)
+                if array.type != field.type:
+                    array = array.cast(field.type) if array.type != pyarrow.null() else \
+                        pyarrow.nulls(record_batch.num_rows, field.type)
+                arrays.append(array)
+            aligned_batches.append(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+        return pyarrow.Table.from_batches(aligned_batches, schema=schema)
+
+
+def iter_search_record_batches(client, search_type, search_preferences=None, builder=None):
+    """Perform a search yielding one Arrow record batch per page of results.
+
+    Args:
+        client: Netsuite API client
+        search_type: Instance of a search type describing the filters to be applied
+        search_preferences: Search preferences to use for this search (optional)
+        builder: ColumnarBuilder keeping track of the columns found (optional)
+
+    Yields:
+        pyarrow.RecordBatch per page. Later batches may have more columns than earlier ones
+    """
+    builder = builder or ColumnarBuilder()
+    for page in client.iter_search(search_type, search_preferences, serialize=False):
+        yield builder.build_record_batch(page)
+
+
+def search_to_table(client, search_type, search_preferences=None):
+    """Perform a search returning all the records found as an Arrow table.
+
+    Args:
+        client: Netsuite API client
+        search_type: Instance of a search type describing the filters to be applied
+        search_preferences: Search preferences to use for this search (optional)
+
+    Returns:
+        pyarrow.Table
+    """
+    builder = ColumnarBuilder()
+    record_batches = list(
+        iter_search_record_batches(client, search_type, search_preferences, builder))
+    LOGGER.info('Built a table of %d rows with %d columns from the search',
+                sum(record_batch.num_rows for record_batch in record_batches),
+                len(builder.column_names))
+    return builder.build_table(record_batches)
+
+
+def search_to_dataframe(client, search_type, search_preferences=None):
+    """Perform a search returning all the records found as a pandas DataFrame.
+
+    Args:
+        client: Netsuite API client
+        search_type: Instance of a search type describing the filters to be applied
+        search_preferences: Search preferences to use for this search (optional)
+
+    Returns:
+        pandas.DataFrame
+    """
+    return search_to_table(client, search_type, search_preferences).to_pandas()
+
+
+def search_to_numpy(client, search_type, search_preferences=None):
+    """Perform a search returning all the records found as NumPy columns.
+
+    Args:
+        client: Netsuite API client
+        search_type: Instance of a search type describing the filters to be applied
+        search_preferences: Search preferences to use for this search (optional)
+
+    Returns:
+        Dictionary of NumPy arrays by column name
+    """
+    table = search_to_table(client, search_type, search_preferences)
+    return dict(
+        (name, table.column(name).to_numpy()) for name in table.column_names)
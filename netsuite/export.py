@@ -0,0 +1,293 @@
+"""Search result export.
+
+Writes the records of a search to NDJSON or CSV, optionally gzip compressed, as each page of
+results arrives. Only one page of records is held in memory at a time, so extracts of any size
+can be written to a file or stream.
+"""
+
+import abc
+import csv
+import gzip
+import io
+import json
+import logging
+
+from collections import namedtuple
+
+import six
+
+from .serializers import CompiledSerializer
+
+LOGGER = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ['ndjson', 'csv']
+
+# Progress reported after each page is written
+ExportProgress = namedtuple('ExportProgress', [
+    'page',
+    'rows',
+    'bytes',
+    'total_rows',
+    'total_bytes'
+])
+
+
+class _CountingWriter(io.RawIOBase):
+    """Binary writer that counts the bytes written to the underlying stream."""
+
+    def __init__(self, stream, close_stream=False):
+        self.stream = stream
+        self.close_stream = close_stream
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.stream.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+        super(_CountingWriter, self).close()
+
+
+def _json_default(value):
+    """Encode the values json does not support (dates, decimals, ...) as strings."""
+    return str(value)
+
+
+def _flatten(record, prefix='', row=None):
+    """Flatten nested dictionaries into a single row with dotted column names."""
+    row = row if row is not None else {}
+    for key, value in record.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            _flatten(value, name + '.', row)
+        elif isinstance(value, list):
+            row[name] = json.dumps(value, default=_json_default)
+        else:
+            row[name] = value
+    return row
+
+
+def get_record_columns(xsd_types):
+    """Get the CSV columns of records from their XSD types.
+
+    Nested records give dotted columns as with _flatten, while repeated elements give a single
+    column holding their JSON encoded list.
+
+    Args:
+        xsd_types: List of zeep complex types of the records
+
+    Returns:
+        List of column names
+    """
+    columns = []
+    for xsd_type in xsd_types:
+        for name in _get_type_columns(xsd_type, '', set()):
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+def _get_type_columns(xsd_type, prefix, parent_types):
+    """Get the columns of a complex type in the order zeep serializes its elements and attributes."""
+    columns = []
+    for name, element in list(xsd_type.elements) + list(xsd_type.attributes):
+        element_type = getattr(element, 'type', None)
+        # Recursive types are cut at their 1st repetition, which is then kept as a single column
+        if (not getattr(element, 'accepts_multiple', False) and
+                hasattr(element_type, 'elements') and element_type not in parent_types):
+            columns += _get_type_columns(
+                element_type, prefix + name + '.', parent_types | set([xsd_type]))
+        else:
+            columns.append(prefix + name)
+    return columns
+
+
+@six.add_metaclass(abc.ABCMeta)
+class RecordSink(object):
+    """Write serialized records to a binary stream."""
+
+    def __init__(self, output, compress=False):
+        """Constructor.
+
+        Args:
+            output: Path of the file to write or binary stream
+            compress: Whether to gzip compress the output (optional)
+        """
+        owns_stream = not hasattr(output, 'write')
+        stream = open(output, 'wb') if owns_stream else output
+        self.counter = _CountingWriter(stream, close_stream=owns_stream)
+        self.compressor = gzip.GzipFile(fileobj=self.counter, mode='wb') if compress else None
+        self.stream = self.compressor or self.counter
+
+    @property
+    def bytes_written(self):
+        """Number of bytes written to the output so far."""
+        return self.counter.bytes_written
+
+    @abc.abstractmethod
+    def write_page(self, record):
+        """Write a page of serialized records.
+
+        Args:
+            record: List of serialized records
+        """
+
+    def close(self):
+        """Flush the pending data and close the output if it was opened by the sink."""
+        if self.compressor is not None:
+            self.compressor.close()
+        self.counter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NdjsonSink(RecordSink):
+    """Write records as newline delimited JSON."""
+
+    def write_page(self, record):
+        lines = [
+            json.dumps(item, default=_json_default, separators=(',', ':')).encode('utf-8')
+            for item in record
+        ]
+        if lines:
+            lines.append(b'')
+            self.stream.write(b'\n'.join(lines))
+        self.stream.flush()
+
+
+class CsvSink(RecordSink):
+    """Write records as CSV with nested fields flattened into dotted columns.
+
+    The header is written before the 1st row, so the columns are the ones given, see
+    get_record_columns, or else those of the 1st page written. A later row with a value in
+    another column raises an exception rather than losing it.
+    """
+
+    def __init__(self, output, compress=False, fieldnames=None):
+        """Constructor.
+
+        Args:
+            output: Path of the file to write or binary stream
+            compress: Whether to gzip compress the output (optional)
+            fieldnames: List of the columns, taken from the 1st page if not given (optional)
+        """
+        super(CsvSink, self).__init__(output, compress)
+        self.text_stream = io.TextIOWrapper(self.stream, encoding='utf-8', newline='')
+        self.fieldnames = fieldnames
+        self.writer = None
+        self.pages = 0
+
+    def write_page(self, record):
+        rows = [_flatten(item) for item in record]
+        self.pages += 1
+        if self.writer is None and rows:
+            fieldnames = self.fieldnames
+            if fieldnames is None:
+                fieldnames = []
+                for row in rows:
+                    fieldnames += [name for name in row if name not in fieldnames]
+            self.writer = csv.DictWriter(self.text_stream, fieldnames=fieldnames)
+            self.writer.writeheader()
+            self.fieldnames = fieldnames
+        if rows:
+            known_columns = set(self.fieldnames)
+            for row in rows:
+                for name in [name for name in row if name not in known_columns]:
+                    # Nested records left empty flatten to a column of their own
+                    if row[name] is not None:
+                        raise Exception("Column {} of page {} is not in the CSV header".format(name, self.pages))
+                    del row[name]
+            self.writer.writerows(rows)
+        self.text_stream.flush()
+
+    def close(self):
+        # Detach so that closing the text wrapper does not close the sink streams twice
+        self.text_stream.flush()
+        self.text_stream.detach()
+        super(CsvSink, self).close()
+
+
+def open_sink(output, output_format='ndjson', compress=False, fieldnames=None):
+    """Open a sink to write records to.
+
+    Args:
+        output: Path of the file to write or binary stream
+        output_format: One of OUTPUT_FORMATS (optional)
+        compress: Whether to gzip compress the output (optional)
+        fieldnames: List of the CSV columns, see CsvSink (optional)
+
+    Returns:
+        RecordSink instance
+    """
+    if output_format == 'ndjson':
+        return NdjsonSink(output, compress)
+    if output_format == 'csv':
+        return CsvSink(output, compress, fieldnames)
+    raise Exception("Unsupported output format {}. Expected one of {}".format(
+        output_format, ', '.join(OUTPUT_FORMATS)))
+
+
+def export_search(client, search_type, output, output_format='ndjson', compress=False,
+                  search_preferences=None, progress_callback=None):
+    """Perform a search writing the records found to a file or stream as pages arrive.
+
+    Args:
+        client: Netsuite API client
+        search_type: Instance of a search type describing the filters to be applied
+        output: Path of the file to write or binary stream
+        output_format: One of OUTPUT_FORMATS (optional)
+        compress: Whether to gzip compress the output (optional)
+        search_preferences: Search preferences to use for this search (optional)
+        progress_callback: Callable called with an ExportProgress after each page (optional)
+
+    Returns:
+        ExportProgress with the totals of the export
+    """
+    # Records must be serialized to be written
+    serialize = client._serialize if client.serialize_object_class else CompiledSerializer()
+
+    progress = ExportProgress(page=0, rows=0, bytes=0, total_rows=0, total_bytes=0)
+    with open_sink(output, output_format, compress) as sink:
+        for page in client.iter_search(search_type, search_preferences, serialize=False):
+            if isinstance(sink, CsvSink) and sink.fieldnames is None and page:
+                # Columns of fields only set on later pages must be in the header already
+                xsd_types = []
+                for item in page:
+                    xsd_type = getattr(item, '_xsd_type', None)
+                    if xsd_type is not None and xsd_type not in xsd_types:
+                        xsd_types.append(xsd_type)
+                if xsd_types:
+                    sink.fieldnames = get_record_columns(xsd_types)
+            bytes_written = sink.bytes_written
+            sink.write_page([serialize(item) for item in page])
+            progress = ExportProgress(
+                page=progress.page + 1,
+                rows=len(page),
+                bytes=sink.bytes_written - bytes_written,
+                total_rows=progress.total_rows + len(page),
+                total_bytes=sink.bytes_written)
+            LOGGER.debug('Exported %d rows (%d bytes) from page %d',
+                         progress.rows, progress.bytes, progress.page)
+            if progress_callback:
+                progress_callback(progress)
+
+    progress = progress._replace(total_bytes=sink.bytes_written)
+    LOGGER.info('Exported a total of %d rows (%d bytes) from the search',
+                progress.total_rows, progress.total_bytes)
+    return progress
@@ -0,0 +1,320 @@
+"""Account-wide concurrency governance.
+
+Netsuite limits the number of concurrent requests of each account and faults the requests
+above it. ConcurrencyGovernor keeps requests under a maximum number in flight and a request rate
+budget (token bucket) before they are sent:
+
+    - Within a process the limits are enforced with locks shared by all threads
+    - Given a lock directory the limits are enforced across the processes of a host through
+      lock files (one per request slot plus one holding the token bucket state)
+
+The limits are read from the "concurrency_limits" of the governance configuration:
+
+    "concurrency_limits": {
+        "max_concurrent_requests": 5,
+        "requests_per_second": 10,
+        "burst": 10,
+        "accounts": {
+            "<account>": {"max_concurrent_requests": 10}
+        }
+    }
+
+Requires fcntl (Unix) for the lock files.
+"""
+
+import os
+import struct
+import threading
+import time
+
+import logging
+
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_KEY = 'default'
+
+
+def _import_fcntl():
+    try:
+        import fcntl
+    except ImportError:
+        raise Exception("fcntl is required to govern requests across processes")
+    return fcntl
+
+
+class LocalSlots(object):
+    """Request slots shared by the threads of a process."""
+
+    def __init__(self, max_concurrent_requests):
+        self.semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+
+    def try_acquire(self):
+        """Acquire a slot without blocking.
+
+        Returns:
+            Slot or None if all slots are in use
+        """
+        return True if self.semaphore.acquire(False) else None
+
+    def release(self, slot):
+        self.semaphore.release()
+
+
+class FileSlots(object):
+    """Request slots shared by the processes of a host through lock files."""
+
+    def __init__(self, max_concurrent_requests, lock_directory, key=DEFAULT_KEY):
+        self.fcntl = _import_fcntl()
+        self.paths = [
+            os.path.join(lock_directory, '{}.slot{}.lock'.format(key, index))
+            for index in range(max_concurrent_requests)
+        ]
+        # Start searching for a free slot at a different position on each attempt
+        self._next_index = 0
+
+    def try_acquire(self):
+        """Acquire a slot without blocking.
+
+        Returns:
+            File descriptor of the locked slot or None if all slots are in use
+        """
+        num_slots = len(self.paths)
+        start_index = self._next_index
+        self._next_index = (start_index + 1) % num_slots
+        for offset in range(num_slots):
+            path = self.paths[(start_index + offset) % num_slots]
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                self.fcntl.flock(fd, self.fcntl.LOCK_EX | self.fcntl.LOCK_NB)
+            except (IOError, OSError):
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def release(self, slot):
+        try:
+            self.fcntl.flock(slot, self.fcntl.LOCK_UN)
+        finally:
+            os.close(slot)
+
+
+class LocalTokenBucket(object):
+    """Token bucket shared by the threads of a process."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    def _take(self, tokens, updated_at, now):
+        """Refill the bucket and take a token from it.
+
+        Returns:
+            Tuple with the tokens left, the refill time and the seconds to wait for a token
+            (0 if one was taken)
+        """
+        tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def try_take(self):
+        """Take a token without blocking.
+
+        Returns:
+            0 if a token was taken or the seconds to wait for the next one
+        """
+        with self.lock:
+            self.tokens, self.updated_at, wait = self._take(
+                self.tokens, self.updated_at, time.time())
+        return wait
+
+
+class FileTokenBucket(LocalTokenBucket):
+    """Token bucket shared by the processes of a host through a lock file."""
+
+    STATE_FORMAT = struct.Struct('>dd')
+
+    def __init__(self, rate, capacity, lock_directory, key=DEFAULT_KEY):
+        super(FileTokenBucket, self).__init__(rate, capacity)
+        self.fcntl = _import_fcntl()
+        self.path = os.path.join(lock_directory, '{}.bucket.lock'.format(key))
+
+    def try_take(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self.fcntl.flock(fd, self.fcntl.LOCK_EX)
+            data = os.read(fd, self.STATE_FORMAT.size)
+            if len(data) == self.STATE_FORMAT.size:
+                tokens, updated_at = self.STATE_FORMAT.unpack(data)
+            else:
+                tokens, updated_at = self.capacity, time.time()
+
+            tokens, updated_at, wait = self._take(tokens, updated_at, time.time())
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, self.STATE_FORMAT.pack(tokens, updated_at))
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+        return wait
+
+
+class ConcurrencyGovernor(object):
+    """Limit the requests in flight and the request rate of an account."""
+
+    def __init__(self, max_concurrent_requests=None, requests_per_second=None, burst=None,
+                 lock_directory=None, key=DEFAULT_KEY, poll_interval=0.005, max_poll_interval=0.1):
+        """Constructor.
+
+        Args:
+            max_concurrent_requests: Maximum number of requests in flight or None for no limit
+                (optional)
+            requests_per_second: Sustained request rate or None for no limit (optional)
+            burst: Number of requests that may be sent at once above the sustained rate.
+                Defaults to the number of requests per second (optional)
+            lock_directory: Directory of the lock files used to govern requests across
+                processes. The limits only apply within this process if not given (optional)
+            key: Account or integration identifier naming the lock files (optional)
+            poll_interval: Initial seconds to wait between attempts to get a free slot (optional)
+            max_poll_interval: Maximum seconds to wait between attempts (optional)
+        """
+        self.max_concurrent_requests = max_concurrent_requests
+        self.requests_per_second = requests_per_second
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+        self.slots = None
+        self.token_bucket = None
+        if max_concurrent_requests:
+            self.slots = FileSlots(max_concurrent_requests, lock_directory, key) \
+                if lock_directory else LocalSlots(max_concurrent_requests)
+        if requests_per_second:
+            capacity = max(1, burst or requests_per_second)
+            self.token_bucket = FileTokenBucket(requests_per_second, capacity, lock_directory, key) \
+                if lock_directory else LocalTokenBucket(requests_per_second, capacity)
+
+    def try_acquire(self, slot=None):
+        """Make an attempt at getting a permit without waiting.
+
+        Args:
+            slot: Slot held from a previous attempt (optional)
+
+        Returns:
+            Tuple with the slot held and the seconds to wait before the next attempt, which is
+            0 once the slot is the permit or None if no slot was free
+        """
+        if slot is None and self.slots is not None:
+            slot = self.slots.try_acquire()
+            if slot is None:
+                return None, None
+
+        wait = self.token_bucket.try_take() if self.token_bucket is not None else 0
+        return slot, wait
+
+    def acquire(self, timeout=None):
+        """Wait until a request may be sent.
+
+        Args:
+            timeout: Maximum number of seconds to wait or None to wait indefinitely (optional)
+
+        Returns:
+            Permit to release once the request is done
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        poll_interval = self.poll_interval
+        slot = None
+        while True:
+            slot, wait = self.try_acquire(slot)
+            if wait == 0:
+                return slot
+            if wait is None:
+                wait = poll_interval
+                poll_interval = min(poll_interval * 2, self.max_poll_interval)
+
+            if deadline is not None and time.time() + wait > deadline:
+                if slot is not None:
+                    self.slots.release(slot)
+                raise Exception("Timed out after {} seconds waiting to send a request".format(
+                    timeout))
+            time.sleep(wait)
+
+    def release(self, permit):
+        """Release the permit of a request that is done.
+
+        Args:
+            permit: Permit returned by acquire
+        """
+        if permit is not None and self.slots is not None:
+            self.slots.release(permit)
+
+    @contextmanager
+    def request(self, timeout=None):
+        """Context manager holding a permit while a request is sent.
+
+        Args:
+            timeout: Maximum number of seconds to wait or None to wait indefinitely (optional)
+        """
+        permit = self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release(permit)
+
+    @classmethod
+    def from_governance_model(cls, governance_model, account=None, lock_directory=None):
+        """Create a governor with the concurrency limits of a governance model.
+
+        Args:
+            governance_model: GovernanceModel instance
+            account: Account whose limits are used and naming the lock files (optional)
+            lock_directory: Directory of the lock files used to govern requests across
+                processes (optional)
+
+        Returns:
+            ConcurrencyGovernor instance
+        """
+        limits = governance_model.get_concurrency_limits(account)
+        return cls(
+            max_concurrent_requests=limits.get('max_concurrent_requests'),
+            requests_per_second=limits.get('requests_per_second'),
+            burst=limits.get('burst'),
+            lock_directory=lock_directory,
+            key=account or DEFAULT_KEY)
+
+
+class GovernedService(object):
+    """Proxy of a zeep service that sends each operation through a ConcurrencyGovernor."""
+
+    def __init__(self, service, governor):
+        """Constructor.
+
+        Args:
+            service: zeep service proxy
+            governor: ConcurrencyGovernor instance
+        """
+        self._service = service
+        self._governor = governor
+
+    def _govern(self, operation):
+        governor = self._governor
+
+        def governed_operation(*args, **kwargs):
+            with governor.request():
+                return operation(*args, **kwargs)
+
+        return governed_operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        governed_operation = self._govern(attr)
+        setattr(self, name, governed_operation)
+        return governed_operation
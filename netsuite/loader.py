@@ -0,0 +1,235 @@
+"""Record loader.
+
+Coalesces single record gets into getList calls, in the spirit of DataLoader. Records requested
+within a short window, or within an explicit scope, are deduplicated and fetched with as few
+getList calls as possible, and each caller gets back its own record.
+"""
+
+import logging
+import threading
+
+from concurrent.futures import Future
+
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RecordLoader(object):
+    """Coalesce single record gets into getList calls."""
+
+    # Seconds to wait for more requests before calling getList
+    DEFAULT_WINDOW = 0.005
+
+    # Maximum number of records per getList call if the governance model has no limit for it
+    DEFAULT_MAX_BATCH_SIZE = 100
+
+    # Governance operation category of getList
+    GET_LIST_OPERATION_CATEGORY = 'get'
+
+    def __init__(self, client, window=DEFAULT_WINDOW, max_batch_size=None, governance_model=None):
+        """Constructor.
+
+        Args:
+            client: Netsuite API client
+            window: Seconds to wait for more requests before calling getList (optional)
+            max_batch_size: Maximum number of records per getList call, defaults to the limit
+                of the governance model in effect or DEFAULT_MAX_BATCH_SIZE (optional)
+            governance_model: GovernanceModel limiting the records of getList calls (optional)
+        """
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.governance_model = governance_model
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._in_flight = {}
+        # Requests held until the scope of the thread that made them exits
+        self._scoped = {}
+        self._timer = None
+        # Scope depth and keys requested within the scope, per thread
+        self._local = threading.local()
+
+    def get_max_batch_size(self):
+        """Get the maximum number of records per getList call in effect.
+
+        Returns:
+            Maximum number of records
+        """
+        if self.max_batch_size:
+            return self.max_batch_size
+
+        if self.governance_model is not None:
+            max_record_count = self.governance_model.get_record_count_limit(self.GET_LIST_OPERATION_CATEGORY)
+            if max_record_count:
+                return max_record_count
+
+        return self.DEFAULT_MAX_BATCH_SIZE
+
+    def _in_scope(self):
+        return getattr(self._local, 'depth', 0) > 0
+
+    def load(self, record_type, internal_id):
+        """Request a record.
+
+        Args:
+            record_type: Type of record
+            internal_id: Record internal identifier
+
+        Returns:
+            Future resolved with the record
+        """
+        key = (record_type, str(internal_id))
+        in_scope = self._in_scope()
+        dispatch_now = False
+        with self._lock:
+            future = self._pending.get(key) or self._in_flight.get(key)
+            if future is not None:
+                return future
+
+            future = self._scoped.get(key)
+            if future is not None and in_scope and key in self._local.keys:
+                return future
+
+            if future is None:
+                future = Future()
+            else:
+                # Requested within the scope of another thread, which must not hold this one
+                del self._scoped[key]
+
+            if in_scope:
+                self._scoped[key] = future
+                self._local.keys.append(key)
+            else:
+                self._pending[key] = future
+                if len(self._pending) >= self.get_max_batch_size():
+                    dispatch_now = True
+                else:
+                    self._schedule_dispatch()
+
+        if dispatch_now:
+            self.dispatch()
+
+        return future
+
+    def load_many(self, record_type, internal_ids):
+        """Request several records of the same type.
+
+        Args:
+            record_type: Type of record
+            internal_ids: Records internal identifiers
+
+        Returns:
+            List of futures resolved with the records in the same order
+        """
+        return [self.load(record_type, internal_id) for internal_id in internal_ids]
+
+    def get(self, record_type, internal_id, timeout=None):
+        """Get a record, waiting for the getList call that fetches it.
+
+        Within a scope, the records requested so far in the scope are dispatched right away
+        along with this one rather than when the scope exits.
+
+        Args:
+            record_type: Type of record
+            internal_id: Record internal identifier
+            timeout: Maximum number of seconds to wait (optional)
+
+        Returns:
+            The record
+        """
+        future = self.load(record_type, internal_id)
+        if self._in_scope() and not future.done():
+            self._dispatch_scope()
+        return future.result(timeout)
+
+    @contextmanager
+    def scope(self):
+        """Collect every record requested by this thread within the scope into the same getList calls.
+
+        Requests are dispatched when the outermost scope exits.
+        """
+        if not self._in_scope():
+            self._local.depth = 0
+            self._local.keys = []
+        self._local.depth += 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                self._dispatch_scope()
+
+    def _dispatch_scope(self):
+        """Dispatch the requests held by the scope of the current thread."""
+        with self._lock:
+            for key in self._local.keys:
+                future = self._scoped.pop(key, None)
+                if future is not None:
+                    self._pending[key] = future
+            self._local.keys = []
+        self.dispatch()
+
+    def _schedule_dispatch(self):
+        """Schedule a dispatch at the end of the window (must hold the lock)."""
+        if self._timer is not None:
+            return
+
+        self._timer = threading.Timer(self.window, self.dispatch)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def dispatch(self):
+        """Fetch every pending record with getList calls."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending = self._pending
+            self._pending = {}
+            self._in_flight.update(pending)
+
+        keys = list(pending)
+        max_batch_size = self.get_max_batch_size()
+        for start in range(0, len(keys), max_batch_size):
+            batch_keys = keys[start:start + max_batch_size]
+            try:
+                self._fetch(batch_keys, pending)
+            except Exception as exception:
+                for key in batch_keys:
+                    if not pending[key].done():
+                        pending[key].set_exception(exception)
+            finally:
+                with self._lock:
+                    for key in batch_keys:
+                        self._in_flight.pop(key, None)
+
+    def _fetch(self, keys, futures):
+        """Fetch a batch of records with a single getList call.
+
+        Args:
+            keys: List of (record_type, internal_id) tuples
+            futures: Dictionary of futures to resolve by key
+        """
+        LOGGER.debug('Fetching %d record(s) with getList', len(keys))
+        record_ref_type = self.client.models.Core.RecordRef
+        record_refs = [
+            record_ref_type(internalId=internal_id, type=record_type)
+            for record_type, internal_id in keys
+        ]
+        response = self.client.get_list(record_refs)
+
+        # Responses are returned in the same order as the references
+        read_responses = response.readResponseList.readResponse
+        for key, read_response in zip(keys, read_responses):
+            if read_response.status.isSuccess:
+                futures[key].set_result(self.client._serialize(read_response.record))
+            else:
+                futures[key].set_exception(Exception(
+                    "Could not retrieve Record of type={} with internalId={}: {}".format(
+                        key[0], key[1], read_response.status)))
+
+        for key in keys[len(read_responses):]:
+            futures[key].set_exception(Exception(
+                "No response for Record of type={} with internalId={}".format(*key)))
@@ -0,0 +1,304 @@
+"""Local mirror of reference records.
+
+Keeps chosen record types (departments, subsidiaries, employees, ...) in an embedded SQLite
+store indexed by internal identifier, external identifier, name and parent, so that lookups do
+not need a request. The mirror is refreshed incrementally with DeltaSync for record types whose
+search supports a last modified date, and fully reloaded otherwise.
+
+Mirrored records are stored serialized, so they are returned as dictionaries.
+"""
+
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+
+from collections import namedtuple
+
+from dateutil.tz import tzutc
+
+from .api.types import RecordType
+from .serializers import CompiledSerializer
+from .sync import DeltaSync
+
+LOGGER = logging.getLogger(__name__)
+
+# How a record type is searched and which of its fields are indexed
+MirrorDefinition = namedtuple('MirrorDefinition', [
+    'search_type_name',
+    # Last modified date field used for incremental refreshes or None for full reloads
+    'modified_field',
+    'name_field',
+    'parent_field'
+])
+
+DEFAULT_MIRROR_DEFINITIONS = {
+    RecordType.Department: MirrorDefinition('DepartmentSearchBasic', None, 'name', 'parent'),
+    RecordType.Subsidiary: MirrorDefinition('SubsidiarySearchBasic', None, 'name', 'parent'),
+    RecordType.Location: MirrorDefinition('LocationSearchBasic', None, 'name', 'parent'),
+    RecordType.Employee: MirrorDefinition(
+        'EmployeeSearchBasic', 'lastModifiedDate', 'entityId', 'supervisor'),
+    RecordType.Customer: MirrorDefinition(
+        'CustomerSearchBasic', 'lastModifiedDate', 'entityId', 'parent'),
+}
+
+
+def _json_default(value):
+    return str(value)
+
+
+def _get_reference_id(value):
+    """Get the internal identifier of a serialized reference."""
+    if isinstance(value, dict):
+        return value.get('internalId')
+    return value
+
+
+class MirrorStore(object):
+    """SQLite store of mirrored records."""
+
+    UPSERT_STATEMENT = (
+        "INSERT OR REPLACE INTO records"
+        " (record_type, internal_id, external_id, name, parent_id, payload)"
+        " VALUES (?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path: Path of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " record_type TEXT NOT NULL,"
+                " internal_id TEXT NOT NULL,"
+                " external_id TEXT,"
+                " name TEXT,"
+                " parent_id TEXT,"
+                " payload TEXT NOT NULL,"
+                " PRIMARY KEY (record_type, internal_id));"
+                "CREATE INDEX IF NOT EXISTS records_external_id ON records (record_type, external_id);"
+                "CREATE INDEX IF NOT EXISTS records_name ON records (record_type, name);"
+                "CREATE INDEX IF NOT EXISTS records_parent_id ON records (record_type, parent_id);"
+                "CREATE TABLE IF NOT EXISTS record_types ("
+                " record_type TEXT PRIMARY KEY,"
+                " refreshed_at TEXT NOT NULL);")
+
+    @staticmethod
+    def _get_rows(record_type, records, name_field, parent_field):
+        return [
+            (record_type,
+             str(record['internalId']),
+             record.get('externalId'),
+             record.get(name_field),
+             _get_reference_id(record.get(parent_field)),
+             json.dumps(record, default=_json_default))
+            for record in records
+        ]
+
+    def upsert(self, record_type, records, name_field='name', parent_field='parent'):
+        """Insert or replace records.
+
+        Args:
+            record_type: Type of record
+            records: List of serialized records
+            name_field: Name of the field indexed as the record name (optional)
+            parent_field: Name of the field indexed as the record parent (optional)
+        """
+        rows = self._get_rows(record_type, records, name_field, parent_field)
+        with self._lock, self._connection:
+            self._connection.executemany(self.UPSERT_STATEMENT, rows)
+
+    def delete(self, record_type, internal_ids):
+        """Delete records.
+
+        Args:
+            record_type: Type of record
+            internal_ids: Internal identifiers of the records to delete
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM records WHERE record_type = ? AND internal_id = ?",
+                [(record_type, str(internal_id)) for internal_id in internal_ids])
+
+    def replace_all(self, record_type, records, name_field='name', parent_field='parent'):
+        """Replace every record of a type in a single transaction.
+
+        Args:
+            record_type: Type of record
+            records: List of serialized records
+            name_field: Name of the field indexed as the record name (optional)
+            parent_field: Name of the field indexed as the record parent (optional)
+        """
+        rows = self._get_rows(record_type, records, name_field, parent_field)
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM records WHERE record_type = ?", (record_type,))
+            self._connection.executemany(self.UPSERT_STATEMENT, rows)
+
+    def mark_refreshed(self, record_type):
+        """Record that a record type was refreshed.
+
+        Args:
+            record_type: Type of record
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO record_types (record_type, refreshed_at) VALUES (?, ?)",
+                (record_type, datetime.datetime.now(tzutc()).isoformat()))
+
+    def has_record_type(self, record_type):
+        """Check if a record type has been mirrored.
+
+        Args:
+            record_type: Type of record
+
+        Returns:
+            True if the record type was refreshed at least once or False otherwise
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM record_types WHERE record_type = ?", (record_type,)).fetchone()
+        return row is not None
+
+    def _query(self, where, params):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT payload FROM records WHERE " + where, params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def get(self, record_type, internal_id):
+        """Get a record by its internal identifier.
+
+        Returns:
+            Serialized record or None if not found
+        """
+        records = self._query(
+            "record_type = ? AND internal_id = ?", (record_type, str(internal_id)))
+        return records[0] if records else None
+
+    def get_by_external_id(self, record_type, external_id):
+        """Get a record by its external identifier.
+
+        Returns:
+            Serialized record or None if not found
+        """
+        records = self._query(
+            "record_type = ? AND external_id = ?", (record_type, external_id))
+        return records[0] if records else None
+
+    def find(self, record_type, name=None, parent_id=None):
+        """Find the records of a type, optionally by name and parent.
+
+        Args:
+            record_type: Type of record
+            name: Name of the records (optional)
+            parent_id: Internal identifier of the parent of the records (optional)
+
+        Returns:
+            List of serialized records
+        """
+        where = "record_type = ?"
+        params = [record_type]
+        if name is not None:
+            where += " AND name = ?"
+            params.append(name)
+        if parent_id is not None:
+            where += " AND parent_id = ?"
+            params.append(str(parent_id))
+        return self._query(where, tuple(params))
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+
+class RecordMirror(object):
+    """Mirror of reference record types kept in a MirrorStore."""
+
+    # Number of changed records written to the store at once during incremental refreshes
+    UPSERT_BATCH_SIZE = 500
+
+    def __init__(self, client, store, checkpoint_store=None, definitions=None):
+        """Constructor.
+
+        Args:
+            client: Netsuite API client
+            store: MirrorStore
+            checkpoint_store: CheckpointStore used for incremental refreshes (optional)
+            definitions: Dictionary of MirrorDefinition by record type (optional)
+        """
+        self.client = client
+        self.store = store
+        self.checkpoint_store = checkpoint_store
+        self.definitions = definitions or DEFAULT_MIRROR_DEFINITIONS
+        self.serializer = CompiledSerializer()
+        self.search_type_record_types = dict(
+            (definition.search_type_name, record_type)
+            for record_type, definition in self.definitions.items())
+
+    def _to_dict(self, record):
+        return record if isinstance(record, dict) else self.serializer.serialize(record)
+
+    def get_record_type_for_search(self, search_type_name):
+        """Get the record type mirrored with a given search type.
+
+        Returns:
+            Record type or None if no mirrored type is searched with it
+        """
+        return self.search_type_record_types.get(search_type_name)
+
+    def is_available(self, record_type):
+        """Check if a record type can be served from the mirror."""
+        return record_type in self.definitions and self.store.has_record_type(record_type)
+
+    def refresh(self, record_type):
+        """Refresh the mirrored records of a type.
+
+        Args:
+            record_type: Type of record
+        """
+        definition = self.definitions[record_type]
+        if definition.modified_field and self.checkpoint_store is not None:
+            sync = DeltaSync(self.client, self.checkpoint_store, definition.modified_field)
+            changed = []
+
+            def flush():
+                if changed:
+                    self.store.upsert(
+                        record_type, changed, definition.name_field, definition.parent_field)
+                    del changed[:]
+
+            def on_record(record):
+                changed.append(self._to_dict(record))
+                if len(changed) >= self.UPSERT_BATCH_SIZE:
+                    flush()
+
+            def on_delete(deleted_record):
+                # Changes are written first so they cannot bring back a deleted record
+                flush()
+                self.store.delete(record_type, [deleted_record.record.internalId])
+
+            # Every change is written before the checkpoint is saved
+            sync.sync(record_type, definition.search_type_name,
+                      on_record=on_record, on_delete=on_delete, on_complete=flush)
+        else:
+            SearchType = self.client.models[definition.search_type_name]
+            records = [
+                self._to_dict(record)
+                for record in self.client.iter_search_all(SearchType(), serialize=False)
+            ]
+            self.store.replace_all(
+                record_type, records, definition.name_field, definition.parent_field)
+
+        self.store.mark_refreshed(record_type)
+        LOGGER.info('Refreshed mirror of %s', record_type)
+
+    def refresh_all(self):
+        """Refresh every mirrored record type."""
+        for record_type in self.definitions:
+            self.refresh(record_type)
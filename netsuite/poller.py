@@ -0,0 +1,297 @@
+"""Asynchronous job polling.
+
+AsyncJobPoller tracks any number of asynchronous jobs (asyncAddList, asyncSearch, ...) from a
+single background thread. Each job is checked on its own schedule with exponential backoff
+and jitter, shortened when Netsuite estimates the job is about to complete. Once a job
+completes, all the pages of its result are fetched, concurrently after the 1st one, and
+delivered through the future returned when the job was tracked and an optional callback.
+A job whose status cannot be checked a number of times in a row fails.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+
+import logging
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+
+from .api.types import AsyncStatusType
+
+LOGGER = logging.getLogger(__name__)
+
+COMPLETED_STATUSES = frozenset([AsyncStatusType.FINISHED, AsyncStatusType.FINISHED_WITH_ERRORS])
+
+
+def get_total_pages(async_result):
+    """Get the number of pages of the result of an asynchronous job.
+
+    Args:
+        async_result: 1st page of the result
+
+    Returns:
+        Number of pages, 1 if the result is not paginated
+    """
+    search_result = getattr(async_result, 'searchResult', None)
+    total_pages = getattr(search_result, 'totalPages', None) or getattr(async_result, 'totalPages', None)
+    return total_pages or 1
+
+
+def get_write_responses(pages):
+    """Get the write responses from the result pages of an asynchronous list operation.
+
+    Args:
+        pages: List of AsyncResult pages
+
+    Returns:
+        List of write responses
+    """
+    write_responses = []
+    for page in pages:
+        write_response_list = getattr(page, 'writeResponseList', None)
+        write_responses += (write_response_list.writeResponse if write_response_list else None) or []
+    return write_responses
+
+
+def get_search_records(pages):
+    """Get the records from the result pages of an asynchronous search.
+
+    Args:
+        pages: List of AsyncResult pages
+
+    Returns:
+        List of records found
+    """
+    records = []
+    for page in pages:
+        search_result = getattr(page, 'searchResult', None)
+        record_list = getattr(search_result, 'recordList', None)
+        records += (record_list.record if record_list else None) or []
+    return records
+
+
+class _TrackedJob(object):
+    """Asynchronous job being polled."""
+
+    def __init__(self, job_id, future, result_handler, callback, interval):
+        self.job_id = job_id
+        self.future = future
+        self.result_handler = result_handler
+        self.callback = callback
+        self.interval = interval
+        self.checks = 0
+        # Checks that failed in a row
+        self.failures = 0
+
+
+class AsyncJobPoller(object):
+    """Poll many asynchronous jobs from a single thread."""
+
+    def __init__(self, client, initial_interval=1.0, max_interval=60.0, backoff=2.0, jitter=0.2,
+                 max_workers=4, max_check_failures=5):
+        """Constructor.
+
+        Args:
+            client: Netsuite API client
+            initial_interval: Seconds before the 1st check of a job (optional)
+            max_interval: Maximum seconds between checks of a job (optional)
+            backoff: Factor by which the interval between checks grows (optional)
+            jitter: Fraction of the interval by which each check is randomly moved (optional)
+            max_workers: Maximum number of result pages fetched concurrently (optional)
+            max_check_failures: Number of checks of a job failing in a row after which the job
+                fails (optional)
+        """
+        self.client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.max_workers = max_workers
+        self.max_check_failures = max_check_failures
+
+        # Heap of (check time, sequence, job) and the jobs being polled by identifier
+        self._schedule = []
+        self._sequence = itertools.count()
+        self.jobs = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._executor = None
+
+    def track(self, job_id, result_handler=None, callback=None):
+        """Start polling a job.
+
+        Args:
+            job_id: Asynchronous job identifier
+            result_handler: Callable converting the list of result pages into the result of the
+                future, e.g. get_write_responses (optional)
+            callback: Callable called with the job identifier and the future once the job
+                completes or fails (optional)
+
+        Returns:
+            Future whose result is the list of result pages or what result_handler returns
+        """
+        future = Future()
+        job = _TrackedJob(job_id, future, result_handler, callback, self.initial_interval)
+        with self._condition:
+            if self._closed:
+                raise Exception("Poller is closed")
+            if job_id in self.jobs:
+                raise Exception("Job {} is already being polled".format(job_id))
+            self.jobs[job_id] = job
+            self._schedule_check(job, self._with_jitter(self.initial_interval))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='NetsuiteAsyncJobPoller')
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        LOGGER.debug("Polling asynchronous job %s", job_id)
+        return future
+
+    def _with_jitter(self, interval):
+        return max(0, interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _schedule_check(self, job, delay):
+        heapq.heappush(self._schedule, (time.time() + delay, next(self._sequence), job))
+
+    def _run(self):
+        """Check the jobs as they become due until the poller is closed."""
+        while True:
+            with self._condition:
+                while not self._closed and (not self._schedule or self._schedule[0][0] > time.time()):
+                    self._condition.wait(self._schedule[0][0] - time.time() if self._schedule else None)
+                if self._closed:
+                    return
+
+                now = time.time()
+                due_jobs = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due_jobs.append(heapq.heappop(self._schedule)[2])
+
+            for job in due_jobs:
+                if self._closed:
+                    return
+                self._check(job)
+
+    def _check(self, job):
+        """Check the status of a job, collecting its result once it completes."""
+        if job.future.cancelled():
+            LOGGER.debug("Stopped polling cancelled asynchronous job %s", job.job_id)
+            with self._condition:
+                self.jobs.pop(job.job_id, None)
+            return
+
+        job.checks += 1
+        try:
+            async_status_result = self.client.check_async_status(job.job_id)
+        except Exception as e:
+            job.failures += 1
+            if job.failures >= self.max_check_failures:
+                self._complete(job, exception=e)
+                return
+            LOGGER.warning("Failed to check asynchronous job %s (%d in a row)",
+                           job.job_id, job.failures, exc_info=True)
+            self._reschedule(job, None)
+            return
+        job.failures = 0
+
+        status = async_status_result.status
+        if status in COMPLETED_STATUSES:
+            LOGGER.info("Asynchronous job %s completed with status %s after %d check(s)",
+                        job.job_id, status, job.checks)
+            self._collect(job)
+        elif status == AsyncStatusType.FAILED:
+            self._complete(job, exception=Exception(async_status_result))
+        else:
+            self._reschedule(job, async_status_result)
+
+    def _reschedule(self, job, async_status_result):
+        """Schedule the next check of a job that is still running."""
+        job.interval = min(self.max_interval, job.interval * self.backoff)
+        delay = job.interval
+
+        # Check again around the time Netsuite estimates the job completes if sooner
+        estimated_remaining = getattr(async_status_result, 'estRemainingDuration', None)
+        if estimated_remaining:
+            delay = max(self.initial_interval, min(delay, float(estimated_remaining)))
+
+        with self._condition:
+            if self._closed:
+                return
+            self._schedule_check(job, self._with_jitter(delay))
+
+    def _collect(self, job):
+        """Fetch all the result pages of a completed job, the pages after the 1st concurrently."""
+        try:
+            first_page = self.client.get_async_result(job.job_id, 1)
+            total_pages = get_total_pages(first_page)
+            pages = [first_page]
+            if total_pages > 1:
+                pages += list(self._get_executor().map(
+                    lambda page_index: self.client.get_async_result(job.job_id, page_index),
+                    range(2, total_pages + 1)))
+            result = job.result_handler(pages) if job.result_handler else pages
+        except Exception as e:
+            self._complete(job, exception=e)
+            return
+        self._complete(job, result=result)
+
+    def _complete(self, job, result=None, exception=None):
+        with self._condition:
+            self.jobs.pop(job.job_id, None)
+
+        # The future may have been cancelled by its owner or by close in the meantime
+        if not job.future.set_running_or_notify_cancel():
+            LOGGER.debug("Discarding the result of cancelled asynchronous job %s", job.job_id)
+            return
+
+        if exception is not None:
+            LOGGER.error("Asynchronous job %s failed: %s", job.job_id, exception)
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+        if job.callback is not None:
+            try:
+                job.callback(job.job_id, job.future)
+            except Exception:
+                LOGGER.exception("Callback of asynchronous job %s failed", job.job_id)
+
+    def _get_executor(self):
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def wait(self, timeout=None):
+        """Wait for the jobs being polled to complete.
+
+        Args:
+            timeout: Maximum number of seconds to wait (optional)
+        """
+        with self._condition:
+            futures = [job.future for job in self.jobs.values()]
+        wait_futures(futures, timeout)
+
+    def close(self):
+        """Stop polling, cancelling the futures of the jobs still running."""
+        with self._condition:
+            self._closed = True
+            jobs = list(self.jobs.values())
+            self.jobs.clear()
+            self._condition.notify_all()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        for job in jobs:
+            job.future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,208 @@
+"""Per-record results of list writes.
+
+List operations (addList, updateList, deleteList and their asynchronous versions) answer with
+one writeResponse per record, in the order of the records sent. map_write_responses pairs them
+back with the records so that failures can be handled record by record: records failing with a
+retryable error code can be sent again while the others are written to a dead-letter sink.
+"""
+
+import abc
+import logging
+
+from collections import namedtuple
+
+import six
+from requests.exceptions import ConnectionError, ConnectTimeout
+from urllib3.exceptions import ConnectTimeoutError
+from zeep.exceptions import Fault
+
+from .export import NdjsonSink
+from .serializers import CompiledSerializer
+
+LOGGER = logging.getLogger(__name__)
+
+# Error codes of failures which may succeed if the record is sent again
+RETRYABLE_ERROR_CODES = frozenset([
+    'UNEXPECTED_ERROR',
+    'RCRD_HAS_BEEN_CHANGED',
+    'RCRD_LOCKED_BY_WF',
+    'SSS_REQUEST_LIMIT_EXCEEDED',
+    'SSS_TIME_LIMIT_EXCEEDED',
+    'WS_CONCUR_SESSION_DISALLWD',
+    'WS_REQUEST_BLOCKED',
+    'ONLY_ONE_REQUEST_AT_A_TIME'
+])
+
+# Code of the results of records whose whole request failed without telling whether Netsuite
+# applied it, e.g. on a read timeout, so sending them again may write them twice
+REQUEST_FAILED_CODE = 'REQUEST_FAILED'
+
+# Code of the results of records whose request failed before it was sent
+REQUEST_NOT_SENT_CODE = 'REQUEST_NOT_SENT'
+
+RecordResult = namedtuple('RecordResult', [
+    'record',
+    'is_success',
+    # Code and message of the 1st error detail of a failure
+    'code',
+    'message',
+    # Reference to the record written
+    'base_ref',
+    'write_response'
+])
+
+
+def map_write_response(record, write_response):
+    """Pair a record with its write response.
+
+    Args:
+        record: Record or reference sent
+        write_response: WriteResponse of the record
+
+    Returns:
+        RecordResult instance
+    """
+    status = write_response.status
+    code = message = None
+    if not status.isSuccess:
+        status_details = status.statusDetail or []
+        if status_details:
+            code = status_details[0].code
+            message = status_details[0].message
+
+    return RecordResult(
+        record=record,
+        is_success=bool(status.isSuccess),
+        code=code,
+        message=message,
+        base_ref=getattr(write_response, 'baseRef', None),
+        write_response=write_response)
+
+
+def map_write_responses(records, write_responses):
+    """Pair records with the write responses of the list operation that sent them.
+
+    Args:
+        records: List of records or references sent
+        write_responses: List of write responses in the same order
+
+    Returns:
+        List of RecordResult
+    """
+    if len(records) != len(write_responses):
+        raise Exception("Got {} write responses for {} records".format(
+            len(write_responses), len(records)))
+
+    return [
+        map_write_response(record, write_response)
+        for record, write_response in zip(records, write_responses)
+    ]
+
+
+def get_request_failure_code(exception):
+    """Get the error code of a request that failed as a whole.
+
+    Args:
+        exception: Exception raised by the request
+
+    Returns:
+        Code of the Netsuite fault or status rejecting the request, REQUEST_NOT_SENT_CODE if
+        no connection could be established or REQUEST_FAILED_CODE otherwise
+    """
+    if isinstance(exception, Fault):
+        # Netsuite faults carry their code in an element of the fault detail
+        for node in (exception.detail.iter() if exception.detail is not None else []):
+            if isinstance(node.tag, str) and node.tag.rsplit('}', 1)[-1] == 'code' and node.text:
+                return node.text.strip()
+        return REQUEST_FAILED_CODE
+
+    # Status of a list operation rejected as a whole
+    status = exception.args[0] if exception.args else None
+    status_details = getattr(status, 'statusDetail', None)
+    if status_details:
+        return status_details[0].code
+
+    if isinstance(exception, ConnectTimeout):
+        return REQUEST_NOT_SENT_CODE
+    if isinstance(exception, ConnectionError):
+        reason = getattr(status, 'reason', None)
+        if isinstance(reason, ConnectTimeoutError):
+            # Also raised when the connection is refused or the host cannot be resolved
+            return REQUEST_NOT_SENT_CODE
+    return REQUEST_FAILED_CODE
+
+
+def map_request_failure(records, exception):
+    """Build the results of records whose whole request failed.
+
+    Args:
+        records: List of records or references sent
+        exception: Exception raised by the request
+
+    Returns:
+        List of RecordResult
+    """
+    code = get_request_failure_code(exception)
+    return [
+        RecordResult(
+            record=record,
+            is_success=False,
+            code=code,
+            message=str(exception),
+            base_ref=None,
+            write_response=None)
+        for record in records
+    ]
+
+
+@six.add_metaclass(abc.ABCMeta)
+class DeadLetterSink(object):
+    """Destination of the records which could not be written."""
+
+    @abc.abstractmethod
+    def write(self, results):
+        """Write the results of failed records.
+
+        Args:
+            results: List of RecordResult
+        """
+
+    def close(self):
+        pass
+
+
+class MemoryDeadLetterSink(DeadLetterSink):
+    """Keep the results of failed records in a list."""
+
+    def __init__(self):
+        self.results = []
+
+    def write(self, results):
+        self.results += results
+
+
+class NdjsonDeadLetterSink(DeadLetterSink):
+    """Write the failed records as newline delimited JSON with their error code and message."""
+
+    def __init__(self, output, compress=False):
+        """Constructor.
+
+        Args:
+            output: Path of the file to write or binary stream
+            compress: Whether to gzip compress the output (optional)
+        """
+        self.sink = NdjsonSink(output, compress)
+        self.serializer = CompiledSerializer()
+
+    def write(self, results):
+        self.sink.write_page([
+            {
+                'code': result.code,
+                'message': result.message,
+                'record': self.serializer.serialize(result.record)
+            }
+            for result in results
+        ])
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,144 @@
+"""Serializers.
+
+CompiledSerializer is a faster alternative to zeep.helpers.serialize_object. Instead of
+inspecting every object at runtime, it compiles a conversion function per zeep type on its
+1st occurrence and reuses it for every following object of that type. Use it by passing an
+instance as the serialize_object_class of NetsuiteApiClient::
+
+    client = NetsuiteApiClient(api_config, serialize_object_class=CompiledSerializer(skip_none=True))
+"""
+
+import datetime
+import decimal
+
+from lxml import etree
+from zeep.xsd.valueobjects import CompoundValue
+
+try:
+    SCALAR_TYPES = (str, unicode, int, long, float, bool, bytes, bytearray)  # noqa: F821
+except NameError:  # Python 3
+    SCALAR_TYPES = (str, int, float, bool, bytes, bytearray)
+
+SCALAR_TYPES += (
+    decimal.Decimal,
+    datetime.datetime,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    type(None)
+)
+
+
+class CompiledSerializer(object):
+    """Serialize zeep objects with conversion functions compiled per type."""
+
+    def __init__(self, target_cls=dict, skip_none=False):
+        """Constructor.
+
+        Args:
+            target_cls: Class used for serialized objects (optional)
+            skip_none: Whether to leave out fields whose value is None (optional)
+        """
+        self.target_cls = target_cls
+        self.skip_none = skip_none
+        self._converters = dict((scalar_type, _identity) for scalar_type in SCALAR_TYPES)
+
+    def __call__(self, obj):
+        return self.serialize(obj)
+
+    def serialize(self, obj):
+        """Serialize an object.
+
+        Args:
+            obj: zeep object, list, dict or scalar value
+
+        Returns:
+            Serialized object
+        """
+        converter = self._converters.get(type(obj))
+        if converter is None:
+            converter = self._compile(obj)
+        return converter(obj)
+
+    def _compile(self, sample):
+        """Compile the conversion function for the type of a given object.
+
+        Args:
+            sample: Object whose type the function is compiled for
+
+        Returns:
+            Conversion function
+        """
+        obj_type = type(sample)
+        if isinstance(sample, CompoundValue):
+            # Every instance of a zeep type holds the same fields
+            converter = self._compile_compound_value(tuple(sample.__values__))
+        elif isinstance(sample, (list, tuple)):
+            converter = self._serialize_list
+        elif isinstance(sample, dict):
+            converter = self._serialize_dict
+        else:
+            converter = _identity
+
+        self._converters[obj_type] = converter
+        return converter
+
+    def _compile_compound_value(self, field_names):
+        """Compile the conversion function for a zeep type with the given fields."""
+        converters = self._converters
+        serialize = self.serialize
+        target_cls = self.target_cls
+        skip_none = self.skip_none
+
+        def convert(obj):
+            values = obj.__values__
+            result = target_cls()
+            for name in field_names:
+                value = values.get(name)
+                if value is None:
+                    if not skip_none:
+                        result[name] = None
+                    continue
+                converter = converters.get(type(value))
+                result[name] = converter(value) if converter is not None else serialize(value)
+            return result
+
+        return convert
+
+    def _serialize_list(self, obj):
+        serialize = self.serialize
+        return [serialize(item) for item in obj]
+
+    def _serialize_dict(self, obj):
+        serialize = self.serialize
+        result = self.target_cls()
+        for key, value in obj.items():
+            if value is None and self.skip_none:
+                continue
+            result[key] = serialize(value)
+        return result
+
+
+def _identity(obj):
+    return obj
+
+
+def estimate_soap_size(record):
+    """Estimate the number of bytes a record takes in the body of a SOAP request.
+
+    Zeep objects are rendered with their XSD type, which leaves out the namespace declarations
+    of the envelope. Other objects are estimated from their string representation.
+
+    Args:
+        record: Record or reference to send
+
+    Returns:
+        Estimated size in bytes
+    """
+    xsd_type = getattr(record, '_xsd_type', None)
+    if xsd_type is None:
+        return len(str(record))
+
+    node = etree.Element('record')
+    xsd_type.render(node, record)
+    return len(etree.tostring(node))
@@ -0,0 +1,271 @@
+"""Precompiled WSDL snapshots.
+
+Parsing the Netsuite WSDL and all its XSDs takes seconds even when the documents are cached.
+A snapshot is the pickled SOAP client, with its parsed schema and registered namespace
+prefixes, which loads in a fraction of that time. Snapshots are versioned by the WSDL URL, the
+zeep version and the snapshot format so that a stale snapshot is never used.
+
+Snapshots are pickles, so only load snapshots built by a trusted process.
+
+Build one ahead of time (e.g. when building a container image) with::
+
+    python -m netsuite.snapshot WSDL_URL DIRECTORY
+"""
+
+try:
+    import copyreg
+except ImportError:  # Python 2
+    import copy_reg as copyreg
+
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+
+import attr
+from lxml import etree
+
+import zeep
+from zeep import Client
+from zeep.settings import Settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump whenever the layout of a snapshot changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Recursion limit used while (un)pickling the deeply nested schema objects
+SNAPSHOT_RECURSION_LIMIT = 20000
+
+_TRANSPORT_PERSISTENT_ID = 'transport'
+
+# Modules of the classes zeep creates at runtime
+_DYNAMIC_TYPE_MODULES = frozenset(['zeep.objects', 'zeep.xsd.dynamic_types'])
+
+
+def _reduce_qname(qname):
+    return etree.QName, (qname.text,)
+
+
+def _reduce_element(element):
+    return etree.fromstring, (etree.tostring(element),)
+
+
+def _reduce_thread_local(_):
+    return threading.local, ()
+
+
+def _build_settings(values):
+    return Settings(**values)
+
+
+def _reduce_settings(settings):
+    # Settings forwards attribute lookups, including the pickling protocol, to its thread
+    # local overrides, so it is rebuilt from its fields with fresh overrides instead
+    values = dict(
+        (field.name.lstrip('_'), object.__getattribute__(settings, field.name))
+        for field in attr.fields(Settings)
+        if field.name != '_tls')
+    return _build_settings, (values,)
+
+
+def _reduce_dynamic_type(cls):
+    attributes = dict(
+        (name, value) for name, value in vars(cls).items()
+        if name not in ('__dict__', '__weakref__'))
+    return type, (cls.__name__, cls.__bases__, attributes)
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickler that leaves the transport out of the snapshot.
+
+    The reducers of the lxml and zeep types that cannot be pickled are only registered on
+    this pickler rather than globally with copyreg. The classes zeep creates for every type of
+    the schema cannot be imported, so they are pickled by value, which requires Python 3.8+.
+    """
+
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table.update({
+        etree.QName: _reduce_qname,
+        etree._Element: _reduce_element,
+        type(threading.local()): _reduce_thread_local,
+        Settings: _reduce_settings
+    })
+
+    def __init__(self, snapshot_file, transport):
+        pickle.Pickler.__init__(self, snapshot_file, pickle.HIGHEST_PROTOCOL)
+        self.transport = transport
+
+    def persistent_id(self, obj):
+        if obj is self.transport:
+            return _TRANSPORT_PERSISTENT_ID
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, type) and obj.__module__ in _DYNAMIC_TYPE_MODULES:
+            return _reduce_dynamic_type(obj)
+        return NotImplemented
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler that plugs the given transport in the snapshot."""
+
+    def __init__(self, snapshot_file, transport):
+        pickle.Unpickler.__init__(self, snapshot_file)
+        self.transport = transport
+
+    def persistent_load(self, persistent_id):
+        if persistent_id == _TRANSPORT_PERSISTENT_ID:
+            return self.transport
+        raise pickle.UnpicklingError("Unknown persistent id {}".format(persistent_id))
+
+
+class _RecursionLimit(object):
+    """Context manager that temporarily raises the recursion limit."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.previous_limit = None
+
+    def __enter__(self):
+        self.previous_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(self.limit, self.previous_limit))
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        sys.setrecursionlimit(self.previous_limit)
+
+
+def get_snapshot_header(wsdl_url):
+    """Get the header that identifies the snapshot of a given WSDL.
+
+    Args:
+        wsdl_url: URL of the WSDL
+
+    Returns:
+        Dictionary with the snapshot header
+    """
+    return {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'zeep_version': zeep.__version__,
+        'python_version': sys.version_info[:2],
+        'wsdl_url': wsdl_url
+    }
+
+
+def get_snapshot_path(directory, wsdl_url):
+    """Get the path of the snapshot of a given WSDL inside a directory.
+
+    Args:
+        directory: Directory where snapshots are stored
+        wsdl_url: URL of the WSDL
+
+    Returns:
+        Path of the snapshot file
+    """
+    key = '{}|{}|{}'.format(wsdl_url, zeep.__version__, SNAPSHOT_FORMAT_VERSION)
+    wsdl_version = wsdl_url.rstrip('/').split('/')[-2]
+    return os.path.join(directory, 'netsuite-{}-{}.snapshot'.format(
+        wsdl_version, hashlib.sha1(key.encode()).hexdigest()[:16]))
+
+
+def save_snapshot(client, path, wsdl_url):
+    """Save a snapshot of a SOAP client.
+
+    The snapshot is written to a temporary file which is then renamed, so concurrent readers
+    never see a partially written snapshot.
+
+    Args:
+        client: zeep SOAP client with the parsed WSDL
+        path: Path of the snapshot file
+        wsdl_url: URL of the WSDL the client was built from
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as snapshot_file, \
+                _RecursionLimit(SNAPSHOT_RECURSION_LIMIT):
+            pickle.dump(get_snapshot_header(wsdl_url), snapshot_file, pickle.HIGHEST_PROTOCOL)
+            _SnapshotPickler(snapshot_file, client.transport).dump(client)
+        os.rename(temporary_path, path)
+    except Exception:
+        os.remove(temporary_path)
+        raise
+
+    LOGGER.info('Saved WSDL snapshot of %s to %s', wsdl_url, path)
+
+
+def load_snapshot(path, wsdl_url, transport):
+    """Load a snapshot of a SOAP client.
+
+    Args:
+        path: Path of the snapshot file
+        wsdl_url: URL of the WSDL the snapshot must have been built from
+        transport: Transport to be used by the loaded SOAP client
+
+    Returns:
+        zeep SOAP client or None if there is no valid snapshot for the WSDL
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as snapshot_file, _RecursionLimit(SNAPSHOT_RECURSION_LIMIT):
+            header = pickle.load(snapshot_file)
+            if header != get_snapshot_header(wsdl_url):
+                LOGGER.info('Ignoring outdated WSDL snapshot %s', path)
+                return None
+            client = _SnapshotUnpickler(snapshot_file, transport).load()
+    except Exception:
+        LOGGER.warning('Could not load WSDL snapshot %s', path, exc_info=True)
+        return None
+
+    LOGGER.debug('Loaded WSDL snapshot of %s from %s', wsdl_url, path)
+    return client
+
+
+def build_snapshot(wsdl_url, path, transport=None, namespace_prefixes=None):
+    """Parse a WSDL and save the snapshot of the resulting SOAP client.
+
+    Args:
+        wsdl_url: URL of the WSDL
+        path: Path of the snapshot file
+        transport: Transport used to load the WSDL (optional)
+        namespace_prefixes: Dictionary of namespace prefixes to register (optional)
+
+    Returns:
+        zeep SOAP client
+    """
+    client = Client(wsdl_url, transport=transport)
+    for prefix, namespace in (namespace_prefixes or {}).items():
+        client.set_ns_prefix(prefix, namespace)
+    save_snapshot(client, path, wsdl_url)
+    return client
+
+
+def main(argv=None):
+    """Build the snapshot of a WSDL from the command line."""
+    from .client import generate_namespace_prefixes, parse_wsdl_version
+
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        sys.stderr.write('Usage: python -m netsuite.snapshot WSDL_URL DIRECTORY\n')
+        return 1
+
+    wsdl_url, directory = argv
+    path = get_snapshot_path(directory, wsdl_url)
+    build_snapshot(
+        wsdl_url,
+        path,
+        namespace_prefixes=generate_namespace_prefixes(parse_wsdl_version(wsdl_url)))
+    sys.stdout.write('{}\n'.format(path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
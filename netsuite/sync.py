@@ -0,0 +1,273 @@
+"""Incremental synchronization.
+
+Instead of reading whole tables, DeltaSync only fetches the records that changed since the last
+run of a given search. Each run records a high-water mark (last modified date of the most
+recent record seen) in a CheckpointStore, and picks up the records deleted since the previous
+run with getDeleted.
+
+Checkpoints are only saved once a run completes, so a failed run is retried from the previous
+checkpoint. Records modified at the very date of the high-water mark are delivered again on the
+next run, since more may have been modified within the same second after the checkpoint was
+taken, so record handlers must be idempotent. Dates are those of the Netsuite server, so that
+the clock of the host running the synchronization does not matter.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+from collections import namedtuple
+
+from dateutil import parser as datetime_parser
+from dateutil.tz import tzutc
+
+from .api.types import SearchDateFieldOperator, SearchEnumMultiSelectFieldOperator
+
+LOGGER = logging.getLogger(__name__)
+
+Checkpoint = namedtuple('Checkpoint', [
+    'key',
+    'record_type',
+    # High-water mark of the records synchronized
+    'last_modified',
+    # Date from which deleted records are fetched on the next run
+    'last_deleted'
+])
+
+SyncResult = namedtuple('SyncResult', [
+    'checkpoint',
+    'records',
+    'deleted'
+])
+
+
+class CheckpointStore(object):
+    """SQLite store of synchronization checkpoints."""
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path: Path of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " key TEXT PRIMARY KEY,"
+                " record_type TEXT NOT NULL,"
+                " last_modified TEXT,"
+                " last_deleted TEXT,"
+                " updated_at TEXT NOT NULL)")
+
+    def get(self, key):
+        """Get a checkpoint.
+
+        Args:
+            key: Checkpoint key
+
+        Returns:
+            Checkpoint or None if there is none for the key
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT key, record_type, last_modified, last_deleted"
+                " FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        key, record_type, last_modified, last_deleted = row
+        return Checkpoint(
+            key=key,
+            record_type=record_type,
+            last_modified=datetime_parser.parse(last_modified) if last_modified else None,
+            last_deleted=datetime_parser.parse(last_deleted) if last_deleted else None)
+
+    def save(self, checkpoint):
+        """Save a checkpoint.
+
+        Args:
+            checkpoint: Checkpoint to save
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints"
+                " (key, record_type, last_modified, last_deleted, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (checkpoint.key,
+                 checkpoint.record_type,
+                 checkpoint.last_modified.isoformat() if checkpoint.last_modified else None,
+                 checkpoint.last_deleted.isoformat() if checkpoint.last_deleted else None,
+                 datetime.datetime.now(tzutc()).isoformat()))
+
+    def delete(self, key):
+        """Delete a checkpoint so that the next run is a full synchronization.
+
+        Args:
+            key: Checkpoint key
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+
+class DeltaSync(object):
+    """Synchronize the records of a search incrementally."""
+
+    DEFAULT_MODIFIED_FIELD = 'lastModifiedDate'
+
+    def __init__(self, client, store, modified_field=DEFAULT_MODIFIED_FIELD):
+        """Constructor.
+
+        Args:
+            client: Netsuite API client
+            store: CheckpointStore
+            modified_field: Name of the last modified date field of the records and of the
+                search type (optional)
+        """
+        self.client = client
+        self.store = store
+        self.modified_field = modified_field
+
+    @staticmethod
+    def get_checkpoint_key(record_type, search_type_name, search_params=None):
+        """Get the key of the checkpoint of a search.
+
+        Args:
+            record_type: Type of record (e.g. RecordType.Employee)
+            search_type_name: Name of the search type
+            search_params: Parameters used to filter the search (optional)
+
+        Returns:
+            Checkpoint key
+        """
+        params_hash = hashlib.sha1(json.dumps(
+            search_params or {}, sort_keys=True, default=str).encode()).hexdigest()
+        return '{}:{}:{}'.format(record_type, search_type_name, params_hash)
+
+    def sync(self, record_type, search_type_name, search_params=None,
+             on_record=None, on_delete=None, search_preferences=None, on_complete=None):
+        """Fetch the records changed and deleted since the last run.
+
+        Args:
+            record_type: Type of record (e.g. RecordType.Employee)
+            search_type_name: Name of the search type (e.g. EmployeeSearchBasic)
+            search_params: Parameters used to filter the search (optional)
+            on_record: Callable called with each changed record, serialized (optional)
+            on_delete: Callable called with each DeletedRecord (optional)
+            search_preferences: Preferences for returned search results (optional)
+            on_complete: Callable called once every record and deletion was handled, before the
+                checkpoint is saved, e.g. to flush the writes buffered by the handlers (optional)
+
+        Returns:
+            SyncResult with the new checkpoint and the number of records changed and deleted
+        """
+        key = self.get_checkpoint_key(record_type, search_type_name, search_params)
+        checkpoint = self.store.get(key)
+        # Deletions are dated by the server, whose clock may differ from the local one
+        started_at = self.client.get_server_time()
+
+        if checkpoint is None:
+            LOGGER.info('Full synchronization of %s', key)
+            checkpoint = Checkpoint(
+                key=key,
+                record_type=record_type,
+                last_modified=None,
+                last_deleted=None)
+        else:
+            LOGGER.info('Synchronizing %s since %s', key, checkpoint.last_modified)
+
+        num_records, checkpoint = self._sync_records(
+            checkpoint, search_type_name, search_params, on_record, search_preferences)
+
+        num_deleted = 0
+        if checkpoint.last_deleted is not None:
+            num_deleted = self._sync_deleted(checkpoint, on_delete)
+
+        if on_complete:
+            on_complete()
+
+        # Deletions before the start of this run are either synchronized or predate the data
+        checkpoint = checkpoint._replace(last_deleted=started_at)
+        self.store.save(checkpoint)
+
+        LOGGER.info('Synchronized %d changed and %d deleted records of %s',
+                    num_records, num_deleted, key)
+        return SyncResult(checkpoint=checkpoint, records=num_records, deleted=num_deleted)
+
+    def _sync_records(self, checkpoint, search_type_name, search_params, on_record,
+                      search_preferences):
+        """Fetch the records modified since a checkpoint.
+
+        Returns:
+            Tuple with the number of records and the checkpoint with the new high-water mark
+        """
+        search_params = dict(search_params or {})
+        if checkpoint.last_modified is not None:
+            # Records modified at the same time as the high-water mark are delivered again
+            search_params[self.modified_field] = self.client.models.Core.SearchDateField(
+                operator=SearchDateFieldOperator.ON_OR_AFTER,
+                searchValue=checkpoint.last_modified)
+
+        SearchType = self.client.models[search_type_name]
+        search_record = SearchType(**search_params)
+
+        high_water_mark = checkpoint.last_modified
+
+        num_records = 0
+        for record in self.client.iter_search_all(
+                search_record, search_preferences, serialize=False):
+            last_modified = getattr(record, self.modified_field)
+            # A record modified in the same second as the high-water mark may have been
+            # modified after the checkpoint was taken, so there is no tie-break on it
+            if checkpoint.last_modified is not None and last_modified < checkpoint.last_modified:
+                continue
+
+            if on_record:
+                on_record(self.client._serialize(record))
+            num_records += 1
+
+            if high_water_mark is None or last_modified > high_water_mark:
+                high_water_mark = last_modified
+
+        checkpoint = checkpoint._replace(last_modified=high_water_mark)
+
+        return num_records, checkpoint
+
+    def _sync_deleted(self, checkpoint, on_delete):
+        """Fetch the records deleted since a checkpoint.
+
+        Returns:
+            Number of records deleted
+        """
+        Core = self.client.models.Core
+        get_deleted_filter = Core.GetDeletedFilter(
+            deletedDate=Core.SearchDateField(
+                operator=SearchDateFieldOperator.ON_OR_AFTER,
+                searchValue=checkpoint.last_deleted),
+            type=Core.SearchEnumMultiSelectField(
+                operator=SearchEnumMultiSelectFieldOperator.ANY_OF,
+                searchValue=[checkpoint.record_type]))
+
+        num_deleted = 0
+        page_index = 1
+        total_pages = 1
+        while page_index <= total_pages:
+            get_deleted_result = self.client.get_deleted(get_deleted_filter, page_index)
+            total_pages = get_deleted_result.totalPages or 0
+            deleted_record_list = get_deleted_result.deletedRecordList
+            for deleted_record in (deleted_record_list.deletedRecord if deleted_record_list else None) or []:
+                if on_delete:
+                    on_delete(deleted_record)
+                num_deleted += 1
+            page_index += 1
+
+        return num_deleted
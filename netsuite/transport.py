@@ -0,0 +1,169 @@
+"""HTTP transport configuration.
+
+Builds zeep transports backed by pooled keep-alive HTTP sessions. Keeping connections to the
+Netsuite endpoint alive in a pool means the TCP and TLS handshakes are only paid when a new
+connection is opened, instead of on every burst of requests.
+
+Sessions may be shared by many client instances, either by injecting the same session through
+the SOAP client configuration or by setting the "shared" transport option, in which case all
+clients with an identical transport configuration reuse the same session.
+
+Note that sessions hold cookies, so only share them between clients that authenticate on every
+request (token based authentication) or that belong to the same login.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from zeep.transports import Transport
+
+DEFAULT_TRANSPORT_CONFIG = {
+    # Number of per host connection pools to keep
+    'poolConnections': 10,
+    # Maximum number of connections kept alive per host
+    'poolMaxsize': 10,
+    # Whether to block when all connections of a host are in use instead of opening new ones
+    'poolBlock': False,
+    # Maximum number of connections overall (asynchronous transport only, 0 means no limit)
+    'maxConnections': 100,
+    # Seconds an idle connection is kept alive (asynchronous transport only)
+    'keepAliveTimeout': 30,
+    # Number of retries on connection errors
+    'maxRetries': 0,
+    # Seconds to wait for a connection to be established
+    'connectTimeout': 10,
+    # Seconds to wait for a response
+    'readTimeout': 300,
+    # Whether to verify the TLS certificates
+    'verify': True,
+    # Whether to share the session with all clients that use the same configuration
+    'shared': False
+}
+
+_SHARED_SESSIONS = {}
+_SHARED_SESSIONS_LOCK = threading.Lock()
+
+
+def get_transport_config(config=None):
+    """Merge a transport configuration with the default values.
+
+    Args:
+        config: Dictionary with the transport configuration (optional)
+
+    Returns:
+        Dictionary with the complete transport configuration
+    """
+    transport_config = dict(DEFAULT_TRANSPORT_CONFIG)
+    transport_config.update(config or {})
+    unknown_keys = set(transport_config) - set(DEFAULT_TRANSPORT_CONFIG)
+    if unknown_keys:
+        raise Exception("Unknown transport configuration keys {}".format(
+            ', '.join(sorted(unknown_keys))))
+    return transport_config
+
+
+def _get_config_key(transport_config):
+    """Get a hashable key that identifies a transport configuration."""
+    return tuple(sorted(transport_config.items()))
+
+
+def build_session(config=None):
+    """Build an HTTP session with a sized pool of keep-alive connections.
+
+    Args:
+        config: Dictionary with the transport configuration (optional)
+
+    Returns:
+        Instance of requests.Session
+    """
+    transport_config = get_transport_config(config)
+    adapter = HTTPAdapter(
+        pool_connections=transport_config['poolConnections'],
+        pool_maxsize=transport_config['poolMaxsize'],
+        pool_block=transport_config['poolBlock'],
+        max_retries=transport_config['maxRetries'])
+    session = requests.Session()
+    session.verify = transport_config['verify']
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_shared_session(config=None):
+    """Get the session shared by all clients with the same transport configuration.
+
+    Args:
+        config: Dictionary with the transport configuration (optional)
+
+    Returns:
+        Instance of requests.Session
+    """
+    key = _get_config_key(get_transport_config(config))
+    with _SHARED_SESSIONS_LOCK:
+        if key not in _SHARED_SESSIONS:
+            _SHARED_SESSIONS[key] = build_session(config)
+        return _SHARED_SESSIONS[key]
+
+
+def build_transport(cache=None, config=None, session=None):
+    """Build a zeep transport backed by a pooled HTTP session.
+
+    Args:
+        cache: Cache for WSDL and XSD documents (optional)
+        config: Dictionary with the transport configuration (optional)
+        session: Session to use instead of building one (optional)
+
+    Returns:
+        Instance of a zeep transport
+    """
+    transport_config = get_transport_config(config)
+    if session is None:
+        session = get_shared_session(config) if transport_config['shared'] else build_session(config)
+
+    return Transport(
+        cache=cache,
+        timeout=transport_config['readTimeout'],
+        operation_timeout=(transport_config['connectTimeout'], transport_config['readTimeout']),
+        session=session)
+
+
+def build_async_session(loop, config=None):
+    """Build an aiohttp session with a sized pool of keep-alive connections.
+
+    Args:
+        loop: Event loop the session is bound to
+        config: Dictionary with the transport configuration (optional)
+
+    Returns:
+        Instance of aiohttp.ClientSession
+    """
+    import aiohttp
+
+    transport_config = get_transport_config(config)
+    connector = aiohttp.TCPConnector(
+        loop=loop,
+        limit=transport_config['maxConnections'],
+        limit_per_host=transport_config['poolMaxsize'],
+        keepalive_timeout=transport_config['keepAliveTimeout'],
+        verify_ssl=transport_config['verify'])
+    return aiohttp.ClientSession(loop=loop, connector=connector)
+
+
+def get_shared_async_session(loop, config=None):
+    """Get the aiohttp session shared by all clients on a loop with the same transport configuration.
+
+    Args:
+        loop: Event loop the session is bound to
+        config: Dictionary with the transport configuration (optional)
+
+    Returns:
+        Instance of aiohttp.ClientSession
+    """
+    key = (id(loop), _get_config_key(get_transport_config(config)))
+    with _SHARED_SESSIONS_LOCK:
+        session = _SHARED_SESSIONS.get(key)
+        if session is None or session.closed:
+            session = _SHARED_SESSIONS[key] = build_async_session(loop, config)
+        return session
@@ -15,5 +15,9 @@ setup(
     url="https://github.com/fernando-almeida/python-netsuite.git",
     packages=find_packages(),
     include_package_data=True,
-    install_requires=['zeep'],
+    install_requires=['zeep>=3,<4', 'python-dateutil', 'pytz', 'six', 'futures; python_version < "3.0"'],
+    extras_require={
+        'async': ['aiohttp>=3,<3.9'],
+        'columnar': ['pyarrow', 'pandas'],
+    },
 )
@@ -0,0 +1,105 @@
+"""Asynchronous API client test module."""
+import asyncio
+import os
+import unittest
+
+try:
+    from zeep.asyncio import AsyncTransport
+    from zeep.asyncio.bindings import AsyncSoapBinding
+except ImportError:
+    AsyncTransport = None
+
+from netsuite.client import ApiConfig
+from netsuite.governor import ConcurrencyGovernor
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+@unittest.skipUnless(AsyncTransport, 'the zeep asyncio extras are required by the asynchronous client')
+class AsyncNetsuiteApiClientTestCase(unittest.TestCase):
+    """Asynchronous API client testcase."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.api_config = ApiConfig(
+            wsdl_url=WSDL_PATH, application_id=None, passport_type=None, passport=None)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _build_soap_client(self):
+        from netsuite.async_client import AsyncNetsuiteApiClient
+
+        client = AsyncNetsuiteApiClient(
+            self.api_config,
+            loop=self.loop,
+            soap_client_config={'transport': {'shared': False}},
+            lazy=True)
+        soap_client = client._build_soap_client(client._build_transport())
+        return client, soap_client
+
+    def test_build_soap_client_in_running_loop(self):
+        """Test the WSDL loads from within a running event loop."""
+        async def build():
+            return self._build_soap_client()
+
+        client, soap_client = self.loop.run_until_complete(build())
+
+        self.assertIsInstance(soap_client.transport, AsyncTransport)
+        self.assertIsInstance(soap_client.service._binding, AsyncSoapBinding)
+        self.loop.run_until_complete(soap_client.transport.session.close())
+
+    def test_build_soap_client_outside_loop(self):
+        """Test the WSDL loads before the event loop runs."""
+        client, soap_client = self._build_soap_client()
+
+        self.assertIsInstance(soap_client.transport, AsyncTransport)
+        self.assertIs(soap_client.transport.loop, self.loop)
+        self.loop.run_until_complete(soap_client.transport.session.close())
+
+    def test_operations_awaitable(self):
+        """Test the operations of the synchronous client are all overridden with coroutines."""
+        from netsuite.async_client import AsyncNetsuiteApiClient
+
+        for name in ('get_deleted', 'get_values_for_field', 'get_server_time', 'get_list'):
+            self.assertTrue(asyncio.iscoroutinefunction(getattr(AsyncNetsuiteApiClient, name)), name)
+
+
+@unittest.skipUnless(AsyncTransport, 'the zeep asyncio extras are required by the asynchronous client')
+class AsyncGovernedServiceTestCase(unittest.TestCase):
+    """Asynchronous governed service testcase."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_cancelled_wait_releases_slot(self):
+        """Test tasks cancelled while waiting for a permit leave no slot held."""
+        from netsuite.async_client import AsyncGovernedService
+
+        class Service(object):
+            async def get(self, internal_id):
+                await asyncio.sleep(0.01)
+                return internal_id
+
+        governor = ConcurrencyGovernor(max_concurrent_requests=2, requests_per_second=1, burst=1)
+        service = AsyncGovernedService(Service(), governor, self.loop)
+
+        async def cancel_waiting_operations():
+            tasks = [self.loop.create_task(service.get(index)) for index in range(4)]
+            await asyncio.sleep(0.05)
+            for task in tasks:
+                task.cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = self.loop.run_until_complete(cancel_waiting_operations())
+
+        self.assertEqual(results[0], 0)
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results[1:]))
+        self.assertEqual(governor.slots.semaphore._value, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,328 @@
+"""Batch client test module."""
+import os
+import threading
+import time
+import unittest
+
+from requests.exceptions import ConnectTimeout, ReadTimeout
+from zeep import Client
+
+from netsuite.api.governance import GovernanceModel
+from netsuite.client import ApiConfig, NetsuiteApiBatchClient
+from netsuite.results import REQUEST_FAILED_CODE, MemoryDeadLetterSink
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+OPERATIONS = {
+    "add": {"record_count": {"value": 2}},
+    "update": {"record_count": {"value": 2}},
+    "delete": {"record_count": {"value": 2}}
+}
+
+ASYNC_OPERATIONS = {
+    "add": {"record_count": {"value": 4}},
+    "update": {"record_count": {"value": 4}},
+    "delete": {"record_count": {"value": 4}}
+}
+
+GOVERNANCE_CONFIG = {
+    "schedules": {
+        "all_day": {"start_time": "00:00:00", "end_time": "00:00:00"}
+    },
+    "record_limits": {
+        "synchronous": {"all_day": {"operations": OPERATIONS}},
+        "asynchronous": {"all_day": {"operations": ASYNC_OPERATIONS}}
+    },
+    "request_limits": {}
+}
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of a response."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _StubClient(object):
+    """Client recording the list operations and answering with the outcomes given per call.
+
+    Each outcome is an exception to raise or a dictionary of error codes by internal identifier
+    of the records which fail. Records succeed once the outcomes are used up. Each call takes
+    the given delay in seconds, and the most calls in progress at once are recorded.
+    """
+
+    def __init__(self, *outcomes, **kwargs):
+        self.outcomes = list(outcomes)
+        self.delay = kwargs.pop('delay', 0)
+        self.calls = []
+        self.records = []
+        self.lock = threading.Lock()
+        self.active_calls = 0
+        self.max_active_calls = 0
+
+    def _write(self, operation_name, records):
+        with self.lock:
+            self.active_calls += 1
+            self.max_active_calls = max(self.max_active_calls, self.active_calls)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active_calls -= 1
+        self.calls.append((operation_name, [record.internalId for record in records]))
+        self.records.append(records)
+        outcome = self.outcomes.pop(0) if self.outcomes else {}
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        write_responses = []
+        for record in records:
+            code = outcome.get(record.internalId)
+            write_responses.append(_Object(
+                status=_Object(
+                    isSuccess=code is None,
+                    statusDetail=[_Object(code=code, message=code)] if code else None),
+                baseRef=None))
+        return write_responses
+
+    def add_list(self, record):
+        return self._write('add_list', record)
+
+    def update_list(self, record):
+        return self._write('update_list', record)
+
+    def delete_list(self, base_ref):
+        return self._write('delete_list', base_ref)
+
+    def async_update_list(self, records):
+        return self._write('async_update_list', records)
+
+
+class NetsuiteApiBatchClientTestCase(unittest.TestCase):
+    """Batch client testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        client = Client(WSDL_PATH)
+        cls.Customer = client.get_type('{urn:records.test}Customer')
+        cls.RecordRef = client.get_type('{urn:records.test}RecordRef')
+
+    def _build_batch_client(self, stub_client, **kwargs):
+        self.dead_letter_sink = MemoryDeadLetterSink()
+        batch_client = NetsuiteApiBatchClient(
+            GovernanceModel(GOVERNANCE_CONFIG),
+            dead_letter_sink=self.dead_letter_sink,
+            api_config=ApiConfig(
+                wsdl_url=WSDL_PATH, application_id=None, passport_type=None, passport=None),
+            lazy=True,
+            **kwargs)
+        batch_client.client = stub_client
+        return batch_client
+
+    def _build_customers(self, *internal_ids):
+        return [self.Customer(internalId=internal_id) for internal_id in internal_ids]
+
+    def test_flush(self):
+        """Test full batches are sent right away and the others when executed."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client)
+
+        batch_client.add_list(self._build_customers('1', '2', '3'))
+        self.assertEqual(stub_client.calls, [('add_list', ['1', '2'])])
+
+        futures = batch_client.execute(wait=True)
+        self.assertEqual(stub_client.calls[1:], [('add_list', ['3'])])
+        self.assertTrue(futures[0].result()[0].is_success)
+
+    def test_linger(self):
+        """Test partially filled batches are flushed in the background."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client, linger=0.01)
+
+        batch_client.add_list(self._build_customers('1'))
+        deadline = time.time() + 1
+        while not stub_client.calls and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(stub_client.calls, [('add_list', ['1'])])
+        batch_client.close()
+        self.assertFalse(batch_client.flusher.is_alive())
+
+    def test_max_queue_age(self):
+        """Test records younger than max_queue_age wait for their batch to fill up or the client to close."""
+        stub_client = _StubClient()
+        with self._build_batch_client(stub_client, linger=0.01, max_queue_age=60) as batch_client:
+            batch_client.add_list(self._build_customers('1'))
+            time.sleep(0.05)
+            self.assertEqual(stub_client.calls, [])
+
+        self.assertEqual(stub_client.calls, [('add_list', ['1'])])
+
+    def test_parallel_batches(self):
+        """Test full batches are sent concurrently and reported to on_batch_complete."""
+        completed = []
+        stub_client = _StubClient(delay=0.05)
+        batch_client = self._build_batch_client(
+            stub_client,
+            max_workers=2,
+            on_batch_complete=lambda category, records, future: completed.append((category, future)))
+
+        batch_client.add_list(self._build_customers('1', '2', '3', '4'))
+        batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.max_active_calls, 2)
+        self.assertEqual(sorted(call[1] for call in stub_client.calls), [['1', '2'], ['3', '4']])
+        self.assertEqual(len(completed), 2)
+        self.assertTrue(all(
+            result.is_success for category, future in completed for result in future.result()))
+
+    def test_max_in_flight_per_category(self):
+        """Test batches of a category are sent one at a time while other categories use the workers."""
+        stub_client = _StubClient(delay=0.05)
+        batch_client = self._build_batch_client(stub_client, max_workers=2, max_in_flight_per_category=1)
+
+        batch_client.add_list(self._build_customers('1', '2', '3', '4'))
+        batch_client.execute(wait=True)
+        self.assertEqual(stub_client.max_active_calls, 1)
+
+        batch_client.add_list(self._build_customers('5', '6'))
+        batch_client.update_list(self._build_customers('1', '2'))
+        batch_client.execute(wait=True)
+        self.assertEqual(stub_client.max_active_calls, 2)
+
+    def test_requeue(self):
+        """Test records failing with a retryable error are sent again on their own."""
+        stub_client = _StubClient({'2': 'RCRD_HAS_BEEN_CHANGED'})
+        batch_client = self._build_batch_client(stub_client)
+
+        batch_client.update_list(self._build_customers('1', '2'))
+        batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.calls, [('update_list', ['1', '2']), ('update_list', ['2'])])
+        self.assertEqual(self.dead_letter_sink.results, [])
+
+    def test_dead_letter(self):
+        """Test records failing for good or too many times are dead-lettered."""
+        stub_client = _StubClient(
+            {'1': 'INVALID_FLD_VALUE', '2': 'RCRD_LOCKED_BY_WF'},
+            {'2': 'RCRD_LOCKED_BY_WF'})
+        batch_client = self._build_batch_client(stub_client, max_record_retries=1)
+
+        batch_client.update_list(self._build_customers('1', '2'))
+        batch_client.execute(wait=True)
+
+        self.assertEqual(len(stub_client.calls), 2)
+        self.assertEqual(
+            sorted((result.record.internalId, result.code) for result in self.dead_letter_sink.results),
+            [('1', 'INVALID_FLD_VALUE'), ('2', 'RCRD_LOCKED_BY_WF')])
+
+    def test_request_failures(self):
+        """Test only the records of requests which were never sent are retried."""
+        stub_client = _StubClient(ConnectTimeout(), ReadTimeout())
+        batch_client = self._build_batch_client(stub_client)
+
+        batch_client.add_list(self._build_customers('1'))
+        futures = batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.calls, [('add_list', ['1']), ('add_list', ['1'])])
+        self.assertIsInstance(futures[0].exception(), ConnectTimeout)
+        self.assertEqual([result.code for result in self.dead_letter_sink.results], [REQUEST_FAILED_CODE])
+
+    def test_close_sends_requeued_records(self):
+        """Test close waits for the records requeued by concurrent batches and sends them."""
+        codes = {'2': 'RCRD_HAS_BEEN_CHANGED', '4': 'RCRD_HAS_BEEN_CHANGED'}
+        stub_client = _StubClient(codes, codes, delay=0.05)
+        batch_client = self._build_batch_client(stub_client, max_workers=2)
+        requeue = batch_client._requeue
+
+        def slow_requeue(*args):
+            # Widen the window between the end of a batch and the requeue of its records
+            time.sleep(0.05)
+            requeue(*args)
+
+        batch_client._requeue = slow_requeue
+
+        batch_client.update_list(self._build_customers('1', '2', '3', '4'))
+        batch_client.close()
+
+        sent_ids = sorted(internal_id for _, internal_ids in stub_client.calls for internal_id in internal_ids)
+        self.assertEqual(sent_ids, ['1', '2', '2', '3', '4', '4'])
+        self.assertFalse(batch_client._has_queued_records())
+        self.assertEqual(batch_client.pending_futures, set())
+        self.assertEqual(self.dead_letter_sink.results, [])
+
+    def test_promote_streamed_records(self):
+        """Test records streamed one at a time reach a threshold past the synchronous limit."""
+        # The job is only submitted, failing it spares polling its status
+        stub_client = _StubClient(ReadTimeout())
+        batch_client = self._build_batch_client(stub_client, async_threshold=3)
+
+        for internal_id in ('1', '2', '3', '4'):
+            batch_client.update_list(self._build_customers(internal_id))
+
+        self.assertEqual(stub_client.calls, [('async_update_list', ['1', '2', '3', '4'])])
+
+    def test_split_below_threshold(self):
+        """Test records queued past the synchronous limit are split up when executed below the threshold."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client, async_threshold=4)
+
+        for internal_id in ('1', '2', '3'):
+            batch_client.update_list(self._build_customers(internal_id))
+        self.assertEqual(stub_client.calls, [])
+
+        batch_client.execute(wait=True)
+        self.assertEqual(stub_client.calls, [('update_list', ['1', '2']), ('update_list', ['3'])])
+
+    def test_coalesce_updates(self):
+        """Test updates of the same record are merged into one write."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client)
+
+        batch_client.update_list([self.Customer(internalId='1', email='sales@example.test')])
+        batch_client.update_list([self.Customer(internalId='1', phone='555')])
+        batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.calls, [('update_list', ['1'])])
+        self.assertEqual(stub_client.records[0][0].email, 'sales@example.test')
+        self.assertEqual(stub_client.records[0][0].phone, '555')
+
+    def test_coalesce_delete(self):
+        """Test a delete drops the update queued before it but is still sent once."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client)
+
+        batch_client.update_list(self._build_customers('1'))
+        batch_client.delete_list([self.RecordRef(internalId='1', type='customer')])
+        batch_client.delete_list([self.RecordRef(internalId='1', type='customer')])
+        batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.calls, [('delete_list', ['1'])])
+
+    def test_coalesce_retried_update(self):
+        """Test a retried update does not override the newer update queued while it was sent."""
+        stub_client = _StubClient({'1': 'RCRD_HAS_BEEN_CHANGED'}, delay=0.05)
+        batch_client = self._build_batch_client(stub_client, max_workers=2)
+
+        batch_client.update_list([self.Customer(internalId='1', email='old@example.test', phone='555')])
+        batch_client.execute()
+        batch_client.update_list([self.Customer(internalId='1', email='new@example.test')])
+        batch_client.close()
+
+        self.assertEqual(stub_client.calls, [('update_list', ['1']), ('update_list', ['1'])])
+        self.assertEqual(stub_client.records[1][0].email, 'new@example.test')
+        self.assertEqual(stub_client.records[1][0].phone, '555')
+
+    def test_no_coalescing(self):
+        """Test writes are sent as queued when coalescing is disabled."""
+        stub_client = _StubClient()
+        batch_client = self._build_batch_client(stub_client, coalesce=False)
+
+        batch_client.update_list(self._build_customers('1'))
+        batch_client.update_list(self._build_customers('1'))
+        batch_client.execute(wait=True)
+
+        self.assertEqual(stub_client.calls, [('update_list', ['1', '1'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
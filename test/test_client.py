@@ -0,0 +1,282 @@
+"""API client test module."""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+import unittest
+
+from zeep import Client
+
+from netsuite.cache import RecordCache
+from netsuite.client import (ApiConfig,
+                             NetsuiteApiClient,
+                             TokenPassport,
+                             TokenPassportSigner)
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of requests and responses."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _Service(object):
+    """Service answering searches with the pages it was given and list updates with success.
+
+    Fetching a page takes the delay given for it, and the failed page raises an exception.
+    The indexes of the pages are recorded as they are fetched.
+    """
+
+    def __init__(self, pages=(), delays=None, failed_page=None):
+        self.pages = [list(page) for page in pages]
+        self.delays = delays or {}
+        self.failed_page = failed_page
+        self.page_indexes = []
+        self.lock = threading.Lock()
+
+    def _get_search_result(self, page_index):
+        time.sleep(self.delays.get(page_index, 0))
+        with self.lock:
+            self.page_indexes.append(page_index)
+        if page_index == self.failed_page:
+            raise Exception('Could not fetch page {}'.format(page_index))
+
+        return _Object(body=_Object(searchResult=_Object(
+            status=_Object(isSuccess=True),
+            searchId='search',
+            pageIndex=page_index,
+            totalPages=len(self.pages),
+            totalRecords=sum(len(page) for page in self.pages),
+            recordList=_Object(record=self.pages[page_index - 1]) if self.pages else None)))
+
+    def search(self, searchRecord, _soapheaders):
+        return self._get_search_result(1)
+
+    def searchMoreWithId(self, searchId, pageIndex, _soapheaders):
+        return self._get_search_result(pageIndex)
+
+    def updateList(self, record, _soapheaders):
+        return _Object(body=_Object(writeResponseList=_Object(status=_Object(isSuccess=True), writeResponse=[])))
+
+
+class _Client(NetsuiteApiClient):
+    """Client sending its requests without passport to the service given."""
+
+    def __init__(self, service, **kwargs):
+        super(_Client, self).__init__(
+            ApiConfig(wsdl_url=WSDL_PATH, application_id=None, passport_type=None, passport=None),
+            serialize_object_class=None,
+            lazy=True,
+            **kwargs)
+        self.service = service
+
+    def _build_soap_passport_header(self):
+        return {}
+
+
+class SearchTestCase(unittest.TestCase):
+    """Search testcase."""
+
+    PAGES = [[1, 2], [3], [4, 5], [6]]
+
+    def test_search_all_page_order(self):
+        """Test the records of pages fetched concurrently are returned in page order."""
+        service = _Service(self.PAGES, delays={2: 0.05})
+        client = _Client(service)
+
+        record = client.search_all(None, 'preferences', max_workers=3)
+
+        self.assertEqual(record, [1, 2, 3, 4, 5, 6])
+        # The slow 2nd page was fetched last
+        self.assertEqual(service.page_indexes, [1, 3, 4, 2])
+
+    def test_search_all_sequential(self):
+        """Test pages are fetched one after the other with a single worker."""
+        service = _Service(self.PAGES)
+        client = _Client(service)
+
+        self.assertEqual(client.search_all(None, 'preferences', max_workers=1), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(service.page_indexes, [1, 2, 3, 4])
+
+    def test_search_all_page_error(self):
+        """Test the failure of a page fetched concurrently is raised."""
+        client = _Client(_Service(self.PAGES, failed_page=3))
+
+        with self.assertRaises(Exception):
+            client.search_all(None, 'preferences', max_workers=3)
+
+    def test_search_all_empty(self):
+        """Test a search without results returns no records."""
+        self.assertEqual(_Client(_Service()).search_all(None, 'preferences'), [])
+
+    def test_iter_search_lazy(self):
+        """Test each page is fetched only once the previous one was consumed."""
+        service = _Service(self.PAGES)
+        pages = _Client(service).iter_search(None, 'preferences')
+        self.assertEqual(service.page_indexes, [])
+
+        self.assertEqual(next(pages), [1, 2])
+        self.assertEqual(service.page_indexes, [1])
+        self.assertEqual(next(pages), [3])
+        self.assertEqual(service.page_indexes, [1, 2])
+
+        self.assertEqual(list(pages), [[4, 5], [6]])
+        self.assertEqual(service.page_indexes, [1, 2, 3, 4])
+
+    def test_iter_search_all(self):
+        """Test records are yielded one at a time across page boundaries."""
+        service = _Service(self.PAGES)
+        records = _Client(service).iter_search_all(None, 'preferences')
+
+        self.assertEqual([next(records) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(service.page_indexes, [1, 2])
+        self.assertEqual(list(records), [4, 5, 6])
+        self.assertEqual(list(_Client(_Service()).iter_search(None, 'preferences')), [])
+
+
+class _RecordLoader(object):
+    """Loader returning a record for every request it records."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, record_type, internal_id):
+        self.calls.append((record_type, internal_id))
+        return {'type': record_type, 'internalId': internal_id}
+
+
+class RecordCacheTestCase(unittest.TestCase):
+    """Record cache of the client testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.Customer = Client(WSDL_PATH).get_type('{urn:records.test}Customer')
+
+    def setUp(self):
+        self.record_loader = _RecordLoader()
+        self.client = _Client(_Service(), record_cache=RecordCache(ttls={'employee': 0}))
+        self.client.set_record_loader(self.record_loader)
+
+    def test_hit(self):
+        """Test a cached record is returned without a request."""
+        record = self.client.get_record_by_type('customer', '1')
+
+        self.assertIs(self.client.get_record_by_type('customer', 1), record)
+        self.assertEqual(self.record_loader.calls, [('customer', '1')])
+
+    def test_miss(self):
+        """Test records of other identifiers, types or not cached are fetched."""
+        self.client.get_record_by_type('customer', '1')
+        self.client.get_record_by_type('customer', '2')
+        self.client.get_record_by_type('contact', '1')
+        self.client.get_record_by_type('employee', '1')
+        self.client.get_record_by_type('employee', '1')
+
+        self.assertEqual(self.record_loader.calls, [
+            ('customer', '1'), ('customer', '2'), ('contact', '1'), ('employee', '1'), ('employee', '1')
+        ])
+
+    def test_invalidation(self):
+        """Test updating a record drops its cached copy only."""
+        self.client.get_record_by_type('customer', '1')
+        self.client.get_record_by_type('customer', '2')
+
+        self.client.update_list([self.Customer(internalId='1', email='new@example.test')], 'preferences')
+        self.client.get_record_by_type('customer', '1')
+        self.client.get_record_by_type('customer', '2')
+
+        self.assertEqual(self.record_loader.calls, [('customer', '1'), ('customer', '2'), ('customer', '1')])
+
+
+class ModelWrapperTestCase(unittest.TestCase):
+    """Model wrapper testcase."""
+
+    TYPE_NAME = '{urn:records.test}Customer'
+
+    def setUp(self):
+        self.client = _Client(_Service())
+        self.client.client = Client(WSDL_PATH)
+
+    def test_cache(self):
+        """Test types and factories are resolved once."""
+        models = self.client.models
+        customer_type = models.get_type(self.TYPE_NAME)
+        factory = models.get_factory('ns0')
+
+        self.client.client = Client(WSDL_PATH)
+
+        self.assertIs(models.get_type(self.TYPE_NAME), customer_type)
+        self.assertIs(models.get_factory('ns0'), factory)
+        self.assertIs(factory.Customer, factory.Customer)
+
+    def test_invalidate(self):
+        """Test invalidated types and factories are resolved again."""
+        models = self.client.models
+        customer_type = models.get_type(self.TYPE_NAME)
+        record_ref_type = models.get_type('{urn:records.test}RecordRef')
+        factory = models.get_factory('ns0')
+
+        self.client.client = Client(WSDL_PATH)
+        models.invalidate(self.TYPE_NAME)
+
+        self.assertIsNot(models.get_type(self.TYPE_NAME), customer_type)
+        self.assertIs(models.get_type('{urn:records.test}RecordRef'), record_ref_type)
+        self.assertIs(models.get_factory('ns0'), factory)
+
+        models.invalidate()
+
+        self.assertIsNot(models.get_type('{urn:records.test}RecordRef'), record_ref_type)
+        self.assertIsNot(models.get_factory('ns0'), factory)
+
+
+class TokenPassportSignerTestCase(unittest.TestCase):
+    """Token passport signer testcase."""
+
+    def setUp(self):
+        self.models = _Object(Core=_Object(
+            TokenPassportSignature=lambda value, algorithm: _Object(value=value, algorithm=algorithm),
+            TokenPassport=_Object))
+
+    def _build_passport(self, hash_algorithm=None):
+        return TokenPassport(
+            account='123456',
+            consumer_key='consumer-key',
+            consumer_secret='consumer-secret',
+            token_id='token-id',
+            token_secret='token-secret',
+            hash_algorithm=hash_algorithm)
+
+    def _sign(self, passport, hash_algorithm_name, nonce, timestamp):
+        """Sign a token passport from scratch as without the signer."""
+        base_string = '&'.join(
+            [passport.account, passport.consumer_key, passport.token_id, nonce, str(timestamp)])
+        key = '&'.join([passport.consumer_secret, passport.token_secret])
+        signature_hash = hmac.new(key.encode(), base_string.encode(), getattr(hashlib, hash_algorithm_name))
+        return base64.b64encode(signature_hash.digest()).decode()
+
+    def test_same_signature(self):
+        """Test signatures are the same as those computed from scratch for every request."""
+        for hash_algorithm, hash_algorithm_name in ((None, 'sha256'), ('sha1', 'sha1')):
+            passport = self._build_passport(hash_algorithm)
+            signer = TokenPassportSigner(passport, self.models)
+
+            for nonce, timestamp in (('nonce', 1500000000), ('other-nonce', 1500000001), ('nonce', 1500000000)):
+                token_passport = signer.sign(nonce, timestamp)
+                self.assertEqual(
+                    token_passport.signature.value,
+                    self._sign(passport, hash_algorithm_name, nonce, timestamp))
+                self.assertEqual((token_passport.nonce, token_passport.timestamp), (nonce, timestamp))
+
+    def test_unsupported_algorithm(self):
+        """Test hash algorithms Netsuite does not support are rejected."""
+        with self.assertRaises(Exception):
+            TokenPassportSigner(self._build_passport('md5'), self.models)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Write coalescing test module."""
+import os
+import unittest
+
+from zeep import Client
+
+from netsuite.coalesce import get_record_key, merge_records
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class CoalesceTestCase(unittest.TestCase):
+    """Write coalescing testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        client = Client(WSDL_PATH)
+        cls.Customer = client.get_type('{urn:records.test}Customer')
+        cls.RecordRef = client.get_type('{urn:records.test}RecordRef')
+        cls.NullField = client.get_type('{urn:records.test}NullField')
+
+    def test_get_record_key(self):
+        """Test records are identified by type and internal or external identifier."""
+        self.assertEqual(
+            get_record_key(self.Customer(internalId='7', externalId='C7')),
+            ('customer', 'internalId', '7'))
+        self.assertEqual(
+            get_record_key(self.Customer(externalId='C7')),
+            ('customer', 'externalId', 'C7'))
+        self.assertIsNone(get_record_key(self.Customer(companyName='ACME')))
+        self.assertIsNone(get_record_key({'internalId': '7'}))
+
+    def test_get_reference_key(self):
+        """Test references share the key of the record they point to."""
+        self.assertEqual(
+            get_record_key(self.RecordRef(internalId='7', type='customer')),
+            get_record_key(self.Customer(internalId='7')))
+        self.assertIsNone(get_record_key(self.RecordRef(internalId='7')))
+
+    def test_merge_records(self):
+        """Test later values win while fields left out of the update are kept."""
+        record = self.Customer(internalId='7', companyName='ACME', email='old@acme.test')
+        update = self.Customer(internalId='7', email='new@acme.test', phone='555')
+
+        merged = merge_records(record, update)
+
+        self.assertEqual(merged.internalId, '7')
+        self.assertEqual(merged.companyName, 'ACME')
+        self.assertEqual(merged.email, 'new@acme.test')
+        self.assertEqual(merged.phone, '555')
+        self.assertEqual(record.email, 'old@acme.test')
+
+    def test_merge_null_fields(self):
+        """Test fields cleared by the update are nulled and set fields leave the null list."""
+        record = self.Customer(
+            internalId='7', email='old@acme.test', nullFieldList=self.NullField(name=['phone']))
+        update = self.Customer(
+            internalId='7', phone='555', nullFieldList=self.NullField(name=['email']))
+
+        merged = merge_records(record, update)
+
+        self.assertIsNone(merged.email)
+        self.assertEqual(merged.phone, '555')
+        self.assertEqual(list(merged.nullFieldList.name), ['email'])
+
+    def test_merge_restores_null_field(self):
+        """Test the null list is dropped once all its fields are set again."""
+        record = self.Customer(internalId='7', nullFieldList=self.NullField(name=['phone']))
+        update = self.Customer(internalId='7', phone='555')
+
+        merged = merge_records(record, update)
+
+        self.assertEqual(merged.phone, '555')
+        self.assertIsNone(merged.nullFieldList)
+
+
+if __name__ == '__main__':
+    unittest.main()
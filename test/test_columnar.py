@@ -0,0 +1,79 @@
+"""Columnar search results test module."""
+import os
+import sys
+import unittest
+
+from unittest import mock
+
+from zeep import Client
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from netsuite.columnar import ColumnarBuilder, _import_pyarrow
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class ImportPyarrowTestCase(unittest.TestCase):
+    """Optional pyarrow dependency testcase."""
+
+    def test_missing_pyarrow(self):
+        """Test a missing pyarrow raises an ImportError telling how to install it."""
+        with mock.patch.dict(sys.modules, {'pyarrow': None}):
+            with self.assertRaises(ImportError) as context:
+                _import_pyarrow()
+        self.assertIn('netsuite[columnar]', str(context.exception))
+
+
+@unittest.skipUnless(pyarrow, 'pyarrow is required by columnar search results')
+class ColumnarBuilderTestCase(unittest.TestCase):
+    """Columnar builder testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        client = Client(WSDL_PATH)
+        cls.Customer = client.get_type('{urn:records.test}Customer')
+        cls.RecordRef = client.get_type('{urn:records.test}RecordRef')
+
+    def test_null_columns(self):
+        """Test columns without values on a page are typed by the pages where they have some."""
+        builder = ColumnarBuilder()
+        first = builder.build_record_batch([self.Customer(internalId='1', companyName='ACME')])
+        second = builder.build_record_batch([
+            self.Customer(
+                internalId='2',
+                email='sales@example.test',
+                subsidiary=self.RecordRef(internalId='3', name='Parent'))
+        ])
+
+        self.assertEqual(first.schema.field('email').type, pyarrow.null())
+        self.assertEqual(first.schema.names, ['companyName', 'email', 'phone'])
+        self.assertEqual(
+            second.schema.names,
+            ['companyName', 'email', 'phone', 'subsidiary.internalId', 'subsidiary.name'])
+
+        table = builder.build_table([first, second])
+
+        self.assertEqual(table.schema.field('email').type, pyarrow.string())
+        self.assertEqual(table.schema.field('phone').type, pyarrow.null())
+        self.assertEqual(table.column('companyName').to_pylist(), ['ACME', None])
+        self.assertEqual(table.column('email').to_pylist(), [None, 'sales@example.test'])
+        self.assertEqual(table.column('subsidiary.name').to_pylist(), [None, 'Parent'])
+
+    def test_inferred_types(self):
+        """Test the type inferred for a column is kept on later pages without values for it."""
+        builder = ColumnarBuilder()
+        builder.build_record_batch([self.Customer(internalId='1', companyName='ACME')])
+
+        record_batch = builder.build_record_batch([self.Customer(internalId='2')])
+
+        self.assertEqual(builder.column_types['companyName'], pyarrow.string())
+        self.assertEqual(record_batch.schema.field('companyName').type, pyarrow.string())
+        self.assertEqual(record_batch.column(0).to_pylist(), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
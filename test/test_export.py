@@ -0,0 +1,100 @@
+"""Search result export test module."""
+import csv
+import io
+import json
+import os
+import unittest
+
+from zeep import Client
+
+from netsuite.export import CsvSink, export_search, get_record_columns
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class _StubClient(object):
+    """Client returning the pages of records it was given to a search."""
+
+    serialize_object_class = None
+
+    def __init__(self, *pages):
+        self.pages = pages
+
+    def iter_search(self, search_type, search_preferences=None, serialize=True):
+        for page in self.pages:
+            yield page
+
+
+class ExportTestCase(unittest.TestCase):
+    """Search result export testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        client = Client(WSDL_PATH)
+        cls.Customer = client.get_type('{urn:records.test}Customer')
+        cls.RecordRef = client.get_type('{urn:records.test}RecordRef')
+        cls.NullField = client.get_type('{urn:records.test}NullField')
+
+    def _read_csv(self, output):
+        return list(csv.DictReader(io.StringIO(output.getvalue().decode('utf-8'))))
+
+    def test_get_record_columns(self):
+        """Test nested records give dotted columns and repeated elements a single column."""
+        self.assertEqual(get_record_columns([self.Customer]), [
+            'nullFieldList.name',
+            'companyName',
+            'email',
+            'phone',
+            'subsidiary.name',
+            'subsidiary.internalId',
+            'subsidiary.externalId',
+            'subsidiary.type',
+            'internalId',
+            'externalId'
+        ])
+
+    def test_csv_sparse_pages(self):
+        """Test nested fields only set on later pages get their columns."""
+        output = io.BytesIO()
+        client = _StubClient(
+            [self.Customer(internalId='1', companyName='ACME')],
+            [self.Customer(internalId='2', subsidiary=self.RecordRef(internalId='3', type='subsidiary'))],
+            [self.Customer(internalId='4', nullFieldList=self.NullField(name=['email']))])
+
+        progress = export_search(client, None, output, output_format='csv')
+
+        rows = self._read_csv(output)
+        self.assertEqual(progress.total_rows, 3)
+        self.assertEqual([row['internalId'] for row in rows], ['1', '2', '4'])
+        self.assertEqual(rows[0]['companyName'], 'ACME')
+        self.assertEqual(rows[1]['subsidiary.internalId'], '3')
+        self.assertEqual(rows[1]['subsidiary.type'], 'subsidiary')
+        self.assertEqual(json.loads(rows[2]['nullFieldList.name']), ['email'])
+
+    def test_csv_unknown_column(self):
+        """Test a value in a column missing from the header is not silently dropped."""
+        sink = CsvSink(io.BytesIO())
+        sink.write_page([{'internalId': '1', 'subsidiary': None}])
+        sink.write_page([{'internalId': '2', 'subsidiary': None}])
+
+        with self.assertRaises(Exception):
+            sink.write_page([{'internalId': '3', 'subsidiary': {'internalId': '3'}}])
+
+    def test_ndjson_pages(self):
+        """Test every page is written as one JSON line per record."""
+        output = io.BytesIO()
+        client = _StubClient(
+            [self.Customer(internalId='1'), self.Customer(internalId='2')],
+            [self.Customer(internalId='3', companyName='ACME')])
+
+        progress = export_search(client, None, output)
+
+        lines = [json.loads(line) for line in output.getvalue().decode('utf-8').splitlines()]
+        self.assertEqual([line['internalId'] for line in lines], ['1', '2', '3'])
+        self.assertEqual(lines[2]['companyName'], 'ACME')
+        self.assertEqual((progress.page, progress.total_rows), (2, 3))
+        self.assertEqual(progress.total_bytes, len(output.getvalue()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Governance model test module."""
+import unittest
+
+from datetime import datetime
+
+from pytz import timezone
+
+from netsuite.api.governance import GovernanceModel
+
+CONFIG = {
+    "config": {
+        "timezone": "America/Los_Angeles"
+    },
+    "schedules": {
+        "peak": {"start_time": "09:00:00", "end_time": "18:00:00"},
+        "off_peak": {"start_time": "18:00:00", "end_time": "09:00:00"}
+    },
+    "record_limits": {
+        "synchronous": {
+            "peak": {"operations": {
+                "add": {"max_records": 100},
+                "get": {"record_count": {"value": 1000}},
+                "search_page": {"max_records": 1000}
+            }},
+            "off_peak": {"operations": {"add": {"max_records": 200}, "search_page": {"max_records": 1000}}}
+        },
+        "asynchronous": {
+            "peak": {"operations": {"add": {"max_records": 400}}},
+            "off_peak": {"operations": {"add": {"max_records": 400}}}
+        }
+    },
+    "request_limits": {
+        "max_request_size": {"value": 100, "units": "MB"}
+    }
+}
+
+
+class GovernanceModelTestCase(unittest.TestCase):
+    """Governance model testcase."""
+
+    def setUp(self):
+        self.model = GovernanceModel(CONFIG)
+
+    def test_find_schedule(self):
+        """Test schedules span from their start time (inclusive) to their end time (exclusive)."""
+        self.assertEqual(self.model.find_schedule(datetime(2018, 1, 1, 8, 59, 59)), 'off_peak')
+        self.assertEqual(self.model.find_schedule(datetime(2018, 1, 1, 9)), 'peak')
+        self.assertEqual(self.model.find_schedule(datetime(2018, 1, 1, 17, 59, 59)), 'peak')
+        self.assertEqual(self.model.find_schedule(datetime(2018, 1, 1, 18)), 'off_peak')
+        self.assertEqual(self.model.find_schedule(datetime(2018, 1, 1)), 'off_peak')
+
+    def test_find_schedule_in_timezone(self):
+        """Test aware dates are converted to the timezone of the configuration."""
+        date = timezone('UTC').localize(datetime(2018, 1, 1, 18))
+        self.assertEqual(self.model.find_schedule(date), 'peak')
+
+    def test_find_current_schedule(self):
+        """Test the current schedule is the one of the current time of the configuration."""
+        now = datetime.now(self.model.timezone)
+        self.assertEqual(self.model.find_schedule(), self.model.find_schedule(now))
+
+    def test_get_operation_constraints_at(self):
+        """Test constraints are those of the schedule in effect at the given date."""
+        peak = datetime(2018, 1, 1, 12)
+        off_peak = datetime(2018, 1, 1, 20)
+
+        self.assertEqual(self.model.get_operation_constraints('addList', at=peak)['max_records'], 100)
+        self.assertEqual(self.model.get_operation_constraints('addList', at=off_peak)['max_records'], 200)
+        self.assertEqual(self.model.get_operation_constraints('asyncAddList', at=peak)['max_records'], 400)
+        self.assertIn('max_request_size', self.model.get_operation_constraints('add', at=peak))
+        self.assertIsNone(self.model.get_operation_constraints('getList', at=peak))
+
+    def test_get_operation_category(self):
+        """Test asynchronous operations share the category of their synchronous counterpart."""
+        self.assertEqual(self.model.get_operation_category('updateList'), 'update')
+        self.assertEqual(self.model.get_operation_category('asyncUpdateList'), 'update')
+        self.assertEqual(self.model.get_operation_category('async_delete_list'), 'delete')
+        self.assertEqual(self.model.get_operation_category('searchMoreWithId'), 'search_page')
+        self.assertIsNone(self.model.get_operation_category('getList'))
+
+    def test_get_record_count_limit(self):
+        """Test record count limits are looked up by category, which may be missing."""
+        peak = datetime(2018, 1, 1, 12)
+        off_peak = datetime(2018, 1, 1, 20)
+
+        self.assertEqual(self.model.get_record_count_limit('get', at=peak), 1000)
+        self.assertIsNone(self.model.get_record_count_limit('get', at=off_peak))
+        self.assertIsNone(self.model.get_record_count_limit('get', is_synchronous=False, at=peak))
+
+    def test_get_max_request_size(self):
+        """Test the maximum request size is converted to bytes."""
+        self.assertEqual(self.model.get_max_request_size(), 100 * 1024 ** 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""Concurrency governor test module."""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from netsuite.governor import ConcurrencyGovernor, GovernedService, LocalTokenBucket
+
+
+class LocalTokenBucketTestCase(unittest.TestCase):
+    """Token bucket testcase."""
+
+    def test_take(self):
+        """Test tokens are taken up to the capacity and then refilled at the rate."""
+        bucket = LocalTokenBucket(rate=10, capacity=2)
+        now = bucket.updated_at
+
+        tokens, updated_at, wait = bucket._take(2.0, now, now)
+        self.assertEqual((tokens, wait), (1.0, 0))
+        tokens, updated_at, wait = bucket._take(tokens, updated_at, now)
+        self.assertEqual((tokens, wait), (0.0, 0))
+        tokens, updated_at, wait = bucket._take(tokens, updated_at, now)
+        self.assertAlmostEqual(wait, 0.1)
+
+        # Half a token was refilled
+        tokens, updated_at, wait = bucket._take(tokens, updated_at, now + 0.05)
+        self.assertAlmostEqual(wait, 0.05)
+
+        # The bucket never holds more than its capacity
+        tokens, updated_at, wait = bucket._take(tokens, updated_at, now + 60)
+        self.assertEqual((tokens, wait), (1.0, 0))
+
+
+class ConcurrencyGovernorTestCase(unittest.TestCase):
+    """Concurrency governor testcase."""
+
+    def test_slots(self):
+        """Test no more requests than slots are in flight."""
+        governor = ConcurrencyGovernor(max_concurrent_requests=2)
+        first_permit = governor.acquire()
+        second_permit = governor.acquire()
+
+        self.assertEqual(governor.try_acquire(), (None, None))
+        with self.assertRaises(Exception):
+            governor.acquire(timeout=0.01)
+
+        governor.release(first_permit)
+        third_permit = governor.acquire(timeout=1)
+        governor.release(second_permit)
+        governor.release(third_permit)
+
+    def test_try_acquire_keeps_slot(self):
+        """Test the slot is kept while waiting for a token."""
+        governor = ConcurrencyGovernor(max_concurrent_requests=1, requests_per_second=1, burst=1)
+        slot, wait = governor.try_acquire()
+        self.assertEqual(wait, 0)
+
+        governor.release(slot)
+        slot, wait = governor.try_acquire()
+        self.assertIsNotNone(slot)
+        self.assertGreater(wait, 0)
+        self.assertEqual(governor.try_acquire(), (None, None))
+
+        # Timing out releases the slot held
+        governor.release(slot)
+        with self.assertRaises(Exception):
+            governor.acquire(timeout=0.01)
+        self.assertIsNotNone(governor.slots.try_acquire())
+
+    def test_rate(self):
+        """Test requests above the burst wait for the sustained rate."""
+        governor = ConcurrencyGovernor(requests_per_second=50, burst=5)
+        started_at = time.time()
+        for _ in range(10):
+            governor.release(governor.acquire())
+        self.assertGreaterEqual(time.time() - started_at, 0.09)
+
+    def test_no_limits(self):
+        """Test requests are never held without limits."""
+        governor = ConcurrencyGovernor()
+        self.assertEqual(governor.try_acquire(), (None, 0))
+        with governor.request(timeout=0):
+            pass
+
+    def test_file_slots(self):
+        """Test slots are shared by the governors using the same lock directory."""
+        lock_directory = tempfile.mkdtemp()
+        try:
+            governor = ConcurrencyGovernor(max_concurrent_requests=1, lock_directory=lock_directory)
+            other_governor = ConcurrencyGovernor(max_concurrent_requests=1, lock_directory=lock_directory)
+
+            permit = governor.acquire()
+            self.assertEqual(other_governor.try_acquire(), (None, None))
+            governor.release(permit)
+            other_governor.release(other_governor.acquire(timeout=1))
+        finally:
+            shutil.rmtree(lock_directory)
+
+
+class GovernedServiceTestCase(unittest.TestCase):
+    """Governed service testcase."""
+
+    def test_operations_governed(self):
+        """Test operations of the service run within the limits."""
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        class Service(object):
+            name = 'service'
+
+            def get(self, internal_id):
+                with lock:
+                    in_flight[0] += 1
+                    in_flight[1] = max(in_flight)
+                time.sleep(0.01)
+                with lock:
+                    in_flight[0] -= 1
+                return internal_id
+
+        service = GovernedService(Service(), ConcurrencyGovernor(max_concurrent_requests=2))
+        results = []
+        threads = [
+            threading.Thread(target=lambda index=index: results.append(service.get(index)))
+            for index in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), list(range(6)))
+        self.assertEqual(in_flight[1], 2)
+        self.assertEqual(service.name, 'service')
+
+
+if __name__ == '__main__':
+    unittest.main()
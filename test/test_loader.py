@@ -0,0 +1,146 @@
+"""Record loader test module."""
+import threading
+import unittest
+
+from netsuite.api.governance import GovernanceModel
+from netsuite.loader import RecordLoader
+
+GOVERNANCE_CONFIG = {
+    "schedules": {
+        "all_day": {"start_time": "00:00:00", "end_time": "00:00:00"}
+    },
+    "record_limits": {
+        "synchronous": {"all_day": {"operations": {"get": {"record_count": {"value": 2}}}}}
+    },
+    "request_limits": {}
+}
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of a response."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _StubClient(object):
+    """Client answering getList calls with the references it was given."""
+
+    def __init__(self, missing_ids=()):
+        self.models = _Object(Core=_Object(RecordRef=_Object))
+        self.missing_ids = missing_ids
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_list(self, record_refs):
+        with self.lock:
+            self.calls.append([(ref.type, ref.internalId) for ref in record_refs])
+        return _Object(readResponseList=_Object(readResponse=[
+            _Object(
+                status=_Object(isSuccess=ref.internalId not in self.missing_ids),
+                record={'type': ref.type, 'internalId': ref.internalId})
+            for ref in record_refs
+        ]))
+
+    def _serialize(self, record):
+        return record
+
+
+class RecordLoaderTestCase(unittest.TestCase):
+    """Record loader testcase."""
+
+    def test_window(self):
+        """Test records requested within the window are deduplicated into one getList call."""
+        client = _StubClient()
+        loader = RecordLoader(client, window=0.05)
+
+        futures = loader.load_many('customer', [1, 2, 1])
+
+        self.assertIs(futures[0], futures[2])
+        self.assertEqual(futures[1].result(1), {'type': 'customer', 'internalId': '2'})
+        self.assertEqual(futures[0].result(1), {'type': 'customer', 'internalId': '1'})
+        self.assertEqual(client.calls, [[('customer', '1'), ('customer', '2')]])
+
+    def test_max_batch_size(self):
+        """Test a full batch is fetched right away without waiting for the window."""
+        client = _StubClient()
+        loader = RecordLoader(client, window=60, max_batch_size=2)
+
+        futures = loader.load_many('customer', [1, 2])
+        self.assertTrue(all(future.done() for future in futures))
+
+        futures = [loader.load('customer', 3)]
+        loader.dispatch()
+        self.assertTrue(futures[0].done())
+        self.assertEqual([len(call) for call in client.calls], [2, 1])
+
+    def test_governed_max_batch_size(self):
+        """Test getList calls are limited by the governance model unless a batch size is given."""
+        governance_model = GovernanceModel(GOVERNANCE_CONFIG)
+        self.assertEqual(RecordLoader(_StubClient()).get_max_batch_size(), RecordLoader.DEFAULT_MAX_BATCH_SIZE)
+        self.assertEqual(
+            RecordLoader(_StubClient(), max_batch_size=5, governance_model=governance_model).get_max_batch_size(), 5)
+
+        client = _StubClient()
+        loader = RecordLoader(client, window=60, governance_model=governance_model)
+        loader.load_many('customer', [1, 2, 3])
+        loader.dispatch()
+
+        self.assertEqual([len(call) for call in client.calls], [2, 1])
+
+    def test_failed_record(self):
+        """Test a record that cannot be read fails its own future only."""
+        client = _StubClient(missing_ids=('2',))
+        loader = RecordLoader(client, window=60)
+
+        futures = loader.load_many('customer', [1, 2])
+        loader.dispatch()
+
+        self.assertEqual(futures[0].result(0)['internalId'], '1')
+        with self.assertRaises(Exception):
+            futures[1].result(0)
+
+    def test_scope(self):
+        """Test records requested within a scope are fetched together when it exits."""
+        client = _StubClient()
+        loader = RecordLoader(client, window=0)
+
+        with loader.scope():
+            futures = loader.load_many('customer', [1, 2])
+            with loader.scope():
+                futures.append(loader.load('contact', 3))
+            self.assertFalse(any(future.done() for future in futures))
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(client.calls, [[('customer', '1'), ('customer', '2'), ('contact', '3')]])
+
+    def test_get_in_scope(self):
+        """Test get within a scope fetches the records requested so far instead of blocking."""
+        client = _StubClient()
+        loader = RecordLoader(client, window=60)
+
+        with loader.scope():
+            future = loader.load('customer', 1)
+            record = loader.get('customer', 2, timeout=1)
+            self.assertTrue(future.done())
+
+        self.assertEqual(record['internalId'], '2')
+        self.assertEqual(client.calls, [[('customer', '1'), ('customer', '2')]])
+
+    def test_scope_per_thread(self):
+        """Test the scope of a thread does not hold the records requested by other threads."""
+        client = _StubClient()
+        loader = RecordLoader(client, window=0)
+        records = []
+
+        with loader.scope():
+            future = loader.load('customer', 1)
+            thread = threading.Thread(target=lambda: records.append(loader.get('customer', 1, timeout=1)))
+            thread.start()
+            thread.join()
+            self.assertEqual(records, [{'type': 'customer', 'internalId': '1'}])
+            self.assertTrue(future.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
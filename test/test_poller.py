@@ -0,0 +1,135 @@
+"""Asynchronous job polling test module."""
+import threading
+import time
+import unittest
+
+from netsuite.api.types import AsyncStatusType
+from netsuite.poller import AsyncJobPoller, get_write_responses
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of a response."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _StubClient(object):
+    """Client answering status checks with the statuses given per job and results of the pages given.
+
+    A status is an exception to raise or an AsyncStatusType. The last status of a job is kept
+    once the others are used up.
+    """
+
+    def __init__(self, statuses, pages=1):
+        self.statuses = dict((job_id, list(job_statuses)) for job_id, job_statuses in statuses.items())
+        self.pages = pages
+        self.checks = []
+        self.page_requests = []
+        self.lock = threading.Lock()
+
+    def check_async_status(self, job_id):
+        with self.lock:
+            self.checks.append(job_id)
+            job_statuses = self.statuses[job_id]
+            status = job_statuses.pop(0) if len(job_statuses) > 1 else job_statuses[0]
+        if isinstance(status, Exception):
+            raise status
+        return _Object(status=status, estRemainingDuration=None)
+
+    def get_async_result(self, job_id, page_index):
+        with self.lock:
+            self.page_requests.append((job_id, page_index))
+        return _Object(
+            totalPages=self.pages,
+            writeResponseList=_Object(writeResponse=['{}-{}'.format(job_id, page_index)]))
+
+
+class AsyncJobPollerTestCase(unittest.TestCase):
+    """Asynchronous job poller testcase."""
+
+    def _build_poller(self, client, **kwargs):
+        poller = AsyncJobPoller(client, initial_interval=0.001, max_interval=0.004, jitter=0, **kwargs)
+        self.addCleanup(poller.close)
+        return poller
+
+    def test_result_pages(self):
+        """Test every result page of a completed job is fetched and delivered in order."""
+        client = _StubClient({
+            'job': [AsyncStatusType.PENDING, AsyncStatusType.PROCESSING, AsyncStatusType.FINISHED]
+        }, pages=3)
+        callbacks = []
+        poller = self._build_poller(client)
+
+        future = poller.track(
+            'job',
+            result_handler=get_write_responses,
+            callback=lambda job_id, done_future: callbacks.append(job_id))
+
+        self.assertEqual(future.result(1), ['job-1', 'job-2', 'job-3'])
+        self.assertEqual(client.checks, ['job'] * 3)
+        self.assertEqual(sorted(client.page_requests), [('job', 1), ('job', 2), ('job', 3)])
+        self.assertEqual(callbacks, ['job'])
+        self.assertEqual(poller.jobs, {})
+
+    def test_many_jobs(self):
+        """Test jobs completing at different times are polled from the same thread."""
+        client = _StubClient({
+            'fast': [AsyncStatusType.FINISHED_WITH_ERRORS],
+            'slow': [AsyncStatusType.PENDING] * 5 + [AsyncStatusType.FINISHED]
+        })
+        poller = self._build_poller(client)
+
+        slow_future = poller.track('slow')
+        fast_future = poller.track('fast')
+
+        self.assertEqual(len(fast_future.result(1)), 1)
+        self.assertEqual(len(slow_future.result(1)), 1)
+        self.assertEqual(client.checks.count('fast'), 1)
+        self.assertEqual(client.checks.count('slow'), 6)
+
+    def test_backoff(self):
+        """Test the interval between checks grows up to max_interval."""
+        client = _StubClient({'job': [AsyncStatusType.PENDING]})
+        poller = self._build_poller(client)
+
+        poller.track('job')
+        deadline = time.time() + 1
+        while len(client.checks) < 4 and time.time() < deadline:
+            time.sleep(0.005)
+
+        self.assertEqual(poller.jobs['job'].interval, 0.004)
+
+    def test_failed_job(self):
+        """Test a job that failed fails its future."""
+        client = _StubClient({'job': [AsyncStatusType.FAILED]})
+        poller = self._build_poller(client)
+
+        with self.assertRaises(Exception):
+            poller.track('job').result(1)
+        self.assertEqual(client.page_requests, [])
+
+    def test_check_failures(self):
+        """Test a job fails once its status checks failed max_check_failures times in a row."""
+        client = _StubClient({'job': [Exception('Unreachable')]})
+        poller = self._build_poller(client, max_check_failures=3)
+
+        with self.assertRaises(Exception):
+            poller.track('job').result(1)
+        self.assertEqual(client.checks, ['job'] * 3)
+
+    def test_close(self):
+        """Test closing the poller cancels the jobs still running."""
+        client = _StubClient({'job': [AsyncStatusType.PENDING]})
+        poller = self._build_poller(client)
+
+        future = poller.track('job')
+        poller.close()
+
+        self.assertTrue(future.cancelled())
+        with self.assertRaises(Exception):
+            poller.track('other')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""List write results test module."""
+import io
+import json
+import unittest
+
+from lxml import etree
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from zeep.exceptions import Fault
+
+from netsuite.results import (REQUEST_FAILED_CODE,
+                              REQUEST_NOT_SENT_CODE,
+                              NdjsonDeadLetterSink,
+                              get_request_failure_code,
+                              map_request_failure,
+                              map_write_responses)
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of a response."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _build_write_response(code=None, internal_id=None):
+    status_details = [_Object(code=code, message='{} error'.format(code))] if code else None
+    return _Object(
+        status=_Object(isSuccess=code is None, statusDetail=status_details),
+        baseRef=_Object(internalId=internal_id) if internal_id else None)
+
+
+class ResultsTestCase(unittest.TestCase):
+    """List write results testcase."""
+
+    def test_map_write_responses(self):
+        """Test records are paired with their write responses in order."""
+        records = ['first', 'second']
+        results = map_write_responses(records, [
+            _build_write_response(internal_id='1'),
+            _build_write_response(code='RCRD_LOCKED_BY_WF')])
+
+        self.assertEqual([result.record for result in results], records)
+        self.assertTrue(results[0].is_success)
+        self.assertIsNone(results[0].code)
+        self.assertEqual(results[0].base_ref.internalId, '1')
+        self.assertFalse(results[1].is_success)
+        self.assertEqual(results[1].code, 'RCRD_LOCKED_BY_WF')
+        self.assertEqual(results[1].message, 'RCRD_LOCKED_BY_WF error')
+
+    def test_map_write_responses_mismatch(self):
+        """Test a write response missing for a record is an error."""
+        with self.assertRaises(Exception):
+            map_write_responses(['first', 'second'], [_build_write_response()])
+
+    def test_fault_code(self):
+        """Test the code of a fault is read from its detail."""
+        detail = etree.fromstring(
+            '<detail><platformFaults:exceededRequestLimitFault'
+            ' xmlns:platformFaults="urn:faults.platform.webservices.netsuite.com">'
+            '<platformFaults:code>WS_CONCUR_SESSION_DISALLWD</platformFaults:code>'
+            '</platformFaults:exceededRequestLimitFault></detail>')
+        self.assertEqual(
+            get_request_failure_code(Fault('Only one request at a time', detail=detail)),
+            'WS_CONCUR_SESSION_DISALLWD')
+        self.assertEqual(get_request_failure_code(Fault('Unknown')), REQUEST_FAILED_CODE)
+
+    def test_rejected_status_code(self):
+        """Test the code of a list operation rejected as a whole is the one of its status."""
+        status = _Object(isSuccess=False, statusDetail=[_Object(code='SSS_REQUEST_LIMIT_EXCEEDED')])
+        self.assertEqual(get_request_failure_code(Exception(status)), 'SSS_REQUEST_LIMIT_EXCEEDED')
+
+    def test_transport_failure_codes(self):
+        """Test only the requests which never reached Netsuite are reported as not sent."""
+        self.assertEqual(get_request_failure_code(ConnectTimeout()), REQUEST_NOT_SENT_CODE)
+
+        refused = MaxRetryError(None, '/services', NewConnectionError(None, 'Connection refused'))
+        self.assertEqual(get_request_failure_code(ConnectionError(refused)), REQUEST_NOT_SENT_CODE)
+
+        self.assertEqual(get_request_failure_code(ConnectionError('Connection reset')), REQUEST_FAILED_CODE)
+        self.assertEqual(get_request_failure_code(ReadTimeout()), REQUEST_FAILED_CODE)
+        self.assertEqual(get_request_failure_code(Exception('Unexpected')), REQUEST_FAILED_CODE)
+
+    def test_map_request_failure(self):
+        """Test every record of a failed request gets the code of the failure."""
+        results = map_request_failure(['first', 'second'], ReadTimeout('Read timed out'))
+
+        self.assertEqual([result.record for result in results], ['first', 'second'])
+        self.assertEqual(set(result.code for result in results), set([REQUEST_FAILED_CODE]))
+        self.assertFalse(any(result.is_success for result in results))
+        self.assertEqual(results[0].message, 'Read timed out')
+
+    def test_ndjson_dead_letter_sink(self):
+        """Test failed records are written with their code and message."""
+        output = io.BytesIO()
+        sink = NdjsonDeadLetterSink(output)
+        sink.write(map_request_failure([{'internalId': '1'}], ReadTimeout('Read timed out')))
+
+        line = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual(line, {
+            'code': REQUEST_FAILED_CODE,
+            'message': 'Read timed out',
+            'record': {'internalId': '1'}
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
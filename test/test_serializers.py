@@ -0,0 +1,67 @@
+"""Serializers test module."""
+import os
+import unittest
+
+from zeep import Client
+from zeep.helpers import serialize_object
+
+from netsuite.serializers import CompiledSerializer, estimate_soap_size
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class CompiledSerializerTestCase(unittest.TestCase):
+    """Compiled serializer testcase."""
+
+    @classmethod
+    def setUpClass(cls):
+        client = Client(WSDL_PATH)
+        cls.Customer = client.get_type('{urn:records.test}Customer')
+        cls.RecordRef = client.get_type('{urn:records.test}RecordRef')
+        cls.NullField = client.get_type('{urn:records.test}NullField')
+
+    def _build_customers(self):
+        return [
+            self.Customer(
+                internalId='1',
+                companyName='ACME',
+                subsidiary=self.RecordRef(internalId='3', type='subsidiary'),
+                nullFieldList=self.NullField(name=['email', 'phone'])),
+            self.Customer(internalId='2', email='sales@example.test')
+        ]
+
+    def test_same_as_zeep(self):
+        """Test records serialize as with zeep.helpers.serialize_object."""
+        customers = self._build_customers()
+        serializer = CompiledSerializer()
+
+        self.assertEqual(serializer.serialize(customers), serialize_object(customers, dict))
+        # Once compiled, the conversion functions give the same result
+        self.assertEqual(serializer(customers), serialize_object(customers, dict))
+
+    def test_skip_none(self):
+        """Test fields without value are left out."""
+        serializer = CompiledSerializer(skip_none=True)
+
+        self.assertEqual(serializer.serialize(self._build_customers()[1]), {
+            'internalId': '2',
+            'email': 'sales@example.test'
+        })
+        self.assertEqual(serializer.serialize({'name': None, 'tags': ['a']}), {'tags': ['a']})
+
+    def test_scalars(self):
+        """Test scalar values are returned as they are."""
+        serializer = CompiledSerializer()
+        for value in ('text', 1, 1.5, True, None):
+            self.assertEqual(serializer.serialize(value), value)
+
+    def test_estimate_soap_size(self):
+        """Test the estimated size grows with the fields of a record."""
+        small = self.Customer(internalId='1')
+        large = self.Customer(internalId='1', companyName='ACME' * 100)
+        self.assertGreater(estimate_soap_size(large), estimate_soap_size(small) + 400)
+        self.assertEqual(estimate_soap_size('record'), len('record'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""WSDL snapshot test module."""
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import unittest
+
+from lxml import etree
+from zeep import Client
+from zeep.transports import Transport
+
+from netsuite import snapshot
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'records.wsdl')
+
+
+class SnapshotTestCase(unittest.TestCase):
+    """WSDL snapshot testcase."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'records.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        """Test a saved snapshot loads into a working client using the given transport."""
+        client = Client(WSDL_PATH)
+        client.set_ns_prefix('rec', 'urn:records.test')
+        client.settings.strict = False
+        snapshot.save_snapshot(client, self.path, WSDL_PATH)
+
+        transport = Transport()
+        loaded_client = snapshot.load_snapshot(self.path, WSDL_PATH, transport)
+
+        self.assertIsNotNone(loaded_client)
+        self.assertIs(loaded_client.transport, transport)
+        self.assertFalse(loaded_client.settings.strict)
+        with loaded_client.settings(raw_response=True):
+            self.assertTrue(loaded_client.settings.raw_response)
+        self.assertFalse(loaded_client.settings.raw_response)
+
+        customer = loaded_client.get_type('rec:Customer')(companyName='ACME', subsidiary={'internalId': '1'})
+        self.assertEqual(customer.subsidiary.internalId, '1')
+
+        message = loaded_client.create_message(
+            loaded_client.service, 'get', baseRef={'internalId': '7', 'type': 'customer'})
+        base_ref = message.find('.//{urn:records.test}baseRef')
+        self.assertEqual(base_ref.get('internalId'), '7')
+
+    def test_load_outdated(self):
+        """Test a snapshot of another WSDL is ignored."""
+        snapshot.save_snapshot(Client(WSDL_PATH), self.path, WSDL_PATH)
+        self.assertIsNone(snapshot.load_snapshot(self.path, 'other.wsdl', Transport()))
+
+    def test_global_pickling_untouched(self):
+        """Test the snapshot reducers are not registered globally."""
+        with self.assertRaises(TypeError):
+            pickle.dumps(threading.local())
+        with self.assertRaises(TypeError):
+            pickle.dumps(etree.Element('record'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Incremental synchronization test module."""
+import datetime
+import unittest
+
+from dateutil.tz import tzutc
+
+from netsuite.sync import Checkpoint, CheckpointStore, DeltaSync
+
+
+def _date(hour, second=0):
+    return datetime.datetime(2020, 1, 1, hour, 0, second, tzinfo=tzutc())
+
+
+class _Object(object):
+    """Stand-in for the zeep objects of requests and responses."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class _StubClient(object):
+    """Client searching and listing the deletions of the records it holds."""
+
+    def __init__(self, server_times):
+        self.models = _Object(
+            Core=_Object(
+                SearchDateField=_Object,
+                GetDeletedFilter=_Object,
+                SearchEnumMultiSelectField=_Object),
+            CustomerSearchBasic=_Object)
+        self.server_times = list(server_times)
+        self.records = []
+        self.deleted = []
+        self.deleted_since = []
+
+    def get_server_time(self):
+        return self.server_times.pop(0)
+
+    def iter_search_all(self, search_record, search_preferences=None, serialize=True):
+        since = getattr(search_record, 'lastModifiedDate', None)
+        for record in self.records:
+            if since is None or record.lastModifiedDate >= since.searchValue:
+                yield record
+
+    def get_deleted(self, get_deleted_filter, page_index=1):
+        since = get_deleted_filter.deletedDate.searchValue
+        self.deleted_since.append(since)
+        return _Object(
+            totalPages=1,
+            deletedRecordList=_Object(deletedRecord=[
+                deleted_record for deleted_record in self.deleted if deleted_record.deletedDate >= since
+            ]))
+
+    def _serialize(self, record):
+        return record.internalId
+
+
+class DeltaSyncTestCase(unittest.TestCase):
+    """Incremental synchronization testcase."""
+
+    def setUp(self):
+        self.store = CheckpointStore(':memory:')
+
+    def tearDown(self):
+        self.store.close()
+
+    def _sync(self, delta_sync, **kwargs):
+        records = []
+        deleted = []
+        result = delta_sync.sync(
+            'customer', 'CustomerSearchBasic',
+            on_record=records.append,
+            on_delete=lambda deleted_record: deleted.append(deleted_record.internalId),
+            **kwargs)
+        return result, records, deleted
+
+    def test_delta(self):
+        """Test a run only fetches the records modified from the high-water mark on."""
+        client = _StubClient([_date(10), _date(11)])
+        client.records = [
+            _Object(internalId='1', lastModifiedDate=_date(8)),
+            _Object(internalId='2', lastModifiedDate=_date(9))
+        ]
+        delta_sync = DeltaSync(client, self.store)
+
+        result, records, deleted = self._sync(delta_sync)
+        self.assertEqual(records, ['1', '2'])
+        self.assertEqual(result.checkpoint.last_modified, _date(9))
+        self.assertEqual(client.deleted_since, [])
+
+        # Records modified within the second of the high-water mark are delivered again
+        client.records.append(_Object(internalId='3', lastModifiedDate=_date(9)))
+        client.records.append(_Object(internalId='4', lastModifiedDate=_date(10, 30)))
+        result, records, deleted = self._sync(delta_sync)
+        self.assertEqual(records, ['2', '3', '4'])
+        self.assertEqual(result.records, 3)
+        self.assertEqual(self.store.get(result.checkpoint.key).last_modified, _date(10, 30))
+
+    def test_deleted_since_server_time(self):
+        """Test deletions are fetched from the server time at which the previous run started."""
+        client = _StubClient([datetime.datetime(2000, 1, 1, tzinfo=tzutc()), _date(12)])
+        client.deleted = [
+            _Object(internalId='1', deletedDate=datetime.datetime(1999, 12, 31, tzinfo=tzutc())),
+            _Object(internalId='2', deletedDate=_date(11))
+        ]
+        delta_sync = DeltaSync(client, self.store)
+
+        result, records, deleted = self._sync(delta_sync)
+        self.assertEqual(result.checkpoint.last_deleted, datetime.datetime(2000, 1, 1, tzinfo=tzutc()))
+
+        result, records, deleted = self._sync(delta_sync)
+        self.assertEqual(deleted, ['2'])
+        self.assertEqual(result.deleted, 1)
+        self.assertEqual(result.checkpoint.last_deleted, _date(12))
+
+    def test_failed_run(self):
+        """Test the checkpoint is left as it was when a run fails."""
+        client = _StubClient([_date(10)])
+        client.records = [_Object(internalId='1', lastModifiedDate=_date(8))]
+        delta_sync = DeltaSync(client, self.store)
+
+        def on_complete():
+            raise Exception('Flush failed')
+
+        with self.assertRaises(Exception):
+            self._sync(delta_sync, on_complete=on_complete)
+        self.assertIsNone(self.store.get(DeltaSync.get_checkpoint_key('customer', 'CustomerSearchBasic')))
+
+
+class CheckpointStoreTestCase(unittest.TestCase):
+    """Checkpoint store testcase."""
+
+    def test_save(self):
+        """Test checkpoints are read back as saved until they are deleted."""
+        store = CheckpointStore(':memory:')
+        checkpoint = Checkpoint(
+            key='customer', record_type='customer', last_modified=_date(9), last_deleted=None)
+
+        store.save(checkpoint)
+        self.assertEqual(store.get('customer'), checkpoint)
+
+        store.delete('customer')
+        self.assertIsNone(store.get('customer'))
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()